@@ -1,5 +1,6 @@
+import importlib
+
 import streamlit as st
-import app_modules.input as input_module
 
 # Remove sidebar
 st.set_page_config(
@@ -16,31 +17,29 @@ hide_sidebar_style = """
 """
 st.markdown(hide_sidebar_style, unsafe_allow_html=True)
 
-# Clean imports
-from app_modules import main_page
-from app_modules import company_data
-from app_modules import pdf_parser
-from app_modules.Sheets.Sammendrag import summery_getter as summary  # FIXED: Correct import path
-from app_modules.Sheets import excel_filler  # FIXED: Correct import path
-from app_modules import template_loader
-from app_modules import download
-
-# Sidebar page mapping
+# Sidebar page mapping: page -> module path. A page's module (and the
+# libraries it pulls in) is imported the first time the page is shown,
+# so startup only pays for the page being rendered.
 PAGES = {
-    "🏠 Hovedside": main_page,
-    "📄 Input-modul": input_module,
-    "🏢 Company Data": company_data,
-    "📄 PDF Parser": pdf_parser,
-    "📝 Summary Generator": summary,
-    "📊 Excel Filler": excel_filler,
-    "📁 Template Loader": template_loader,
-    "📥 Download": download,
+    "🏠 Hovedside": "app_modules.main_page",
+    "📄 Input-modul": "app_modules.input",
+    "🏢 Company Data": "app_modules.company_data",
+    "📄 PDF Parser": "app_modules.pdf_parser",
+    "📝 Summary Generator": "app_modules.Sheets.Sammendrag.summery_getter",
+    "📊 Excel Filler": "app_modules.Sheets.excel_filler",
+    "📁 Template Loader": "app_modules.template_loader",
+    "📥 Download": "app_modules.download",
+    "📈 Performance": "app_modules.performance_page",
 }
 
+def load_page(choice):
+    """The page's module, imported on first use (cached in sys.modules after that)."""
+    return importlib.import_module(PAGES[choice])
+
 def main():
     st.sidebar.title("Navigasjon")
     choice = st.sidebar.radio("Velg side:", list(PAGES.keys()))
-    page = PAGES[choice]
+    page = load_page(choice)
     page.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,13 @@
+# app_modules/Sheets/Alminnelig_ansvar/mapping.py
+"""
+Mapping configuration for the Alminnelig ansvar (General liability) sheet.
+(format: see Sheets/mapping_engine.py)
+"""
+
+SHEET = "Alminnelig ansvar"
+
+FIELDS = {
+    # Row 3 - the company's main activity; the rest of the row is filled in by the broker
+    # B3 - Årlig omsetning 2024, in NOK (Proff.no reports NOK 1000)
+    "annual_revenue": {"cells": "B3", "source": ("sum_driftsinnt_2024",), "transform": "thousands"},
+}
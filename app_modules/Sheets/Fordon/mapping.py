@@ -0,0 +1,12 @@
+# app_modules/Sheets/Fordon/mapping.py
+"""
+Mapping configuration for the Fordon (Vehicles) sheet.
+(format: see Sheets/mapping_engine.py)
+"""
+
+SHEET = "Fordon"
+
+FIELDS = {
+    # Vehicle and trailer rows (from row 3 and row 16) come from the
+    # customer's vehicle list; nothing from BRREG/Proff.no maps here yet
+}
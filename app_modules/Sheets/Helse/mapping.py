@@ -0,0 +1,11 @@
+# app_modules/Sheets/Helse/mapping.py
+"""
+Mapping configuration for the Helse (Health insurance) sheet.
+(format: see Sheets/mapping_engine.py)
+"""
+
+SHEET = "Helse"
+
+FIELDS = {
+    # Covered persons (from row 4) are filled in by the broker
+}
@@ -0,0 +1,14 @@
+# app_modules/Sheets/Prosjekt_entreprenør/mapping.py
+"""
+Mapping configuration for the Prosjekt,entreprenør (Contractor's all risks) sheet.
+(format: see Sheets/mapping_engine.py)
+"""
+
+SHEET = "Prosjekt,entreprenør"
+
+FIELDS = {
+    # B3 - Årlig omsetning (Sum column), in NOK (Proff.no reports NOK 1000)
+    # Same source and transform as Alminnelig ansvar: computed once per fill
+    "annual_revenue": {"cells": "B3", "source": ("sum_driftsinnt_2024",), "transform": "thousands"},
+    # B4-B10 - deductible and first-risk sums are filled in by the broker
+}
@@ -4,11 +4,11 @@ Full BRREG getter implementation placed inside the Sammendrag sheet folder.
 Queries the official Enhetsregisteret API and normalizes fields for the sheet.
 """
 
-import requests
 import logging
 
+from app_modules.company_data import fetch_company_by_org
+
 logger = logging.getLogger(__name__)
-BRREG_API = "https://data.brreg.no/enhetsregisteret/api/enheter/{}"
 
 def _normalize_address(addr_obj: dict) -> str:
     if not addr_obj:
@@ -39,13 +39,12 @@ def fetch_brreg_info(query: str) -> dict:
     if not org.isdigit():
         # BRREG lookup by name is more complex; keep minimal here to avoid false positives
         return {}
-    url = BRREG_API.format(org)
     try:
-        r = requests.get(url, timeout=10)
-        if r.status_code != 200:
-            logger.debug("BRREG returned status %s for %s", r.status_code, org)
+        # Shares the on-disk entity cache with company_data
+        data = fetch_company_by_org(org)
+        if not data:
+            logger.debug("BRREG returned no entity for %s", org)
             return {}
-        data = r.json()
         # Forretningsadresse may be nested
         forretningsadresse = data.get("forretningsadresse") or {}
         address = _normalize_address(forretningsadresse)
@@ -1,224 +1,436 @@
 # app_modules/Sheets/Sammendrag/proff_getter.py
 """
 Proff.no getter - properly navigates from search to company page
+
+Nothing is rendered while fetching. Every step is recorded as a diagnostic
+event in the result, so the getter runs the same in worker threads, batch
+jobs and the app. The UI shows a one-line summary and, on request, the
+whole trace via render_trace().
+
+Lookups are cached in memory (PROFF_CACHE_SIZE org numbers, default 1024),
+except when an HTTP request failed: those are retried on the next call.
 """
 
 import re
+import os
+import json
 import logging
-from functools import lru_cache
-import requests
-from bs4 import BeautifulSoup
-import streamlit as st
+import threading
+import traceback
+from collections import OrderedDict
+
+from app_modules import http_client, metrics
+
+try:
+    import lxml  # noqa: F401  (optional, several times faster than html.parser)
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
 
 logger = logging.getLogger(__name__)
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
 
-BASE_URL = "https://www.proff.no"
+# Configurable so tests and load tests can point at a local stand-in
+BASE_URL = os.environ.get("PROFF_BASE_URL", "https://www.proff.no").rstrip("/")
+
+PROFF_CACHE_SIZE = int(os.environ.get("PROFF_CACHE_SIZE", 1024))
+
+_cache = OrderedDict()  # org number -> lookup_proff result, least recently used first
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "not_cached": 0}
+
+FINANCIAL_KEYWORDS = ["resultat", "inntekt", "eiendel", "driftsinntekt"]
+
+_OPEN_TAG_RE = {tag: re.compile(rf"<{tag}[\s>]") for tag in ("a", "table")}
+
+
+class _Trace:
+    """Collects diagnostic events: {"level", "message"[, "data"]}."""
+
+    def __init__(self):
+        self.events = []
+        self.fetch_failed = False  # an HTTP request failed: the result may change on retry
+
+    def _add(self, level, message, data=None):
+        event = {"level": level, "message": message}
+        if data is not None:
+            event["data"] = data
+        self.events.append(event)
+        logger.debug("%s: %s", level, message)
+
+    def info(self, message, data=None):
+        self._add("info", message, data)
+
+    def success(self, message, data=None):
+        self._add("success", message, data)
 
-def _safe_get(url, params=None, timeout=10):
+    def warning(self, message, data=None):
+        self._add("warning", message, data)
+
+    def error(self, message, data=None):
+        self._add("error", message, data)
+
+
+def _fragments(html, tag):
+    """
+    Source text of the outermost <tag> elements, joined.
+    A cheap pre-filter so the parser never sees the rest of the page.
+    """
+    lower = html.lower()
+    open_re, close = _OPEN_TAG_RE[tag], f"</{tag}>"
+    out = []
+    m = open_re.search(lower)
+    while m:
+        depth, i = 1, m.end()
+        while depth:
+            next_open = open_re.search(lower, i)
+            next_close = lower.find(close, i)
+            if next_close == -1:
+                i = len(html)
+                break
+            if next_open and next_open.start() < next_close:
+                depth, i = depth + 1, next_open.end()
+            else:
+                depth, i = depth - 1, next_close + len(close)
+        out.append(html[m.start():i])
+        m = open_re.search(lower, i)
+    return "".join(out)
+
+def _safe_get(url, trace, params=None, timeout=10):
     try:
-        st.write(f"🌐 Fetching: {url}")
-        r = requests.get(url, params=params, headers=HEADERS, timeout=timeout)
-        st.write(f"📊 Status: {r.status_code}")
-        
+        trace.info(f"🌐 Fetching: {url}")
+        r = http_client.get(url, params=params, headers=HEADERS, timeout=timeout)
+        trace.info(f"📊 Status: {r.status_code}")
+
         if r.status_code == 200:
-            st.success(f"✅ Success!")
+            trace.success("✅ Success!")
             return r.text
         else:
-            st.error(f"❌ Error {r.status_code}")
-            
+            trace.error(f"❌ Error {r.status_code}")
+
     except Exception as e:
-        st.error(f"❌ HTTP error: {e}")
+        trace.error(f"❌ HTTP error: {e}")
+    trace.fetch_failed = True
     return None
 
-def _find_company_page_from_search(org_number):
+@metrics.timed("proff.search")
+def _find_company_page_from_search(org_number, trace):
     """
     Search for company and extract the actual company page URL
     """
-    st.write(f"🔍 Searching for org number: {org_number}")
-    
+    trace.info(f"🔍 Searching for org number: {org_number}")
+
     # Try the search URL
     search_url = f"{BASE_URL}/bransjes%C3%B8k?q={org_number}"
-    html = _safe_get(search_url)
-    
+    html = _safe_get(search_url, trace)
+
     if not html:
         return None
-    
-    soup = BeautifulSoup(html, "html.parser")
-    
-    st.write("🔎 Looking for company links in search results...")
-    
+
+    return find_company_link(html, trace)
+
+def find_company_link(html, trace=None, fast=True):
+    """
+    Company page URL from a Proff search results page, or None.
+    fast=False parses the whole page with html.parser (the original path).
+    """
+    from bs4 import BeautifulSoup, SoupStrainer  # imported on first lookup, not at app start
+
+    trace = trace or _Trace()
+    if fast:
+        # Only build the elements we read, not the whole page
+        soup = BeautifulSoup(_fragments(html, "a"), HTML_PARSER, parse_only=SoupStrainer("a", href=True))
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+
+    trace.info("🔎 Looking for company links in search results...")
+
     # Try multiple patterns to find company links
     patterns_to_try = [
         re.compile(r"/roller/\d+"),
         re.compile(r"/selskap/[^/]+/\d+"),
         re.compile(r"/foretak/[^/]+/\d+"),
     ]
-    
+
     for pattern in patterns_to_try:
         links = soup.find_all("a", href=pattern)
-        st.write(f"📌 Pattern {pattern.pattern}: found {len(links)} links")
-        
+        trace.info(f"📌 Pattern {pattern.pattern}: found {len(links)} links")
+
         if links:
             # Show all found links
             for i, link in enumerate(links[:5]):  # Show first 5
                 href = link.get("href")
                 link_text = link.get_text(strip=True)
-                st.write(f"  {i+1}. Link: {href} - Text: {link_text}")
-            
+                trace.info(f"  {i+1}. Link: {href} - Text: {link_text}")
+
             # Use the first link
             company_href = links[0].get("href")
-            
+
             # Make sure it's a full URL
             if company_href.startswith("/"):
                 company_href = BASE_URL + company_href
-            
-            st.success(f"✅ Found company page: {company_href}")
+
+            trace.success(f"✅ Found company page: {company_href}")
             return company_href
-    
-    st.error("❌ No company links found in search results")
-    
-    # DEBUG: Show what links ARE there
-    with st.expander("🔍 DEBUG: All links found on search page"):
-        all_links = soup.find_all("a", href=True)
-        for link in all_links[:20]:  # Show first 20 links
-            st.write(f"- {link.get('href')} → {link.get_text(strip=True)[:50]}")
-    
+
+    # DEBUG: Keep what links ARE there
+    all_links = [
+        f"{link.get('href')} → {link.get_text(strip=True)[:50]}"
+        for link in soup.find_all("a", href=True)[:20]  # First 20 links
+    ]
+    trace.error("❌ No company links found in search results", data=all_links)
+
     return None
 
-def _parse_financial_table(soup):
+def _table_headers_text(table):
+    """Header cells plus the first (label) cell of every row, lowercased."""
+    cells = table.find_all("th")
+    for row in table.find_all("tr"):
+        first = row.find(["th", "td"])
+        if first is not None and first.name == "td":
+            cells.append(first)
+    return " ".join(c.get_text(" ", strip=True) for c in cells).lower()
+
+def _find_financial_table(tables, trace, by_headers=True):
+    # Headers and row labels first: no need to flatten every table
+    if by_headers:
+        for idx, table in enumerate(tables):
+            if any(word in _table_headers_text(table) for word in FINANCIAL_KEYWORDS):
+                trace.info(f"✅ Found financial table by headers (table #{idx+1})")
+                return table
+
+    # Fallback: look for financial keywords anywhere in the table
+    for idx, table in enumerate(tables):
+        table_text = table.get_text().lower()
+        if any(word in table_text for word in FINANCIAL_KEYWORDS):
+            trace.info(f"✅ Found financial table (table #{idx+1})")
+            return table
+    return None
+
+def parse_financial_page(html, trace=None, fast=True):
+    """
+    Financial fields from a Proff company page.
+
+    fast=True cuts the <table> elements out of the page source, parses only
+    those (with lxml if installed) and finds the financial table by its
+    headers. fast=False parses the whole
+    page with html.parser and scans full table text, as before; it is also
+    used when the fast parse finds no tables in a page that has some.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    trace = trace or _Trace()
+    if fast:
+        soup = BeautifulSoup(_fragments(html, "table"), HTML_PARSER, parse_only=SoupStrainer("table"))
+        if soup.find("table") is not None or "<table" not in html.lower():
+            return _parse_financial_table(soup, trace, by_headers=True)
+        trace.warning("⚠️ Fast parse found no tables, retrying with html.parser")
+
+    soup = BeautifulSoup(html, "html.parser")
+    return _parse_financial_table(soup, trace, by_headers=False)
+
+def _parse_financial_table(soup, trace, by_headers=False):
     """
     Parse financial table
     """
-    st.write("💰 Parsing financial data...")
-    
+    trace.info("💰 Parsing financial data...")
+
     data = {}
     tables = soup.find_all("table")
-    st.write(f"📊 Found {len(tables)} tables")
-    
+    trace.info(f"📊 Found {len(tables)} tables")
+
     if not tables:
-        st.warning("⚠️ No tables found on page")
+        trace.warning("⚠️ No tables found on page")
         return data
-    
+
     # Try to find the financial table
-    financial_table = None
-    for idx, table in enumerate(tables):
-        # Look for table with financial keywords
-        table_text = table.get_text().lower()
-        if any(word in table_text for word in ["resultat", "inntekt", "eiendel", "driftsinntekt"]):
-            financial_table = table
-            st.write(f"✅ Found financial table (table #{idx+1})")
-            break
-    
+    financial_table = _find_financial_table(tables, trace, by_headers)
+
     if not financial_table:
-        st.warning("⚠️ No financial table found")
-        
-        # DEBUG: Show what's in the tables
-        with st.expander("🔍 DEBUG: Table contents"):
-            for idx, table in enumerate(tables[:3]):  # First 3 tables
-                st.write(f"**Table {idx+1}:**")
-                rows = table.find_all("tr")[:5]  # First 5 rows
-                for row in rows:
-                    cells = [c.get_text(strip=True) for c in row.find_all(["th", "td"])]
-                    st.write(cells)
-        
+        # DEBUG: Keep what's in the tables
+        contents = {}
+        for idx, table in enumerate(tables[:3]):  # First 3 tables
+            rows = table.find_all("tr")[:5]  # First 5 rows
+            contents[f"Table {idx+1}"] = [
+                [c.get_text(strip=True) for c in row.find_all(["th", "td"])]
+                for row in rows
+            ]
+        trace.warning("⚠️ No financial table found", data=contents)
+
         return data
-    
+
     # Extract years
     years = []
     for th in financial_table.find_all("th"):
         year_match = re.search(r"(202\d)", th.get_text())
         if year_match:
             years.append(year_match.group(1))
-    
+
     years = list(dict.fromkeys(years))  # Remove duplicates, keep order
-    st.write(f"📅 Years found: {years}")
-    
+    trace.info(f"📅 Years found: {years}")
+
     # Parse rows
     for row in financial_table.find_all("tr"):
         cells = row.find_all(["th", "td"])
         if len(cells) < 2:
             continue
-        
+
         label = cells[0].get_text(strip=True).lower()
-        
+
         for i, year in enumerate(years):
             if i + 1 >= len(cells):
                 continue
-            
+
             value = cells[i + 1].get_text(strip=True)
             if not value or value == "-":
                 continue
-            
+
             # Clean the value
             clean_value = re.sub(r"[^\d\-,]", "", value.replace(" ", ""))
-            
+
             # Match financial fields
             if "sum driftsinntekt" in label or "driftsinntekter" in label:
                 data[f"sum_driftsinnt_{year}"] = clean_value
-                st.write(f"  ✓ Revenue {year}: {clean_value}")
+                trace.info(f"  ✓ Revenue {year}: {clean_value}")
             elif "driftsresultat" in label and "før" not in label:
                 data[f"driftsresultat_{year}"] = clean_value
-                st.write(f"  ✓ Operating result {year}: {clean_value}")
+                trace.info(f"  ✓ Operating result {year}: {clean_value}")
             elif "resultat før skatt" in label or "ordinært resultat før skatt" in label:
                 data[f"ord_res_f_skatt_{year}"] = clean_value
-                st.write(f"  ✓ Result before tax {year}: {clean_value}")
+                trace.info(f"  ✓ Result before tax {year}: {clean_value}")
             elif "sum eiendeler" in label:
                 data[f"sum_eiendeler_{year}"] = clean_value
-                st.write(f"  ✓ Total assets {year}: {clean_value}")
-    
+                trace.info(f"  ✓ Total assets {year}: {clean_value}")
+
     return data
 
-@lru_cache(maxsize=1024)
-def fetch_proff_info(org_number: str) -> dict:
+def lookup_proff(org_number: str) -> dict:
     """
-    Fetch financial data from Proff.no using organization number.
-    Returns revenue, operating result, result before tax, and total assets for 2024, 2023, 2022.
+    Fetch financial data from Proff.no using organization number,
+    without rendering anything.
+
+    Returns:
+        {
+            "data": {field: value},   # revenue, operating result, result
+                                      # before tax, total assets per year
+            "company_url": str or None,
+            "error": str or None,     # why nothing was fetched
+            "retry": bool,            # an HTTP request failed; not cached
+            "events": [{"level", "message"[, "data"]}, ...],
+        }
+        The result is cached and shared; don't modify it.
     """
-    st.write("=" * 50)
-    st.write("🚀 FETCHING FINANCIAL DATA FROM PROFF.NO")
-    st.write("=" * 50)
-    
+    with _cache_lock:
+        if org_number in _cache:
+            _cache.move_to_end(org_number)
+            _cache_stats["hits"] += 1
+            return _cache[org_number]
+        _cache_stats["misses"] += 1
+
+    trace = _Trace()
+    result = {"data": {}, "company_url": None, "error": None, "retry": False, "events": trace.events}
+    _lookup_proff(org_number, trace, result)
+    result["retry"] = trace.fetch_failed
+
+    with _cache_lock:
+        if result["retry"]:
+            _cache_stats["not_cached"] += 1
+        else:
+            _cache[org_number] = result
+            while len(_cache) > PROFF_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return result
+
+
+def clear_proff_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def proff_cache_stats() -> dict:
+    with _cache_lock:
+        return dict(_cache_stats, maxsize=PROFF_CACHE_SIZE, currsize=len(_cache))
+
+
+def _lookup_proff(org_number: str, trace, result):
+    """Fill `result` for lookup_proff (returns early when a step fails)."""
+    trace.info("🚀 FETCHING FINANCIAL DATA FROM PROFF.NO")
+
     if not org_number or not org_number.isdigit():
-        st.error("❌ Invalid org number")
-        return {}
-    
+        trace.error("❌ Invalid org number")
+        result["error"] = "Ugyldig organisasjonsnummer"
+        return
+
     # Find the company page URL via search
-    company_url = _find_company_page_from_search(org_number)
-    
+    company_url = _find_company_page_from_search(org_number, trace)
+
     if not company_url:
-        st.error("❌ Could not find company page")
-        return {}
-    
+        trace.error("❌ Could not find company page")
+        result["error"] = "Fant ikke selskapssiden"
+        return
+    result["company_url"] = company_url
+
     # Now fetch the ACTUAL company page
-    st.write("📄 Fetching company page...")
-    html = _safe_get(company_url)
-    
+    trace.info("📄 Fetching company page...")
+    with metrics.span("proff.page"):
+        html = _safe_get(company_url, trace)
+
     if not html:
-        st.error("❌ Could not fetch company page")
-        return {}
-    
-    soup = BeautifulSoup(html, "html.parser")
-    
+        trace.error("❌ Could not fetch company page")
+        result["error"] = "Kunne ikke hente selskapssiden"
+        return
+
     out = {}
     try:
         # Parse financial data
-        financial_data = _parse_financial_table(soup)
+        with metrics.span("proff.parse"):
+            financial_data = parse_financial_page(html, trace)
         out.update(financial_data)
-        
+
     except Exception as e:
-        st.error(f"❌ Parsing error: {e}")
-        import traceback
-        st.code(traceback.format_exc())
-    
-    st.write("=" * 50)
-    st.write(f"✅ DONE! Fetched {len(out)} financial fields")
-    st.write("=" * 50)
-    
+        trace.error(f"❌ Parsing error: {e}", data=traceback.format_exc())
+
+    trace.info(f"✅ DONE! Fetched {len(out)} financial fields")
+
     if out:
-        st.json(out)
+        trace.success("Financial data", data=out)
     else:
-        st.warning("⚠️ No financial data was extracted")
-        st.info("💡 This company might not have financial data on Proff.no")
-    
-    return out
\ No newline at end of file
+        trace.warning("⚠️ No financial data was extracted")
+        trace.info("💡 This company might not have financial data on Proff.no")
+        result["error"] = "Ingen finansielle data funnet"
+
+    result["data"] = out
+
+
+metrics.register_source("proff_lookup_cache", proff_cache_stats)
+
+
+def fetch_proff_info(org_number: str) -> dict:
+    """
+    Fetch financial data from Proff.no using organization number.
+    Returns revenue, operating result, result before tax, and total assets for 2024, 2023, 2022.
+    """
+    return dict(lookup_proff(org_number)["data"])
+
+
+# ---------------------------------------------------------
+# RENDERING
+# ---------------------------------------------------------
+def format_trace(events) -> str:
+    """Plain-text version of the diagnostic events (one line per event)."""
+    lines = []
+    for event in events:
+        lines.append(f"[{event['level']}] {event['message']}")
+        if "data" in event:
+            data = event["data"]
+            text = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, indent=2)
+            lines.extend("    " + line for line in text.splitlines())
+    return "\n".join(lines)
+
+
+def render_trace(events, expanded=False):
+    """Show the whole trace in one expander (a single element)."""
+    import streamlit as st
+
+    with st.expander(f"🔍 Proff.no-logg ({len(events)} hendelser)", expanded=expanded):
+        st.code(format_trace(events), language=None)
@@ -1,7 +1,13 @@
 
-import streamlit as st
-import requests
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+from app_modules import http_client, metrics
+
+# Configurable so tests and load tests can point at local stand-ins
+WIKIPEDIA_BASE_URL = os.environ.get("WIKIPEDIA_BASE_URL", "https://no.wikipedia.org").rstrip("/")
+DUCKDUCKGO_URL = os.environ.get("DUCKDUCKGO_URL", "https://api.duckduckgo.com/")
 
 
 def _clean_text(t: str) -> str:
@@ -15,6 +21,7 @@ def _clean_text(t: str) -> str:
 # ---------------------------------------------------------
 # 1) Brønnøysund-based summary (most reliable)
 # ---------------------------------------------------------
+@metrics.timed("summary.brreg")
 def summary_from_brreg(data: dict) -> str:
     """
     Creates a simple summary using Brønnøysund data.
@@ -58,6 +65,7 @@ def summary_from_brreg(data: dict) -> str:
 # ---------------------------------------------------------
 # 2) Wikipedia summary (if available)
 # ---------------------------------------------------------
+@metrics.timed("summary.wikipedia")
 def summary_from_wikipedia(name: str) -> str:
     """
     Attempts to fetch a short summary from Wikipedia.
@@ -68,8 +76,8 @@ def summary_from_wikipedia(name: str) -> str:
         return ""
 
     try:
-        url = f"https://no.wikipedia.org/api/rest_v1/page/summary/{name}"
-        r = requests.get(url, timeout=10)
+        url = f"{WIKIPEDIA_BASE_URL}/api/rest_v1/page/summary/{name}"
+        r = http_client.get(url, timeout=10)
 
         if r.status_code == 200:
             data = r.json()
@@ -85,6 +93,7 @@ def summary_from_wikipedia(name: str) -> str:
 # ---------------------------------------------------------
 # 3) DuckDuckGo fallback summary
 # ---------------------------------------------------------
+@metrics.timed("summary.duckduckgo")
 def summary_from_duckduckgo(query: str) -> str:
     """
     Fallback summary using DuckDuckGo Instant Answer API.
@@ -94,8 +103,8 @@ def summary_from_duckduckgo(query: str) -> str:
         return ""
 
     try:
-        url = "https://api.duckduckgo.com/"
-        r = requests.get(url, params={"q": query, "format": "json"}, timeout=10)
+        url = DUCKDUCKGO_URL
+        r = http_client.get(url, params={"q": query, "format": "json"}, timeout=10)
 
         if r.status_code == 200:
             abstract = r.json().get("AbstractText", "")
@@ -110,6 +119,7 @@ def summary_from_duckduckgo(query: str) -> str:
 # ---------------------------------------------------------
 # MASTER FUNCTION — used by the app
 # ---------------------------------------------------------
+@metrics.timed("summary")
 def generate_company_summary(company_data: dict) -> str:
     """
     Attempts summary in this order:
@@ -117,6 +127,9 @@ def generate_company_summary(company_data: dict) -> str:
     2) Wikipedia summary
     3) DuckDuckGo summary
     4) Fallback to Brønnøysund summary again
+
+    Wikipedia and DuckDuckGo are queried at the same time, so a slow
+    or failing Wikipedia lookup doesn't add to the DuckDuckGo wait.
     """
 
     # 1) Brønnøysund summary
@@ -124,16 +137,23 @@ def generate_company_summary(company_data: dict) -> str:
     if len(base) > 40:
         return base
 
-    # 2) Wikipedia
+    # 2) + 3) Wikipedia, then DuckDuckGo (fetched concurrently)
     name = company_data.get("company_name", "")
-    wiki = summary_from_wikipedia(name)
-    if len(wiki) > 40:
-        return wiki
+    pool = ThreadPoolExecutor(max_workers=2)
+    try:
+        wiki_future = pool.submit(summary_from_wikipedia, name)
+        ddg_future = pool.submit(summary_from_duckduckgo, name)
+
+        wiki = wiki_future.result()
+        if len(wiki) > 40:
+            return wiki
 
-    # 3) DuckDuckGo
-    ddg = summary_from_duckduckgo(name)
-    if len(ddg) > 40:
-        return ddg
+        ddg = ddg_future.result()
+        if len(ddg) > 40:
+            return ddg
+    finally:
+        # Don't wait for DuckDuckGo when Wikipedia already answered
+        pool.shutdown(wait=False)
 
     # 4) Fallback
     return base or "Ingen tilgjengelig selskapsbeskrivelse."
@@ -143,6 +163,8 @@ def generate_company_summary(company_data: dict) -> str:
 # PAGE VIEW (so it works as a selectable page)
 # ---------------------------------------------------------
 def run():
+    import streamlit as st
+
     st.title("📝 Summary Module")
     st.write("Dette modulen genererer selskapsbeskrivelser fra flere kilder.")
     st.info("Brukes av hovedsiden for å lage 'Om oss'‑tekst.")
@@ -0,0 +1,12 @@
+# app_modules/Sheets/Yrkesskade/mapping.py
+"""
+Mapping configuration for the Yrkesskade (Occupational injury) sheet.
+(format: see Sheets/mapping_engine.py)
+"""
+
+SHEET = "Yrkesskade"
+
+FIELDS = {
+    # Man-years and persons per job category (from row 4) are not in
+    # BRREG's employee count; filled in by the broker
+}
@@ -0,0 +1,156 @@
+# app_modules/Sheets/fill_plan.py
+"""
+Fill plan: everything fill_excel needs to know about a template that does
+not depend on the company being filled in.
+
+A plan is compiled once per template (keyed by SHA-256) and reused by every
+fill, so per-fill work only depends on the number of mapped fields:
+
+- the writes of the compiled sheet mappings (sheet_config) that apply to
+  this template: one flat (sheet, cell, slot) list across all sheets,
+  headline cells and missing sheets left out
+- the summary anchor: the first "skriv her" cell on the first sheet that
+  the mapping doesn't overwrite (None -> A46)
+- mapped sheets that are missing from the template
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+# openpyxl is imported inside the functions that use it: it is the
+# slowest import in the app and the first page doesn't need it
+
+from app_modules.Sheets.sheet_config import COMPILED_MAPPINGS
+
+logger = logging.getLogger(__name__)
+
+HEADLINE_COLORS = ["FF0BD7B5", "0BD7B5"]
+SUMMARY_PLACEHOLDER = "skriv her"
+SUMMARY_FALLBACK_CELL = "A46"
+
+# Plans kept in memory (one per template version)
+PLAN_CACHE_SIZE = 8
+
+_plans = OrderedDict()
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------
+# COMPILE
+# ---------------------------------------------------------
+def _is_headline(cell) -> bool:
+    from openpyxl.styles import PatternFill
+
+    # Skip cells with headline colors (headers)
+    fill = cell.fill
+    return bool(
+        fill and isinstance(fill, PatternFill)
+        and fill.fgColor and fill.fgColor.rgb
+        and fill.fgColor.rgb.upper() in HEADLINE_COLORS
+    )
+
+
+def compile_fill_plan(template_bytes: bytes) -> dict:
+    """
+    Inspect a template once.
+
+    Returns:
+        {
+            "sha256": str,
+            "first_sheet": str,
+            "writes": [(sheet_name, cell_ref, slot), ...],    # writable
+            "headline_cells": {sheet_name: [cell_ref, ...]},  # skipped
+            "missing_sheets": [sheet_name, ...],
+            "summary_anchor": cell_ref or None,
+        }
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.cell import coordinate_to_tuple
+
+    wb = load_workbook(filename=BytesIO(template_bytes))
+
+    writes, headline_cells, missing = [], {}, []
+    for sheet_name, cell_ref, slot in COMPILED_MAPPINGS["writes"]:
+        if sheet_name not in wb.sheetnames:
+            if sheet_name not in missing:
+                missing.append(sheet_name)
+            continue
+
+        if _is_headline(wb[sheet_name][cell_ref]):
+            headline_cells.setdefault(sheet_name, []).append(cell_ref)
+        else:
+            writes.append((sheet_name, cell_ref, slot))
+
+    if missing:
+        logger.warning("Template is missing mapped sheets: %s", ", ".join(missing))
+
+    # First placeholder that survives the mapped writes
+    first_sheet = wb.sheetnames[0]
+    overwritten = {coordinate_to_tuple(ref) for sheet_name, ref, _ in writes if sheet_name == first_sheet}
+    anchor = None
+    for row in wb[first_sheet].iter_rows():
+        for cell in row:
+            if (
+                isinstance(cell.value, str)
+                and SUMMARY_PLACEHOLDER in cell.value.lower()
+                and (cell.row, cell.column) not in overwritten
+            ):
+                anchor = cell.coordinate
+                break
+        if anchor:
+            break
+
+    return {
+        "sha256": hashlib.sha256(template_bytes).hexdigest(),
+        "first_sheet": first_sheet,
+        "writes": writes,
+        "headline_cells": headline_cells,
+        "missing_sheets": missing,
+        "summary_anchor": anchor,
+    }
+
+
+def get_fill_plan(template_bytes: bytes) -> dict:
+    """
+    Cached compile_fill_plan (per template SHA-256).
+    The returned dict is shared; don't modify it.
+    """
+    sha = hashlib.sha256(template_bytes).hexdigest()
+    with _lock:
+        plan = _plans.get(sha)
+        if plan is not None:
+            _plans.move_to_end(sha)
+            return plan
+
+    plan = compile_fill_plan(template_bytes)
+    with _lock:
+        _plans[sha] = plan
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+# ---------------------------------------------------------
+# PER FILL
+# ---------------------------------------------------------
+def summary_anchor(plan: dict, first_sheet_values: dict) -> str:
+    """
+    Cell for the summary text, given the values written to the first sheet
+    in this fill ({cell_ref: value}).
+
+    A written value that itself contains "skriv her" counts as a
+    placeholder too, so the result matches scanning the sheet after the
+    mapped writes.
+    """
+    from openpyxl.utils.cell import coordinate_to_tuple
+
+    candidates = []
+    if plan["summary_anchor"]:
+        candidates.append(coordinate_to_tuple(plan["summary_anchor"]) + (plan["summary_anchor"],))
+    for ref, value in first_sheet_values.items():
+        if isinstance(value, str) and SUMMARY_PLACEHOLDER in value.lower():
+            candidates.append(coordinate_to_tuple(ref) + (ref,))
+    return min(candidates)[2] if candidates else SUMMARY_FALLBACK_CELL
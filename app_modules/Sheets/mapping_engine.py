@@ -0,0 +1,136 @@
+# app_modules/Sheets/mapping_engine.py
+"""
+Declarative sheet mappings, compiled into one flat write list.
+
+Each sheet package declares its mapping in mapping.py:
+
+    SHEET = "Sammendrag"            # sheet name in the template
+    FIELDS = {
+        "address": "B5",                                        # one cell
+        "sum_driftsinnt_2024": ["D3", "E11"],                   # several cells
+        "company_name": {"cells": "B3", "source": ("company_name", "name")},
+        "annual_revenue": {"cells": "B3", "source": ("sum_driftsinnt_2024",),
+                           "transform": "thousands"},
+    }
+
+    cells      cell reference or list of them
+    source     field_values keys to try in order; the first non-empty
+               value is used (default: the field name itself)
+    transform  name in TRANSFORMS, or a callable value -> value; applied
+               to non-empty values only (default: the value as is)
+
+compile_mappings() turns all sheets' FIELDS into value slots, one per
+distinct (source, transform), and (sheet, cell, slot) writes. A field
+written to several cells, or the same source and transform used on
+several sheets, is one slot: evaluate() computes it once per fill,
+however many sheets use it.
+"""
+
+import re
+
+_CELL_RE = re.compile(r"^[A-Z]{1,3}[1-9]\d*$")
+
+
+# ---------------------------------------------------------
+# TRANSFORMS
+# ---------------------------------------------------------
+def _thousands(value):
+    """Proff.no amounts are in NOK 1000: "26624" -> 26624000."""
+    digits = str(value).replace(" ", "").replace("\xa0", "")
+    if re.fullmatch(r"-?\d+", digits):
+        return int(digits) * 1000
+    return value
+
+
+TRANSFORMS = {
+    "thousands": _thousands,
+}
+
+
+# ---------------------------------------------------------
+# COMPILE
+# ---------------------------------------------------------
+def _normalize(sheet_name: str, field: str, spec) -> tuple:
+    """(cells, source, transform) for one FIELDS entry."""
+    if isinstance(spec, (str, list, tuple)):
+        spec = {"cells": spec}
+    if not isinstance(spec, dict) or "cells" not in spec:
+        raise ValueError(f"{sheet_name}.{field}: expected a cell, a list of cells or a dict with 'cells'")
+
+    cells = [spec["cells"]] if isinstance(spec["cells"], str) else list(spec["cells"])
+    for ref in cells:
+        if not _CELL_RE.match(ref):
+            raise ValueError(f"{sheet_name}.{field}: invalid cell reference {ref!r}")
+
+    source = spec.get("source", (field,))
+    source = (source,) if isinstance(source, str) else tuple(source)
+
+    transform = spec.get("transform")
+    if isinstance(transform, str):
+        if transform not in TRANSFORMS:
+            raise ValueError(f"{sheet_name}.{field}: unknown transform {transform!r}")
+        transform = TRANSFORMS[transform]
+    return cells, source, transform
+
+
+def compile_mappings(mappings: dict) -> dict:
+    """
+    Compile {sheet_name: FIELDS} (see the module docstring).
+
+    Returns:
+        {
+            "slots": [(source_keys, transform or None), ...],
+            "writes": [(sheet_name, cell_ref, slot), ...],   # in mapping order
+            "fields": {sheet_name: {field: slot}},
+        }
+
+    Raises:
+        ValueError for malformed entries or a cell mapped twice on a sheet.
+    """
+    slots, slot_index, writes, fields = [], {}, [], {}
+    for sheet_name, sheet_fields in mappings.items():
+        fields[sheet_name] = {}
+        seen = {}
+        for field, spec in sheet_fields.items():
+            cells, source, transform = _normalize(sheet_name, field, spec)
+
+            key = (source, transform)
+            if key not in slot_index:
+                slot_index[key] = len(slots)
+                slots.append(key)
+            slot = slot_index[key]
+            fields[sheet_name][field] = slot
+
+            for ref in cells:
+                if ref in seen:
+                    raise ValueError(f"{sheet_name}!{ref} is mapped by both {seen[ref]} and {field}")
+                seen[ref] = field
+                writes.append((sheet_name, ref, slot))
+
+    return {"slots": slots, "writes": writes, "fields": fields}
+
+
+# ---------------------------------------------------------
+# PER FILL
+# ---------------------------------------------------------
+def _value(slot_def: tuple, field_values: dict):
+    source, transform = slot_def
+    for key in source:
+        if field_values.get(key):
+            value = field_values[key]
+            return transform(value) if transform is not None else value
+    return ""
+
+
+def evaluate(compiled: dict, field_values: dict) -> list:
+    """Every slot's value for one company (index = slot)."""
+    return [_value(slot_def, field_values) for slot_def in compiled["slots"]]
+
+
+def sheet_values(compiled: dict, sheet_name: str, field_values: dict) -> dict:
+    """{field: value} for one sheet's fields (only its slots are computed)."""
+    slots = compiled["slots"]
+    return {
+        field: _value(slots[slot], field_values)
+        for field, slot in compiled["fields"].get(sheet_name, {}).items()
+    }
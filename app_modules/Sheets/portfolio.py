@@ -0,0 +1,133 @@
+# app_modules/Sheets/portfolio.py
+"""
+Portfolio workbook: one row per company, the Sammendrag fields as columns.
+
+Rows go through the compiled Sammendrag mapping (Sammendrag/mapping.py),
+the same one fill_excel uses, so a company's row shows what its own
+workbook would. Financials mapped to two places in the template are one
+column each; financial values are written as numbers so the sheet can be
+sorted and summed.
+
+The workbook is streamed with openpyxl's write-only mode: each row is
+written to a temp file as it is added, so memory stays flat however many
+companies there are (the finished file is assembled on close()).
+"""
+
+import os
+import re
+
+from app_modules.Sheets.Sammendrag.mapping import FIELDS, SHEET
+from app_modules.Sheets.sheet_config import transform_for_sheet
+
+PORTFOLIO_SHEET = "Portefølje"
+
+FIELD_LABELS = {
+    "company_name": "Selskapsnavn",
+    "org_number": "Organisasjonsnummer",
+    "address": "Adresse",
+    "post_nr": "Postnummer",
+    "city": "Poststed",
+    "employees": "Antall ansatte",
+    "nace_code": "NACE-kode",
+    "nace_description": "NACE-beskrivelse",
+}
+
+# Financial field prefix -> column label (the year is appended)
+FINANCIAL_LABELS = {
+    "sum_driftsinnt": "Driftsinntekter",
+    "driftsresultat": "Driftsresultat",
+    "ord_res_f_skatt": "Resultat før skatt",
+    "sum_eiendeler": "Sum eiendeler",
+}
+
+PORTFOLIO_FIELDS = list(FIELDS)
+NOTE_LABEL = "Merknad"
+
+COLUMN_WIDTHS = {"company_name": 36, "address": 30, "nace_description": 40}
+DEFAULT_WIDTH = 16
+
+_FINANCIAL_RE = re.compile(rf"^({'|'.join(FINANCIAL_LABELS)})_(\d{{4}})$")
+_NUMBER_RE = re.compile(r"^-?\d+(,\d+)?$")
+
+
+def column_label(field: str) -> str:
+    match = _FINANCIAL_RE.match(field)
+    if match:
+        return f"{FINANCIAL_LABELS[match.group(1)]} {match.group(2)}"
+    return FIELD_LABELS.get(field, field)
+
+
+def _number(value):
+    """Proff.no amounts ("-1234", "12,5") as numbers; anything else unchanged."""
+    if isinstance(value, str) and _NUMBER_RE.match(value):
+        return float(value.replace(",", ".")) if "," in value else int(value)
+    return value
+
+
+def portfolio_row(fields: dict, note: str = "") -> list:
+    """One company's row: PORTFOLIO_FIELDS from the Sammendrag mapping, then the note."""
+    data = transform_for_sheet(SHEET, fields or {})
+    row = []
+    for field in PORTFOLIO_FIELDS:
+        value = data.get(field, "")
+        row.append(_number(value) if _FINANCIAL_RE.match(field) else value)
+    row.append(note)
+    return row
+
+
+class PortfolioWriter:
+    """
+    Streams a portfolio workbook to `path`.
+
+        with PortfolioWriter("portefolje.xlsx") as writer:
+            for fields in companies:
+                writer.add(fields)
+
+    The file is written to <path>.part and moved into place on close(),
+    so a crashed run never leaves a half-written workbook at `path`.
+    """
+
+    def __init__(self, path: str):
+        from openpyxl import Workbook  # deferred like in excel_filler
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        self.path = path
+        self.rows = 0
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(PORTFOLIO_SHEET)
+        self._ws.freeze_panes = "A2"
+
+        columns = PORTFOLIO_FIELDS + [NOTE_LABEL]
+        self._last_column = get_column_letter(len(columns))
+        for i, field in enumerate(columns, 1):
+            self._ws.column_dimensions[get_column_letter(i)].width = COLUMN_WIDTHS.get(field, DEFAULT_WIDTH)
+
+        # Column dimensions must be set before the first row is written
+        header = []
+        for field in columns:
+            cell = WriteOnlyCell(self._ws, value=column_label(field))
+            cell.font = Font(bold=True)
+            header.append(cell)
+        self._ws.append(header)
+
+    def add(self, fields: dict, note: str = ""):
+        """Append one company (fields as merged by enrich_company)."""
+        self._ws.append(portfolio_row(fields, note))
+        self.rows += 1
+
+    def close(self):
+        if self._wb is None:
+            return
+        self._ws.auto_filter.ref = f"A1:{self._last_column}{self.rows + 1}"
+        tmp_path = self.path + ".part"
+        self._wb.save(tmp_path)
+        self._wb = None
+        os.replace(tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,69 +1,54 @@
 # app_modules/Sheets/sheet_config.py
 """
 Centralized configuration for all Excel sheets.
-This file imports and aggregates all sheet mappings.
+This file imports and aggregates all sheet mappings and compiles them
+once into a flat write list (see mapping_engine.py).
 """
 
-# Import only Sammendrag mapping (the only one that exists)
-from app_modules.Sheets.Sammendrag.mapping import (
-    CELL_MAP as SAMMENDRAG_MAP,
-    transform_data as transform_sammendrag
-)
+from app_modules.Sheets.mapping_engine import compile_mappings, sheet_values
+from app_modules.Sheets.Sammendrag import mapping as sammendrag
+from app_modules.Sheets.Alminnelig_ansvar import mapping as alminnelig_ansvar
+from app_modules.Sheets.Prosjekt_entreprenør import mapping as prosjekt_entreprenor
+from app_modules.Sheets.Fordon import mapping as fordon
+from app_modules.Sheets.Yrkesskade import mapping as yrkesskade
+from app_modules.Sheets.Helse import mapping as helse
 
 
 # Master mapping: Excel sheet name -> field mappings
-# This maps the actual Excel sheet names to their cell mappings
+# This maps the actual Excel sheet names to their declarative FIELDS
 SHEET_MAPPINGS = {
-    "Sammendrag": SAMMENDRAG_MAP,
-    # Add other sheets here when you create their mapping files
+    m.SHEET: m.FIELDS
+    for m in (sammendrag, alminnelig_ansvar, prosjekt_entreprenor, fordon, yrkesskade, helse)
 }
 
-
-# Master transform functions: sheet name -> transform function
-SHEET_TRANSFORMS = {
-    "Sammendrag": transform_sammendrag,
-    # Add other sheets here when you create their mapping files
-}
+# All sheets compiled at import: {"slots", "writes", "fields"}
+COMPILED_MAPPINGS = compile_mappings(SHEET_MAPPINGS)
 
 
 def get_sheet_mapping(sheet_name: str) -> dict:
     """
-    Get the cell mapping for a specific sheet.
-    
-    Args:
-        sheet_name: Name of the Excel sheet
-        
-    Returns:
-        Dictionary mapping field names to cell references
-    """
-    return SHEET_MAPPINGS.get(sheet_name, {})
+    Get the field mapping for a specific sheet.
 
-
-def get_transform_function(sheet_name: str):
-    """
-    Get the transform function for a specific sheet.
-    
     Args:
         sheet_name: Name of the Excel sheet
-        
+
     Returns:
-        Transform function or None if not found
+        Dictionary mapping field names to cell specs (FIELDS)
     """
-    return SHEET_TRANSFORMS.get(sheet_name)
+    return SHEET_MAPPINGS.get(sheet_name, {})
 
 
 def transform_for_sheet(sheet_name: str, data: dict) -> dict:
     """
-    Transform data for a specific sheet using its transform function.
-    
+    Values of one sheet's fields for this data.
+    The fill engines evaluate all sheets at once instead
+    (mapping_engine.evaluate); this is for single-sheet use.
+
     Args:
         sheet_name: Name of the Excel sheet
         data: Raw data dictionary
-        
+
     Returns:
-        Transformed data dictionary
+        {field_name: value}
     """
-    transform_func = get_transform_function(sheet_name)
-    if transform_func:
-        return transform_func(data)
-    return data
\ No newline at end of file
+    return sheet_values(COMPILED_MAPPINGS, sheet_name, data)
@@ -0,0 +1,348 @@
+# app_modules/Sheets/xml_filler.py
+"""
+Direct XML fill engine: patches the xlsx zip without openpyxl.
+
+openpyxl's load_workbook/save parse and re-serialize every sheet, style and
+shared string. We only change ~40 cells, so this engine:
+
+- copies every untouched zip part byte-for-byte
+- rewrites only the <row> elements of the affected worksheet XML
+  (all other rows are copied as string slices)
+- writes strings as inline strings, like openpyxl does, so
+  sharedStrings.xml is copied unchanged
+- appends one cell style (xf) for the summary cell's wrap/top alignment
+- takes the writable cells and summary anchor from the template's
+  fill plan (see fill_plan.py), shared with the openpyxl path
+
+Anything it can't patch safely (prefixed XML namespaces, formula cells
+in the write set, rows without r="") raises XmlFillUnsupported, and
+fill_excel falls back to openpyxl.
+"""
+
+import re
+import zipfile
+from io import BytesIO
+from xml.etree import ElementTree as ET
+
+from app_modules.Sheets.fill_plan import get_fill_plan, summary_anchor
+from app_modules.Sheets.mapping_engine import evaluate
+from app_modules.Sheets.sheet_config import COMPILED_MAPPINGS
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+SUMMARY_ALIGNMENT = '<alignment vertical="top" wrapText="1"/>'
+
+# Same rules openpyxl applies when a value is assigned
+_ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+_ERROR_CODES = ("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A")
+
+_SHEET_DATA_RE = re.compile(r"<sheetData\b[^>]*?(?:/>|>(.*?)</sheetData>)", re.S)
+_ROW_RE = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_CELL_RE = re.compile(r"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.S)
+_ATTR_RE = re.compile(r"""([\w:]+)\s*=\s*(["'])(.*?)\2""", re.S)
+_REF_RE = re.compile(r"^([A-Z]{1,3})(\d+)$")
+
+
+class XmlFillUnsupported(Exception):
+    """The template uses a construct this engine doesn't patch."""
+
+
+# ---------------------------------------------------------
+# HELPERS
+# ---------------------------------------------------------
+def _split_ref(ref: str):
+    m = _REF_RE.match(ref.upper())
+    if not m:
+        raise XmlFillUnsupported(f"Ugyldig cellereferanse: {ref}")
+    col = 0
+    for ch in m.group(1):
+        col = col * 26 + (ord(ch) - 64)
+    return int(m.group(2)), col
+
+
+def _attrs(attr_text: str) -> dict:
+    return {m.group(1): m.group(3) for m in _ATTR_RE.finditer(attr_text or "")}
+
+
+def _resolve_target(base_dir: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    parts = (base_dir + "/" + target).split("/") if base_dir else target.split("/")
+    out = []
+    for p in parts:
+        if p == "..":
+            if out:
+                out.pop()
+        elif p and p != ".":
+            out.append(p)
+    return "/".join(out)
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _cell_xml(ref: str, style, value) -> str:
+    """Serialize one <c> the way openpyxl would write the assigned value."""
+    s_attr = f' s="{style}"' if style not in (None, "", "0") else ""
+
+    if value is None or value == "":
+        return f'<c r="{ref}"{s_attr}/>'
+
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{s_attr} t="b"><v>{int(value)}</v></c>'
+
+    if isinstance(value, int):
+        return f'<c r="{ref}"{s_attr} t="n"><v>{value}</v></c>'
+
+    if isinstance(value, float):
+        return f'<c r="{ref}"{s_attr} t="n"><v>{repr(value)}</v></c>'
+
+    if not isinstance(value, str):
+        raise XmlFillUnsupported(f"Verditype støttes ikke: {type(value).__name__}")
+
+    value = value[:32767]
+    if _ILLEGAL_CHARACTERS_RE.search(value):
+        raise ValueError(f"{value} cannot be used in worksheets.")
+
+    if len(value) > 1 and value.startswith("="):
+        return f'<c r="{ref}"{s_attr}><f>{_escape(value[1:])}</f></c>'
+    if value in _ERROR_CODES:
+        return f'<c r="{ref}"{s_attr} t="e"><v>{_escape(value)}</v></c>'
+
+    return (
+        f'<c r="{ref}"{s_attr} t="inlineStr"><is>'
+        f'<t xml:space="preserve">{_escape(value)}</t></is></c>'
+    )
+
+
+# ---------------------------------------------------------
+# WORKBOOK STRUCTURE
+# ---------------------------------------------------------
+def _sheet_paths(parts: dict) -> list:
+    """[(sheet name, zip path)] in workbook order."""
+    workbook = ET.fromstring(parts["xl/workbook.xml"])
+    rels = ET.fromstring(parts["xl/_rels/workbook.xml.rels"])
+    targets = {
+        r.get("Id"): _resolve_target("xl", r.get("Target"))
+        for r in rels.iter(f"{{{NS_PKG_REL}}}Relationship")
+    }
+    out = []
+    for sheet in workbook.iter(f"{{{NS_MAIN}}}sheet"):
+        rid = sheet.get(f"{{{NS_REL}}}id")
+        if rid in targets:
+            out.append((sheet.get("name"), targets[rid]))
+    return out
+
+
+def _styles_path(parts: dict) -> str:
+    rels = ET.fromstring(parts["xl/_rels/workbook.xml.rels"])
+    for r in rels.iter(f"{{{NS_PKG_REL}}}Relationship"):
+        if r.get("Type", "").endswith("/styles"):
+            return _resolve_target("xl", r.get("Target"))
+    return None
+
+
+class _Styles:
+    """Minimal view of styles.xml: the cellXfs list, plus appending xfs."""
+
+    def __init__(self, xml: str):
+        self.xml = xml
+        m = re.search(r"<cellXfs\b[^>]*>(.*?)</cellXfs>", xml, re.S)
+        if not m:
+            raise XmlFillUnsupported("styles.xml mangler cellXfs")
+        self._xfs = re.findall(r"<xf\b[^>]*?(?:/>|>.*?</xf>)", m.group(1), re.S)
+        self._added = []
+
+    def with_alignment(self, style, alignment_xml: str) -> int:
+        """Append a copy of xf `style` with its alignment replaced; returns the new index."""
+        base = self._xfs[int(style or 0)]
+        head = re.match(r"<xf\b([^>]*?)(/?)>", base)
+        attrs = _attrs(head.group(1))
+        attrs["applyAlignment"] = "1"
+        body = "" if head.group(2) else base[head.end():-len("</xf>")]
+        body = re.sub(r"<alignment\b[^>]*?(?:/>|>.*?</alignment>)", "", body, flags=re.S)
+        attr_text = " ".join(f'{k}="{v}"' for k, v in attrs.items())
+        self._added.append(f"<xf {attr_text}>{alignment_xml}{body}</xf>")
+        return len(self._xfs) + len(self._added) - 1
+
+    def serialize(self) -> str:
+        if not self._added:
+            return self.xml
+        total = len(self._xfs) + len(self._added)
+
+        def patch(m):
+            open_tag = re.sub(r'count="\d+"', f'count="{total}"', m.group(1))
+            return f"{open_tag}{m.group(2)}{''.join(self._added)}</cellXfs>"
+
+        return re.sub(r"(<cellXfs\b[^>]*>)(.*?)</cellXfs>", patch, self.xml, count=1, flags=re.S)
+
+
+# ---------------------------------------------------------
+# SHEET PATCHING
+# ---------------------------------------------------------
+def _patch_sheet(sheet_xml: str, writes: dict) -> str:
+    """
+    Apply writes {(row, col): (ref, style_override, value)} to a worksheet.
+
+    style_override: None keeps the cell's style; a callable maps the
+    existing style id to a new one.
+    """
+    data = _SHEET_DATA_RE.search(sheet_xml)
+    if not data:
+        raise XmlFillUnsupported("Fant ikke <sheetData> (prefiksert navnerom?)")
+
+    by_row = {}
+    for (row, col), write in writes.items():
+        by_row.setdefault(row, {})[col] = write
+
+    def build_cell(ref, style, write):
+        _, override, value = write
+        if override is not None:
+            style = override(style)
+        return _cell_xml(ref, style, value)
+
+    def new_row(row_num, cols):
+        cells = [build_cell(cols[col][0], None, cols[col]) for col in sorted(cols)]
+        return f'<row r="{row_num}">{"".join(cells)}</row>'
+
+    def patch_row(row_match, cols):
+        attr_text, inner = row_match.group(1), row_match.group(2) or ""
+        out = []
+        pending = dict(cols)
+        pos = 0
+        for cell in _CELL_RE.finditer(inner):
+            if inner[pos:cell.start()].strip():
+                raise XmlFillUnsupported("Uventet innhold i <row>")
+            pos = cell.end()
+            attrs = _attrs(cell.group(1))
+            if "r" not in attrs:
+                raise XmlFillUnsupported("Celle uten r-attributt")
+            _, col = _split_ref(attrs["r"])
+
+            for new_col in sorted(c for c in pending if c < col):
+                out.append(build_cell(pending[new_col][0], None, pending.pop(new_col)))
+
+            if col in pending:
+                if cell.group(2) and "<f" in cell.group(2):
+                    raise XmlFillUnsupported(f"Formelcelle {attrs['r']} i skrivesettet")
+                out.append(build_cell(attrs["r"], attrs.get("s"), pending.pop(col)))
+            else:
+                out.append(cell.group(0))
+
+        if inner[pos:].strip():
+            raise XmlFillUnsupported("Uventet innhold i <row>")
+        for new_col in sorted(pending):
+            out.append(build_cell(pending[new_col][0], None, pending[new_col]))
+        # spans is only an optimization hint and may no longer be accurate
+        attr_text = re.sub(r"""\s+spans\s*=\s*(["']).*?\1""", "", attr_text)
+        return f"<row{attr_text}>{''.join(out)}</row>"
+
+    content = data.group(1) or ""
+    pieces = []
+    pos = 0
+    remaining = sorted(by_row)
+    for row_match in _ROW_RE.finditer(content):
+        r = _attrs(row_match.group(1)).get("r")
+        if r is None:
+            raise XmlFillUnsupported("Rad uten r-attributt")
+        row_num = int(r)
+
+        while remaining and remaining[0] < row_num:
+            pieces.append(content[pos:row_match.start()])
+            pos = row_match.start()
+            pieces.append(new_row(remaining[0], by_row[remaining.pop(0)]))
+
+        if remaining and remaining[0] == row_num:
+            pieces.append(content[pos:row_match.start()])
+            pieces.append(patch_row(row_match, by_row[remaining.pop(0)]))
+            pos = row_match.end()
+
+    pieces.append(content[pos:])
+    for row_num in remaining:
+        pieces.append(new_row(row_num, by_row[row_num]))
+
+    new_content = "".join(pieces)
+    return (
+        sheet_xml[:data.start()]
+        + f"<sheetData>{new_content}</sheetData>"
+        + sheet_xml[data.end():]
+    )
+
+
+# ---------------------------------------------------------
+# MAIN FUNCTION
+# ---------------------------------------------------------
+def fill_excel_xml(template_bytes, field_values, summary_text):
+    """
+    Fill the template by patching its XML directly.
+    Same arguments and result (cell for cell) as excel_filler.fill_excel.
+
+    Raises:
+        XmlFillUnsupported if the template needs the openpyxl path.
+    """
+    with zipfile.ZipFile(BytesIO(template_bytes)) as zin:
+        infos = zin.infolist()
+        names = {i.filename for i in infos}
+
+        parts = {}
+        for name in ("xl/workbook.xml", "xl/_rels/workbook.xml.rels"):
+            if name not in names:
+                raise XmlFillUnsupported(f"Mangler {name}")
+            parts[name] = zin.read(name)
+
+        sheets = _sheet_paths(parts)
+        if not sheets:
+            raise XmlFillUnsupported("Arbeidsboken har ingen ark")
+        sheet_by_name = dict(sheets)
+
+        styles_path = _styles_path(parts)
+        if not styles_path or styles_path not in names:
+            raise XmlFillUnsupported("Mangler styles.xml")
+        styles = _Styles(zin.read(styles_path).decode("utf-8"))
+
+        plan = get_fill_plan(template_bytes)
+
+        # Collect writes per sheet path (each mapped value computed once)
+        values = evaluate(COMPILED_MAPPINGS, field_values)
+        writes_by_path = {}
+        first_sheet_values = {}
+        for sheet_name, cell_ref, slot in plan["writes"]:
+            value = values[slot]
+            writes_by_path.setdefault(sheet_by_name[sheet_name], {})[_split_ref(cell_ref)] = (cell_ref.upper(), None, value)
+            if sheet_name == plan["first_sheet"]:
+                first_sheet_values[cell_ref] = value
+
+        # Summary goes into the "skriv her" placeholder on the first sheet, else A46
+        if summary_text:
+            first_path = sheet_by_name[plan["first_sheet"]]
+            anchor = summary_anchor(plan, first_sheet_values).upper()
+
+            aligned = {}  # existing style id -> its copy with the summary alignment
+
+            def align(style):
+                if style not in aligned:
+                    aligned[style] = styles.with_alignment(style, SUMMARY_ALIGNMENT)
+                return aligned[style]
+
+            writes_by_path.setdefault(first_path, {})[_split_ref(anchor)] = (anchor, align, summary_text)
+
+        # Patch affected sheets, copy everything else untouched
+        replaced = {}
+        for path, writes in writes_by_path.items():
+            if writes:
+                xml = zin.read(path).decode("utf-8")
+                replaced[path] = _patch_sheet(xml, writes).encode("utf-8")
+        if styles._added:
+            replaced[styles_path] = styles.serialize().encode("utf-8")
+
+        out = BytesIO()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in infos:
+                data = replaced.get(info.filename)
+                if data is None:
+                    data = zin.read(info)
+                zout.writestr(info, data)
+        return out.getvalue()
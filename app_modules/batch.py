@@ -0,0 +1,399 @@
+# app_modules/batch.py
+"""
+Headless batch runner: fills the Excel template for a list of org numbers.
+
+Runs the same chain as the main page for every company, in parallel workers,
+without importing Streamlit:
+
+    enrich_company (BRREG, Proff.no, summary, PDF fields) -> fill_excel
+
+Usage:
+    python -m app_modules.batch orgs.csv --out-dir output/
+    python -m app_modules.batch orgs.txt --out-dir output/ --pdf-dir pdfs/ --workers 8
+
+The input is a CSV with an org number column (org_number / orgnr /
+organisasjonsnummer) and an optional "pdf" column (several files separated by
+";"), or a TXT file with one org number per line. PDFs can also be picked up
+from --pdf-dir as <orgnr>.pdf and <orgnr>_*.pdf.
+
+Progress is appended to a JSON-lines checkpoint file (default:
+<out-dir>/checkpoint.jsonl). Re-running the same command skips companies that
+already finished, so a crashed run continues where it stopped.
+
+--portfolio FILE also writes one overview workbook with a row per company
+(see Sheets/portfolio.py), streamed as companies finish; --portfolio-only
+skips the per-company workbooks:
+
+    python -m app_modules.batch orgs.csv --portfolio output/portefolje.xlsx --portfolio-only
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app_modules.enrichment import enrich_company
+from app_modules.template_loader import get_template_bytes
+from app_modules.Sheets.excel_filler import fill_excel
+from app_modules.Sheets.portfolio import PORTFOLIO_FIELDS, PortfolioWriter
+from app_modules.Sheets.Sammendrag.mapping import SHEET as SAMMENDRAG
+from app_modules.Sheets.sheet_config import transform_for_sheet
+
+ORG_COLUMNS = ("org_number", "orgnr", "org_nr", "organisasjonsnummer")
+PDF_COLUMNS = ("pdf", "pdf_path", "pdf_file")
+DEFAULT_WORKERS = 4
+
+
+# ---------------------------------------------------------
+# INPUT
+# ---------------------------------------------------------
+def _clean_org(value) -> str:
+    return "".join(ch for ch in str(value or "") if ch.isdigit())
+
+
+def read_org_list(path: str) -> list:
+    """
+    Read org numbers (and optional PDF paths) from a CSV or TXT file.
+
+    Returns:
+        List of dicts: {"org_number": str, "pdf": str or None},
+        de-duplicated in file order.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        text = f.read()
+
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    entries = []
+    first = [c.strip().lower() for c in next(csv.reader([lines[0]], delimiter=_delimiter(lines[0])))]
+    org_col = next((first.index(c) for c in ORG_COLUMNS if c in first), None)
+
+    if org_col is not None:
+        pdf_col = next((first.index(c) for c in PDF_COLUMNS if c in first), None)
+        for row in csv.reader(lines[1:], delimiter=_delimiter(lines[0])):
+            if org_col >= len(row):
+                continue
+            pdf = row[pdf_col].strip() if pdf_col is not None and pdf_col < len(row) else ""
+            entries.append({"org_number": _clean_org(row[org_col]), "pdf": pdf or None})
+    else:
+        # Plain list: one org number per line (first column if delimited)
+        for line in lines:
+            cell = next(csv.reader([line], delimiter=_delimiter(line)))[0]
+            entries.append({"org_number": _clean_org(cell), "pdf": None})
+
+    seen = set()
+    out = []
+    for e in entries:
+        if len(e["org_number"]) != 9 or e["org_number"] in seen:
+            continue
+        seen.add(e["org_number"])
+        out.append(e)
+    return out
+
+
+def _delimiter(line: str) -> str:
+    return ";" if line.count(";") > line.count(",") else ","
+
+
+# ---------------------------------------------------------
+# CHECKPOINT
+# ---------------------------------------------------------
+def load_checkpoint(path: str) -> dict:
+    """
+    Load finished records from a JSON-lines checkpoint.
+    Later lines win, so a retried company reflects its latest attempt.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            if record.get("org_number"):
+                done[record["org_number"]] = record
+    return done
+
+
+def _is_done(record: dict, workbook: bool = True, portfolio: bool = False) -> bool:
+    """
+    True if a checkpoint record covers what this run writes: the company's
+    workbook, and its portfolio fields when a portfolio is requested.
+    """
+    if not record or record.get("status") != "ok":
+        return False
+    if workbook and not record.get("output"):
+        return False
+    return not portfolio or "fields" in record
+
+
+def _append_checkpoint(path: str, record: dict, lock: threading.Lock):
+    line = json.dumps(record, ensure_ascii=False)
+    with lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# ---------------------------------------------------------
+# ONE COMPANY
+# ---------------------------------------------------------
+def _safe_filename(name: str) -> str:
+    return "".join(c for c in name if c.isalnum() or c in " _-").strip().replace(" ", "_")
+
+
+def _pdf_paths(pdf_value):
+    """
+    PDF paths from a ";"-separated pdf column value
+    (the parser reads them from disk).
+
+    Raises:
+        FileNotFoundError: if a listed PDF doesn't exist, so the company
+                           fails instead of being filled without it
+    """
+    if not pdf_value:
+        return []
+    paths = [p.strip() for p in pdf_value.split(";") if p.strip()]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(f"Fant ikke PDF: {', '.join(missing)}")
+    return paths
+
+
+def build_fields(org_number: str, pdf=None):
+    """
+    Run the enrichment chain for one company (sources fetched concurrently).
+
+    Returns:
+        (merged_fields, summary_text) using the same precedence as the
+        main page: BRREG, then Proff.no, then PDF fields.
+    """
+    enriched = enrich_company(org_number, pdf=pdf)
+    if not enriched["company_data"]:
+        raise LookupError(f"Fant ikke {org_number} i Brønnøysund")
+    if enriched["pdf_error"]:
+        raise RuntimeError(f"Kunne ikke lese PDF: {enriched['pdf_error']}") from enriched["pdf_error"]
+    return enriched["merged_fields"], enriched["summary_text"]
+
+
+def process_company(entry: dict, template_bytes: bytes, out_dir: str, engine=None,
+                    workbook: bool = True, portfolio: bool = False) -> dict:
+    """
+    Fill and write the workbook for one company.
+    Never raises; failures are returned as a record with status "error".
+
+    With portfolio=True the record also carries "fields" (the portfolio
+    columns, see Sheets/portfolio.py), so a resumed run can write the
+    row without fetching the company again. workbook=False skips the fill.
+    """
+    org_number = entry["org_number"]
+    started = time.perf_counter()
+    record = {"org_number": org_number}
+
+    try:
+        merged_fields, summary_text = build_fields(org_number, _pdf_paths(entry.get("pdf")))
+
+        if workbook:
+            excel_bytes = fill_excel(
+                template_bytes=template_bytes,
+                field_values=merged_fields,
+                summary_text=summary_text,
+                engine=engine,
+            )
+
+            name = _safe_filename(merged_fields.get("company_name") or "Selskap")
+            out_path = os.path.join(out_dir, f"{org_number}_{name}.xlsx")
+            tmp_path = out_path + ".part"
+            with open(tmp_path, "wb") as f:
+                f.write(excel_bytes)
+            os.replace(tmp_path, out_path)
+            record["output"] = out_path
+
+        if portfolio:
+            data = transform_for_sheet(SAMMENDRAG, merged_fields)
+            record["fields"] = {field: data[field] for field in PORTFOLIO_FIELDS if data.get(field)}
+
+        record.update(status="ok", company_name=merged_fields.get("company_name", ""))
+
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+
+    record["seconds"] = round(time.perf_counter() - started, 4)
+    return record
+
+
+# ---------------------------------------------------------
+# BATCH
+# ---------------------------------------------------------
+def run_batch(entries, template_bytes, out_dir, workers=DEFAULT_WORKERS,
+              checkpoint_path=None, pdf_dir=None, engine=None, log=print,
+              portfolio_path=None, workbooks=True, redo=()):
+    """
+    Process all entries in a thread pool, skipping those already marked "ok"
+    in the checkpoint.
+
+    With portfolio_path, one row per company is streamed to that workbook
+    as companies finish (in completion order; companies finished in an
+    earlier run come first, from their checkpoint records). Failed
+    companies get a row with the error in the note column.
+    workbooks=False only writes the portfolio. Org numbers in `redo` are
+    processed again even if the checkpoint has them (brreg_updates uses
+    this to refill companies that changed in BRREG).
+
+    Returns:
+        (records, skipped, wall_seconds) for the companies processed this run.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint_path = checkpoint_path or os.path.join(out_dir, "checkpoint.jsonl")
+    done = load_checkpoint(checkpoint_path)
+    portfolio = portfolio_path is not None
+
+    todo, finished = [], []
+    for e in entries:
+        record = done.get(e["org_number"])
+        if e["org_number"] not in redo and _is_done(record, workbooks, portfolio):
+            finished.append(record)
+            continue
+        if not e.get("pdf") and pdf_dir:
+            org = e["org_number"]
+            candidates = sorted(glob.glob(os.path.join(pdf_dir, f"{glob.escape(org)}.pdf")) +
+                                glob.glob(os.path.join(pdf_dir, f"{glob.escape(org)}_*.pdf")))
+            e = dict(e, pdf=";".join(candidates) or None)
+        todo.append(e)
+
+    skipped = len(entries) - len(todo)
+    if skipped:
+        log(f"Hopper over {skipped} selskaper som allerede er ferdige ({checkpoint_path})")
+
+    lock = threading.Lock()
+    records = []
+    started = time.perf_counter()
+
+    writer = None
+    if portfolio:
+        os.makedirs(os.path.dirname(portfolio_path) or ".", exist_ok=True)
+        writer = PortfolioWriter(portfolio_path)
+        for record in finished:
+            writer.add(record["fields"])
+    del done, finished
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(process_company, e, template_bytes, out_dir, engine, workbooks, portfolio)
+                       for e in todo]
+            for i, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                _append_checkpoint(checkpoint_path, record, lock)
+                if writer is not None:
+                    if record["status"] == "ok":
+                        writer.add(record.pop("fields"))
+                    else:
+                        writer.add({"org_number": record["org_number"]}, note=record.get("error", ""))
+                records.append(record)
+                detail = record.get("output", "portefølje") if record["status"] == "ok" else record.get("error")
+                log(f"[{i}/{len(todo)}] {record['org_number']} {record['status']} "
+                    f"({record['seconds']:.2f}s) {detail}")
+    finally:
+        if writer is not None:
+            writer.close()
+            log(f"Portefølje med {writer.rows} selskaper skrevet til {portfolio_path}")
+
+    return records, skipped, time.perf_counter() - started
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def summarize(records, skipped, wall_seconds) -> str:
+    """
+    Human-readable throughput/latency summary for a finished run.
+    """
+    ok = [r for r in records if r["status"] == "ok"]
+    failed = [r for r in records if r["status"] != "ok"]
+    latencies = sorted(r["seconds"] for r in records)
+    throughput = len(records) / wall_seconds if wall_seconds > 0 else 0.0
+
+    lines = [
+        "=" * 50,
+        f"Ferdig: {len(ok)} ok, {len(failed)} feilet, {skipped} hoppet over",
+        f"Tid: {wall_seconds:.1f}s  |  Gjennomstrømning: {throughput * 60:.1f} selskaper/min",
+        f"Latens per selskap: p50 {_percentile(latencies, 50):.2f}s  "
+        f"p95 {_percentile(latencies, 95):.2f}s  maks {latencies[-1] if latencies else 0:.2f}s",
+    ]
+    for r in failed[:10]:
+        lines.append(f"  ✗ {r['org_number']}: {r.get('error')}")
+    if len(failed) > 10:
+        lines.append(f"  ... og {len(failed) - 10} til (se checkpoint-filen)")
+    lines.append("=" * 50)
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app_modules.batch",
+        description="Fyll Excel-malen for en liste med organisasjonsnumre.",
+    )
+    parser.add_argument("input", help="CSV/TXT med organisasjonsnumre")
+    parser.add_argument("--out-dir", default="output", help="Mappe for ferdige .xlsx-filer")
+    parser.add_argument("--pdf-dir", help="Mappe med <orgnr>.pdf / <orgnr>_*.pdf for hvert selskap (valgfritt)")
+    parser.add_argument("--template", help="Lokal Excel-mal (standard: cachet kopi fra Google Sheets)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Antall parallelle arbeidere")
+    parser.add_argument("--checkpoint", help="Checkpoint-fil (standard: <out-dir>/checkpoint.jsonl)")
+    parser.add_argument("--engine", choices=("openpyxl", "xml"),
+                        help="Utfyllingsmotor (standard: FILL_ENGINE eller openpyxl)")
+    parser.add_argument("--portfolio", metavar="FIL",
+                        help="Skriv også en porteføljeoversikt (én rad per selskap) til denne .xlsx-filen")
+    parser.add_argument("--portfolio-only", action="store_true",
+                        help="Bare porteføljeoversikten, ingen arbeidsbok per selskap")
+    args = parser.parse_args(argv)
+    if args.portfolio_only and not args.portfolio:
+        parser.error("--portfolio-only krever --portfolio")
+
+    entries = read_org_list(args.input)
+    if not entries:
+        print("Fant ingen gyldige organisasjonsnumre i input-filen.", file=sys.stderr)
+        return 2
+
+    if args.portfolio_only:
+        template_bytes = None  # no per-company workbooks to fill
+    elif args.template:
+        with open(args.template, "rb") as f:
+            template_bytes = f.read()
+    else:
+        template_bytes = get_template_bytes()
+
+    records, skipped, wall_seconds = run_batch(
+        entries,
+        template_bytes,
+        out_dir=args.out_dir,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        pdf_dir=args.pdf_dir,
+        engine=args.engine,
+        portfolio_path=args.portfolio,
+        workbooks=not args.portfolio_only,
+    )
+    print(summarize(records, skipped, wall_seconds))
+    return 0 if all(r["status"] == "ok" for r in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# app_modules/brreg_cache.py
+"""
+Persistent on-disk cache for raw BRREG entity JSON, keyed by org number.
+
+One SQLite file (WAL mode) is shared by every Streamlit session, thread and
+batch worker process on the machine. Entries follow stale-while-revalidate:
+
+- younger than BRREG_CACHE_TTL:      served from disk, no network
+- older, but younger than MAX_AGE:   served from disk, refreshed in background
+- older than MAX_AGE or missing:     fetched synchronously (stale copy is
+                                     still returned if the fetch fails)
+
+Failed lookups are never cached.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app_modules import metrics
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CACHE_PATH = os.environ.get(
+    "BRREG_CACHE_PATH", os.path.join(_REPO_ROOT, ".cache", "brreg_cache.sqlite3")
+)
+TTL_SECONDS = float(os.environ.get("BRREG_CACHE_TTL", 24 * 3600))
+MAX_AGE_SECONDS = float(os.environ.get("BRREG_CACHE_MAX_AGE", 30 * 24 * 3600))
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="brreg-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+# ---------------------------------------------------------
+# STORAGE
+# ---------------------------------------------------------
+def _connect() -> sqlite3.Connection:
+    """One connection per thread (sqlite3 connections are not thread-safe)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == CACHE_PATH:
+        return conn
+
+    os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS entities ("
+        " org_number TEXT PRIMARY KEY,"
+        " payload TEXT NOT NULL,"
+        " fetched_at REAL NOT NULL)"
+    )
+    _local.conn = conn
+    _local.path = CACHE_PATH
+    return conn
+
+
+def _read(org_number: str):
+    row = _connect().execute(
+        "SELECT payload, fetched_at FROM entities WHERE org_number = ?", (org_number,)
+    ).fetchone()
+    if not row:
+        return None, None
+    return json.loads(row[0]), row[1]
+
+
+def _write(org_number: str, data: dict):
+    _connect().execute(
+        "INSERT OR REPLACE INTO entities (org_number, payload, fetched_at) VALUES (?, ?, ?)",
+        (org_number, json.dumps(data, ensure_ascii=False), time.time()),
+    )
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+# ---------------------------------------------------------
+# BACKGROUND REFRESH
+# ---------------------------------------------------------
+def _refresh(org_number: str, fetch):
+    try:
+        data = fetch(org_number)
+        if data:
+            _write(org_number, data)
+            _count("refreshes")
+    except Exception:
+        _count("errors")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(org_number)
+
+
+def _schedule_refresh(org_number: str, fetch):
+    with _refreshing_lock:
+        if org_number in _refreshing:
+            return
+        _refreshing.add(org_number)
+    _refresh_pool.submit(_refresh, org_number, fetch)
+
+
+# ---------------------------------------------------------
+# PUBLIC API
+# ---------------------------------------------------------
+def get_entity(org_number: str, fetch, force_refresh: bool = False):
+    """
+    Return raw entity JSON for org_number, using the cache where possible.
+
+    Args:
+        org_number: 9-digit org number
+        fetch: callable(org_number) -> dict or None, used on miss/refresh.
+               May raise; the error propagates only if there is no cached copy.
+        force_refresh: skip the cache and fetch synchronously
+
+    Returns:
+        Raw API dict, or None if not found.
+    """
+    cached, fetched_at = (None, None) if force_refresh else _read(org_number)
+
+    if cached is not None:
+        age = time.time() - fetched_at
+        if age < TTL_SECONDS:
+            _count("hits")
+            return cached
+        if age < MAX_AGE_SECONDS:
+            _count("stale_hits")
+            _schedule_refresh(org_number, fetch)
+            return cached
+
+    _count("misses")
+    try:
+        data = fetch(org_number)
+    except Exception:
+        _count("errors")
+        if cached is not None:
+            return cached
+        raise
+
+    if data:
+        _write(org_number, data)
+        return data
+    return cached
+
+
+def invalidate(org_number: str):
+    """Drop one org number from the cache."""
+    _connect().execute("DELETE FROM entities WHERE org_number = ?", (org_number,))
+
+
+def cache_stats() -> dict:
+    """
+    Hit/miss counters for this process plus the number of stored entries.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+    stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+    try:
+        stats["entries"] = _connect().execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+    except sqlite3.Error:
+        stats["entries"] = None
+    stats["path"] = CACHE_PATH
+    return stats
+
+
+metrics.register_source("brreg_cache", cache_stats)
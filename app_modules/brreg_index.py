@@ -0,0 +1,421 @@
+# app_modules/brreg_index.py
+"""
+Offline index of Enhetsregisteret's bulk dataset for local company search.
+
+The bulk file (https://data.brreg.no/enhetsregisteret/api/enheter/lastned,
+gzipped JSON, or the CSV variant) is imported into a SQLite file with an
+FTS5 trigram index over normalized company names. company_data queries
+this index first and only falls back to the live API on a miss, so
+type-ahead keeps working during BRREG outages.
+
+Usage:
+    python -m app_modules.brreg_index import enheter_alle.json.gz
+    python -m app_modules.brreg_index import https://data.brreg.no/enhetsregisteret/api/enheter/lastned
+    python -m app_modules.brreg_index search "tangen bygg"
+    python -m app_modules.brreg_index lookup 992531762
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INDEX_PATH = os.environ.get(
+    "BRREG_INDEX_PATH", os.path.join(_REPO_ROOT, ".cache", "brreg_index.sqlite3")
+)
+BULK_URL = (
+    os.environ.get("BRREG_BASE_URL", "https://data.brreg.no").rstrip("/")
+    + "/enhetsregisteret/api/enheter/lastned"
+)
+
+# Legal-form suffixes ignored when matching names ("Tangen-Bygg AS" == "tangen bygg")
+LEGAL_SUFFIXES = {"as", "asa", "ans", "da", "enk", "ks", "ba", "sa", "nuf", "iks", "sf"}
+
+_FOLD = str.maketrans({"æ": "ae", "ø": "o", "å": "a", "ä": "a", "ö": "o", "ü": "u"})
+_NON_WORD_RE = re.compile(r"[^0-9a-z]+")
+
+_local = threading.local()
+
+
+# ---------------------------------------------------------
+# NORMALIZATION
+# ---------------------------------------------------------
+def normalize_name(name: str) -> str:
+    """
+    Normalize a company name or query for matching:
+    lowercase, æ/ø/å folded to ae/o/a, punctuation removed,
+    trailing legal-form suffixes (AS, ASA, ...) dropped.
+    """
+    s = (name or "").lower().translate(_FOLD)
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    words = _NON_WORD_RE.sub(" ", s).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+# ---------------------------------------------------------
+# READING THE BULK FILE
+# ---------------------------------------------------------
+def _open_text(path: str):
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8-sig")
+    return open(path, encoding="utf-8-sig")
+
+
+def _iter_json_array(f, chunk_size=1 << 20):
+    """Stream objects out of a (possibly huge) top-level JSON array."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    started = False
+    while True:
+        chunk = f.read(chunk_size)
+        buf += chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buf):
+                if buf[pos] != "[":
+                    raise ValueError("Forventet en JSON-liste med enheter")
+                started = True
+                pos += 1
+                continue
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                break  # incomplete object, need more data
+            yield obj
+            pos = end
+        buf = buf[pos:]
+        if not chunk:
+            if buf.strip(" \t\r\n,]"):
+                raise ValueError("Uventet slutt på JSON-filen")
+            return
+
+
+def _iter_csv(f):
+    """CSV export uses dotted headers (forretningsadresse.poststed); rebuild nesting."""
+    sample = f.readline()
+    delimiter = ";" if sample.count(";") > sample.count(",") else ","
+    reader = csv.reader(f, delimiter=delimiter)
+    header = next(csv.reader([sample], delimiter=delimiter))
+    for row in reader:
+        obj = {}
+        for key, value in zip(header, row):
+            if value == "":
+                continue
+            target = obj
+            parts = key.strip().split(".")
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+        if "antallAnsatte" in obj and str(obj["antallAnsatte"]).isdigit():
+            obj["antallAnsatte"] = int(obj["antallAnsatte"])
+        yield obj
+
+
+def _first_char(path: str) -> str:
+    with _open_text(path) as f:
+        while True:
+            ch = f.read(1)
+            if not ch or not ch.isspace():
+                return ch
+
+
+def iter_bulk_entities(path: str):
+    """
+    Yield raw entity dicts from a bulk file (JSON or CSV, optionally gzipped).
+    """
+    is_json = _first_char(path) == "["
+    with _open_text(path) as f:
+        yield from (_iter_json_array(f) if is_json else _iter_csv(f))
+
+
+# ---------------------------------------------------------
+# IMPORT
+# ---------------------------------------------------------
+_SCHEMA = """
+CREATE TABLE entities (
+    org_number TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    norm_name TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE names USING fts5(
+    norm_name, content='entities', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _download(url: str) -> str:
+    from app_modules import http_client
+
+    fd, tmp = tempfile.mkstemp(suffix=".gz")
+    with os.fdopen(fd, "wb") as out, http_client.get(url, stream=True, timeout=60,
+                                                     headers={"Accept": "application/octet-stream"}) as r:
+        r.raise_for_status()
+        shutil.copyfileobj(r.raw, out, 1 << 20)
+    return tmp
+
+
+def import_bulk(source: str, index_path: str = None, batch_size: int = 5000, log=None) -> int:
+    """
+    Build the index from a bulk file path (or URL) and atomically replace
+    the existing index. Readers keep using the old file until the swap.
+
+    Returns:
+        Number of imported entities.
+    """
+    index_path = index_path or INDEX_PATH
+    downloaded = None
+    if source.startswith(("http://", "https://")):
+        downloaded = source = _download(source)
+
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    tmp_path = index_path + ".importing"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(_SCHEMA)
+
+    count = 0
+    batch = []
+    started = time.perf_counter()
+    try:
+        for obj in iter_bulk_entities(source):
+            org = str(obj.get("organisasjonsnummer") or "").strip()
+            name = obj.get("navn") or ""
+            if not org.isdigit() or not name:
+                continue
+            batch.append((org, name, normalize_name(name), json.dumps(obj, ensure_ascii=False)))
+            if len(batch) >= batch_size:
+                conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?)", batch)
+                count += len(batch)
+                batch = []
+                if log:
+                    log(f"{count} enheter importert...")
+        if batch:
+            conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?)", batch)
+            count += len(batch)
+
+        conn.execute("CREATE INDEX entities_norm_name ON entities(norm_name)")
+        conn.execute("INSERT INTO names(names) VALUES ('rebuild')")
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [("imported_at", str(time.time())), ("source", source), ("count", str(count))],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+        if downloaded:
+            os.remove(downloaded)
+
+    os.replace(tmp_path, index_path)
+    if log:
+        log(f"Ferdig: {count} enheter på {time.perf_counter() - started:.1f}s -> {index_path}")
+    return count
+
+
+def update_entities(changes: dict, index_path: str = None) -> int:
+    """
+    Patch an existing index in place (e.g. from the BRREG updates feed, see
+    brreg_updates) instead of re-importing the bulk file.
+
+    Args:
+        changes: {org_number: raw entity JSON, or None to remove it}
+        index_path: Index file (default: INDEX_PATH)
+
+    Returns:
+        Number of org numbers changed (0 when there is no index).
+    """
+    index_path = index_path or INDEX_PATH
+    if not changes or not os.path.exists(index_path):
+        return 0
+
+    conn = sqlite3.connect(index_path, timeout=30)
+    try:
+        with conn:
+            for org, obj in changes.items():
+                old = conn.execute("SELECT rowid, norm_name FROM entities WHERE org_number = ?", (org,)).fetchone()
+                if old:
+                    # External-content FTS: remove the old row's terms explicitly
+                    conn.execute("INSERT INTO names(names, rowid, norm_name) VALUES ('delete', ?, ?)", old)
+                    conn.execute("DELETE FROM entities WHERE rowid = ?", (old[0],))
+                name = (obj or {}).get("navn") or ""
+                if obj and name:
+                    norm = normalize_name(name)
+                    cur = conn.execute(
+                        "INSERT INTO entities (org_number, name, norm_name, payload) VALUES (?, ?, ?, ?)",
+                        (org, name, norm, json.dumps(obj, ensure_ascii=False)),
+                    )
+                    conn.execute("INSERT INTO names (rowid, norm_name) VALUES (?, ?)", (cur.lastrowid, norm))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('updated_at', ?)", (str(time.time()),))
+    finally:
+        conn.close()
+    return len(changes)
+
+
+# ---------------------------------------------------------
+# QUERIES
+# ---------------------------------------------------------
+def _connect():
+    """Read-only connection per thread; None if no index has been imported."""
+    if not os.path.exists(INDEX_PATH):
+        return None
+
+    mtime = os.path.getmtime(INDEX_PATH)
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "key", None) == (INDEX_PATH, mtime):
+        return conn
+    if conn is not None:
+        conn.close()
+
+    conn = sqlite3.connect(f"file:{INDEX_PATH}?mode=ro", uri=True, check_same_thread=False)
+    _local.conn = conn
+    _local.key = (INDEX_PATH, mtime)
+    return conn
+
+
+def is_available() -> bool:
+    return os.path.exists(INDEX_PATH)
+
+
+def lookup(org_number: str):
+    """
+    Exact org-number lookup. Returns raw entity JSON or None.
+    """
+    conn = _connect()
+    if conn is None:
+        return None
+    row = conn.execute(
+        "SELECT payload FROM entities WHERE org_number = ?", ((org_number or "").strip(),)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def search(query: str, size: int = 10) -> list:
+    """
+    Name search against the local index.
+    Prefix matches on the normalized name come first, then substring
+    (trigram) matches, shortest names first.
+
+    Returns:
+        List of raw entity dicts (same shape as the live API results).
+    """
+    conn = _connect()
+    q = normalize_name(query)
+    if conn is None or len(q) < 2:
+        return []
+
+    found = []
+    seen = set()
+
+    def add(rows):
+        for org, payload in rows:
+            if org not in seen and len(found) < size:
+                seen.add(org)
+                found.append(json.loads(payload))
+
+    # 1) Prefix match through the b-tree index
+    add(conn.execute(
+        "SELECT org_number, payload FROM entities"
+        " WHERE norm_name >= ? AND norm_name < ?"
+        " ORDER BY length(norm_name), norm_name LIMIT ?",
+        (q, q + "\uffff", size),
+    ))
+
+    # 2) Substring match on every word through the trigram index
+    words = q.split()
+    long_words = [w for w in words if len(w) >= 3]
+    if len(found) < size and long_words:
+        match = " AND ".join('"' + w.replace('"', '""') + '"' for w in long_words)
+        params = [match]
+        extra = ""
+        for w in words:
+            if len(w) < 3:
+                extra += " AND e.norm_name LIKE ?"
+                params.append(f"%{w}%")
+        params.append(size * 20)
+        rows = conn.execute(
+            "SELECT e.org_number, e.payload FROM entities e"
+            " JOIN (SELECT rowid FROM names WHERE names MATCH ? LIMIT 500) m ON m.rowid = e.rowid"
+            " WHERE 1=1" + extra +
+            " ORDER BY length(e.norm_name) LIMIT ?",
+            params,
+        ).fetchall()
+        add(rows)
+
+    return found
+
+
+def index_info() -> dict:
+    conn = _connect()
+    if conn is None:
+        return {"available": False, "path": INDEX_PATH}
+    info = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    info.update(available=True, path=INDEX_PATH)
+    return info
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app_modules.brreg_index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="Importer bulk-fil (sti eller URL)")
+    p_import.add_argument("source", nargs="?", default=BULK_URL)
+    p_import.add_argument("--index", help=f"Indeksfil (standard: {INDEX_PATH})")
+
+    p_search = sub.add_parser("search", help="Søk på navn")
+    p_search.add_argument("query")
+    p_search.add_argument("--size", type=int, default=10)
+
+    p_lookup = sub.add_parser("lookup", help="Slå opp organisasjonsnummer")
+    p_lookup.add_argument("org_number")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        import_bulk(args.source, index_path=args.index, log=print)
+    elif args.command == "search":
+        started = time.perf_counter()
+        results = search(args.query, size=args.size)
+        for c in results:
+            city = (c.get("forretningsadresse") or {}).get("poststed", "")
+            print(f"{c.get('organisasjonsnummer')}  {c.get('navn')}  {city}")
+        print(f"({len(results)} treff på {(time.perf_counter() - started) * 1000:.1f} ms)")
+    elif args.command == "lookup":
+        entity = lookup(args.org_number)
+        if entity is None:
+            print("Ikke funnet", file=sys.stderr)
+            return 1
+        print(json.dumps(entity, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
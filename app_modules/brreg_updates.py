@@ -0,0 +1,293 @@
+# app_modules/brreg_updates.py
+"""
+Incremental portfolio refresh from BRREG's updates feed.
+
+Enhetsregisteret lists every change to an entity in
+/enhetsregisteret/api/oppdateringer/enheter, each with an increasing
+oppdateringsid. Instead of refetching every company in a portfolio, the
+refresh job reads the feed from the last position it processed and only
+touches the portfolio companies that appear in it:
+
+    feed since last id ─> changed org numbers ∩ portfolio
+        ─> fresh BRREG entity (brreg_cache and the local index updated)
+        ─> company refilled (batch.run_batch with redo=...)
+        ─> portfolio workbook rewritten, unchanged rows from the checkpoint
+
+The position is stored in a small JSON state file next to the batch
+output. Companies whose refill failed stay "pending" and are retried on
+the next run; the position only moves forward once the feed has been
+read completely.
+
+Usage:
+    python -m app_modules.brreg_updates orgs.csv --out-dir output/ --portfolio output/portefolje.xlsx
+    python -m app_modules.brreg_updates orgs.csv --out-dir output/ --since 2026-10-01
+    python -m app_modules.brreg_updates orgs.csv --out-dir output/ --dry-run
+
+The first run needs a starting point: --since, or the portfolio file's
+modification time (when its data was fetched).
+
+Settings (environment variables):
+    BRREG_BASE_URL            see company_data (the feed is on the same host)
+    BRREG_UPDATES_PAGE_SIZE   updates per request, default 1000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from app_modules import brreg_cache, brreg_index, http_client, metrics
+from app_modules.company_data import BRREG_BASE_URL, fetch_company_by_org
+
+UPDATES_URL = f"{BRREG_BASE_URL}/enhetsregisteret/api/oppdateringer/enheter"
+PAGE_SIZE = int(os.environ.get("BRREG_UPDATES_PAGE_SIZE", 1000))
+
+# Change types meaning the entity no longer exists in the register
+REMOVED_TYPES = {"Sletting", "Fjernet"}
+
+
+# ---------------------------------------------------------
+# FEED
+# ---------------------------------------------------------
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+@metrics.timed("brreg.updates")
+def _fetch_page(params: dict) -> list:
+    r = http_client.get(UPDATES_URL, params=dict(params, size=PAGE_SIZE), timeout=30)
+    r.raise_for_status()
+    return r.json().get("_embedded", {}).get("oppdaterteEnheter", []) or []
+
+
+def iter_updates(after_id: int = None, since: float = None):
+    """
+    Yield feed entries ({"oppdateringsid", "organisasjonsnummer",
+    "endringstype", "dato"}) in id order.
+
+    Args:
+        after_id: Last processed oppdateringsid (entries after it are read)
+        since: Unix time to start from when there is no id yet
+
+    Every request asks for the ids after the last one seen, so there is no
+    deep paging however long the feed is.
+    """
+    if after_id is not None:
+        params = {"oppdateringsid": after_id + 1}
+    elif since is not None:
+        params = {"dato": _iso(since)}
+    else:
+        raise ValueError("iter_updates needs after_id or since")
+
+    while True:
+        page = _fetch_page(params)
+        page = [u for u in page if after_id is None or int(u.get("oppdateringsid", 0)) > after_id]
+        if not page:
+            return
+        for update in page:
+            yield update
+        after_id = max(int(u["oppdateringsid"]) for u in page)
+        params = {"oppdateringsid": after_id + 1}
+
+
+# ---------------------------------------------------------
+# STATE
+# ---------------------------------------------------------
+def load_state(path: str) -> dict:
+    """{"last_id": int or None, "pending": [org, ...], "updated_at": float or None}"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    return {
+        "last_id": state.get("last_id"),
+        "pending": list(state.get("pending") or []),
+        "updated_at": state.get("updated_at"),
+    }
+
+
+def save_state(path: str, state: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------
+# REFRESH
+# ---------------------------------------------------------
+def changed_companies(portfolio_orgs, state: dict, since: float = None) -> tuple:
+    """
+    Read the feed from the stored position.
+
+    Returns:
+        (changed, last_id, read): {org: last endringstype} for portfolio
+        companies that changed, the new feed position and the number of
+        feed entries read (all companies, not just the portfolio's).
+    """
+    portfolio_orgs = set(portfolio_orgs)
+    changed = {}
+    last_id = state["last_id"]
+    read = 0
+    for update in iter_updates(after_id=last_id, since=None if last_id is not None else since):
+        read += 1
+        last_id = max(last_id or 0, int(update["oppdateringsid"]))
+        org = str(update.get("organisasjonsnummer") or "")
+        if org in portfolio_orgs:
+            changed[org] = update.get("endringstype", "Endring")
+    return changed, last_id, read
+
+
+def refetch_entities(changed: dict) -> dict:
+    """
+    Fetch the changed companies fresh from BRREG (bypassing the local
+    index and the cache TTL) and patch the local index, so the refill
+    and the app's search see the new data.
+
+    Returns:
+        {org: raw entity JSON or None}
+    """
+    fresh = {}
+    for org, change in changed.items():
+        if change in REMOVED_TYPES:
+            brreg_cache.invalidate(org)
+            fresh[org] = None
+        else:
+            fresh[org] = fetch_company_by_org(org, force_refresh=True)
+    # Only apply what we know: removals and successful fetches
+    brreg_index.update_entities({
+        org: obj for org, obj in fresh.items() if obj is not None or changed[org] in REMOVED_TYPES
+    })
+    return fresh
+
+
+def refresh_portfolio(entries, out_dir: str, state_path: str = None, since: float = None,
+                      portfolio_path=None, workbooks=True, template_bytes=None,
+                      workers=None, dry_run=False, log=print) -> dict:
+    """
+    Refill the portfolio companies that changed in BRREG since the last run.
+
+    Args:
+        entries: batch.read_org_list() entries (the portfolio)
+        out_dir: The batch output directory (checkpoint and workbooks)
+        state_path: Feed position file (default: <out_dir>/brreg_updates.json)
+        since: Start time for the first run (default: portfolio file mtime)
+        portfolio_path, workbooks, template_bytes, workers: as batch.run_batch
+        dry_run: Only read the feed and report; nothing is fetched or saved
+
+    Returns:
+        {"read", "changed", "refilled", "failed", "last_id"}
+    """
+    from app_modules import batch
+
+    state_path = state_path or os.path.join(out_dir, "brreg_updates.json")
+    state = load_state(state_path)
+    if state["last_id"] is None and since is None:
+        if portfolio_path and os.path.exists(portfolio_path):
+            since = os.path.getmtime(portfolio_path)
+        else:
+            raise ValueError("Første kjøring trenger et startpunkt: bruk --since (eller --portfolio med en eksisterende fil)")
+
+    started = time.perf_counter()
+    changed, last_id, read = changed_companies((e["org_number"] for e in entries), state, since)
+    for org in state["pending"]:
+        changed.setdefault(org, "Endring")
+    log(f"Leste {read} oppdateringer på {time.perf_counter() - started:.1f}s; "
+        f"{len(changed)} av {len(entries)} selskaper i porteføljen er endret")
+
+    result = {"read": read, "changed": sorted(changed), "refilled": [], "failed": [], "last_id": last_id}
+    if dry_run:
+        return result
+
+    if changed:
+        fresh = refetch_entities(changed)
+        # A failed fetch would refill from the old data; retry those next run
+        unreachable = {org for org, obj in fresh.items() if obj is None and changed[org] not in REMOVED_TYPES}
+        records, _, _ = batch.run_batch(
+            entries, template_bytes, out_dir,
+            workers=workers or batch.DEFAULT_WORKERS,
+            portfolio_path=portfolio_path, workbooks=workbooks,
+            redo=set(changed) - unreachable, log=log,
+        )
+        result["refilled"] = sorted(r["org_number"] for r in records if r["status"] == "ok")
+        # Removed companies fail by design (their row notes it) and are not
+        # retried, nor are companies that already failed in the batch run
+        result["failed"] = sorted(unreachable | {
+            r["org_number"] for r in records if r["status"] != "ok" and changed.get(r["org_number"]) not in REMOVED_TYPES | {None}
+        })
+
+    save_state(state_path, {"last_id": last_id, "pending": result["failed"], "updated_at": time.time()})
+    return result
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def _parse_since(value: str) -> float:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ugyldig dato {value!r} (bruk f.eks. 2026-10-01 eller 2026-10-01T12:00)")
+    if parsed.tzinfo is None:
+        parsed = parsed.astimezone()
+    return parsed.timestamp()
+
+
+def main(argv=None) -> int:
+    from app_modules import batch
+    from app_modules.template_loader import get_template_bytes
+
+    parser = argparse.ArgumentParser(
+        prog="python -m app_modules.brreg_updates",
+        description="Oppdater bare selskapene i porteføljen som er endret i Brønnøysund siden forrige kjøring.",
+    )
+    parser.add_argument("input", help="CSV/TXT med organisasjonsnumre (samme som for batch)")
+    parser.add_argument("--out-dir", default="output", help="Batch-mappen (checkpoint og .xlsx-filer)")
+    parser.add_argument("--portfolio", metavar="FIL", help="Porteføljeoversikten som skal skrives på nytt")
+    parser.add_argument("--portfolio-only", action="store_true", help="Ingen arbeidsbok per selskap")
+    parser.add_argument("--since", type=_parse_since, help="Startpunkt ved første kjøring (ISO-dato)")
+    parser.add_argument("--state", help="Fil med posisjon i oppdateringsstrømmen (standard: <out-dir>/brreg_updates.json)")
+    parser.add_argument("--template", help="Lokal Excel-mal (standard: cachet kopi fra Google Sheets)")
+    parser.add_argument("--workers", type=int, default=batch.DEFAULT_WORKERS, help="Antall parallelle arbeidere")
+    parser.add_argument("--dry-run", action="store_true", help="Bare vis hva som er endret")
+    args = parser.parse_args(argv)
+    if args.portfolio_only and not args.portfolio:
+        parser.error("--portfolio-only krever --portfolio")
+
+    entries = batch.read_org_list(args.input)
+    if not entries:
+        print("Fant ingen gyldige organisasjonsnumre i input-filen.", file=sys.stderr)
+        return 2
+
+    template_bytes = None
+    if not args.portfolio_only and not args.dry_run:
+        if args.template:
+            with open(args.template, "rb") as f:
+                template_bytes = f.read()
+        else:
+            template_bytes = get_template_bytes()
+
+    try:
+        result = refresh_portfolio(
+            entries, args.out_dir, state_path=args.state, since=args.since,
+            portfolio_path=args.portfolio, workbooks=not args.portfolio_only,
+            template_bytes=template_bytes, workers=args.workers, dry_run=args.dry_run,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.dry_run:
+        for org in result["changed"]:
+            print(org)
+    print(f"Endret: {len(result['changed'])}, fylt ut på nytt: {len(result['refilled'])}, "
+          f"feilet: {len(result['failed'])}, posisjon: {result['last_id']}")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
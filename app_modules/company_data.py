@@ -1,16 +1,22 @@
-import streamlit as st
-import requests
+import os
 
-BRREG_SEARCH_URL = "https://data.brreg.no/enhetsregisteret/api/enheter"
-BRREG_ENTITY_URL = "https://data.brreg.no/enhetsregisteret/api/enheter/{}"
+from app_modules import brreg_cache, brreg_index, http_client, metrics
+
+# Configurable so tests and load tests can point at a local stand-in
+BRREG_BASE_URL = os.environ.get("BRREG_BASE_URL", "https://data.brreg.no").rstrip("/")
+BRREG_SEARCH_URL = f"{BRREG_BASE_URL}/enhetsregisteret/api/enheter"
+BRREG_ENTITY_URL = BRREG_SEARCH_URL + "/{}"
 
 
 # ---------------------------------------------------------
 # LIVE SEARCH
 # ---------------------------------------------------------
+@metrics.timed("brreg.search")
 def search_brreg_live(name: str):
     """
     Live search for companies in Brønnøysund.
+    Uses the local bulk-dataset index first (see brreg_index) and only
+    calls the API when the index is missing or has no match.
     Returns a list of raw API objects.
     """
 
@@ -19,7 +25,14 @@ def search_brreg_live(name: str):
         return []
 
     try:
-        r = requests.get(
+        local = brreg_index.search(name, size=10)
+        if local:
+            return local
+    except Exception:
+        pass
+
+    try:
+        r = http_client.get(
             BRREG_SEARCH_URL,
             params={"navn": name, "size": 10},
             timeout=10
@@ -36,9 +49,27 @@ def search_brreg_live(name: str):
 # ---------------------------------------------------------
 # FETCH FULL COMPANY DATA
 # ---------------------------------------------------------
-def fetch_company_by_org(org_number: str):
+def _fetch_entity_live(org_number: str):
+    """
+    Fetch raw entity JSON straight from the API (no cache).
+    Returns None for unknown org numbers, raises on other HTTP errors.
+    """
+    r = http_client.get(
+        BRREG_ENTITY_URL.format(org_number),
+        timeout=10
+    )
+    if r.status_code in (404, 410):
+        return None
+    r.raise_for_status()
+    return r.json()
+
+
+@metrics.timed("brreg.entity")
+def fetch_company_by_org(org_number: str, force_refresh: bool = False):
     """
     Fetch full company details using org number.
+    Served from the local bulk index or the on-disk BRREG cache when
+    possible (see brreg_index / brreg_cache).
     Returns raw API JSON or None.
     """
 
@@ -46,13 +77,18 @@ def fetch_company_by_org(org_number: str):
     if not org_number.isdigit():
         return None
 
+    if not force_refresh:
+        try:
+            local = brreg_index.lookup(org_number)
+            if local:
+                return local
+        except Exception:
+            pass
+
     try:
-        r = requests.get(
-            BRREG_ENTITY_URL.format(org_number),
-            timeout=10
+        return brreg_cache.get_entity(
+            org_number, _fetch_entity_live, force_refresh=force_refresh
         )
-        r.raise_for_status()
-        return r.json()
 
     except Exception:
         return None
@@ -104,6 +140,14 @@ def format_company_data(api_data):
 # OPTIONAL DEBUG PAGE
 # ---------------------------------------------------------
 def run():
+    import streamlit as st
+
     st.title("🔍 Company Data Module")
     st.write("Dette er et backend-modul og brukes av andre sider.")
     st.info("Ingen interaktiv funksjon her. Brukes av Input- og Summary-moduler.")
+
+    st.subheader("BRREG-cache")
+    st.json(brreg_cache.cache_stats())
+
+    st.subheader("Lokal BRREG-indeks")
+    st.json(brreg_index.index_info())
@@ -1,7 +1,10 @@
 import streamlit as st
 from datetime import datetime
 
+from app_modules import metrics
 
+
+@metrics.timed("download")
 def download_excel_file(excel_bytes, company_name="Selskap"):
     """
     Displays a download button for the final Excel file.
@@ -0,0 +1,191 @@
+# app_modules/enrichment.py
+"""
+Enrichment orchestrator: gathers company fields from all sources concurrently.
+
+Sources that don't depend on each other run at the same time:
+
+    BRREG entity ─> summary (BRREG text, else Wikipedia/DuckDuckGo)
+    Proff.no search page ─> company page ─> financial table
+    PDF field extraction, one thread per file (cached by content hash,
+    merged by document kind, see pdf_merge)
+
+Results are merged with the same precedence as before:
+BRREG, then Proff.no (non-empty values), then PDF fields overriding.
+Wall-clock time is roughly the slowest source instead of the sum.
+
+With a per-session memo (see pipeline.py) each source only runs when its
+inputs changed since the last call, so a Streamlit rerun with the same
+company and PDFs returns in milliseconds.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app_modules import metrics, pipeline
+from app_modules.company_data import fetch_company_by_org, format_company_data
+from app_modules.pdf_merge import merge_pdf_fields, parse_pdfs
+from app_modules.pdf_upload import SpooledPdf
+from app_modules.Sheets.Sammendrag.proff_getter import lookup_proff
+from app_modules.Sheets.Sammendrag.summery_getter import generate_company_summary
+
+logger = logging.getLogger(__name__)
+
+
+def merge_fields(company_data: dict, proff_data: dict, pdf_fields: dict, summary_text: str) -> dict:
+    """
+    Merge source dicts into the field dict used by fill_excel.
+
+    Precedence:
+    - BRREG is the base
+    - Proff.no fills in / adds fields (only non-empty values)
+    - PDF fields override both
+    """
+    merged = {}
+    merged.update(company_data or {})
+    for key, value in (proff_data or {}).items():
+        if value:
+            merged[key] = value
+    merged.update(pdf_fields or {})
+    merged["company_summary"] = summary_text
+    return merged
+
+
+def _pdf_identity(pdf) -> str:
+    """Memo input for one PDF: its content hash, or the path for files on disk."""
+    if isinstance(pdf, SpooledPdf):
+        return pdf.sha256
+    if isinstance(pdf, bytes):
+        return hashlib.sha256(pdf).hexdigest()
+    return os.fspath(pdf)
+
+
+def _timed(timings: dict, name: str, func, *args):
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+@metrics.timed("enrich")
+def enrich_company(org_number: str, pdf=None, fallback_raw=None, memo=None, pdf_key=None) -> dict:
+    """
+    Fetch BRREG, Proff.no, summary and PDF fields concurrently and merge them.
+
+    Args:
+        org_number: Org number of the selected company (may be empty)
+        pdf: PDF bytes, a spooled upload (pdf_upload.SpooledPdf), a PDF
+             file path, a list of those (parsed concurrently), or None
+        fallback_raw: Raw BRREG search hit, used if no org number is available
+        memo: Per-session dict for pipeline.run_stage; sources whose
+              inputs are unchanged are reused instead of run again
+        pdf_key: Inputs of the PDF stage, e.g. pipeline.upload_digests();
+                 with a memo, `pdf` is only parsed when this key changed
+                 (so callers may pass no PDFs when pipeline.is_fresh)
+
+    Returns:
+        Dict with company_data, proff_data, proff_error, proff_trace
+        (lookup_proff result with diagnostic events, or None), pdf_fields,
+        pdf_error (exception if PDF parsing failed, as a whole or for
+        any of the files, else None),
+        pdf_sources ({field: file name}), pdf_documents (per-file results
+        from pdf_merge.parse_pdfs), summary_text, merged_fields and
+        per-source timings (seconds, only for sources that ran) and
+        memo_hits (sources reused from the memo).
+    """
+    timings = {}
+    if pdf is None:
+        pdfs = []
+    elif isinstance(pdf, (list, tuple)):
+        pdfs = list(pdf)
+    else:
+        pdfs = [pdf]
+
+    if pdf_key is None:
+        pdf_key = [_pdf_identity(p) for p in pdfs] if memo is not None else pdfs
+    brreg_key = org_number or fallback_raw
+    memo_hits = [
+        stage for stage, inputs in (("brreg", brreg_key), ("proff", org_number), ("pdf", pdf_key))
+        if pipeline.is_fresh(memo, stage, inputs)
+    ]
+
+    def brreg_and_summary():
+        def fetch():
+            raw = _timed(timings, "brreg", fetch_company_by_org, org_number) if org_number else fallback_raw
+            return raw, format_company_data(raw or fallback_raw)
+
+        # A failed BRREG fetch (None) falls back to the search hit but isn't memoized
+        _, company_data = pipeline.run_stage(
+            memo, "brreg", brreg_key, fetch,
+            keep=lambda output: output[0] is not None,
+        )
+        summary_text = pipeline.run_stage(
+            memo, "summary", company_data,
+            lambda: _timed(timings, "summary", generate_company_summary, company_data),
+        )
+        return company_data, summary_text
+
+    def proff():
+        if not org_number:
+            return None
+        return pipeline.run_stage(
+            memo, "proff", org_number,
+            lambda: _timed(timings, "proff", lookup_proff, org_number),
+            keep=lambda trace: not trace["retry"],
+        )
+
+    def parse_pdf_files():
+        if not pdf_key:
+            return []
+        # A file that failed to parse is retried on the next run
+        return pipeline.run_stage(
+            memo, "pdf", pdf_key,
+            lambda: _timed(timings, "pdf", parse_pdfs, pdfs),
+            keep=lambda documents: not any(doc["error"] for doc in documents),
+        )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        f_brreg = pool.submit(brreg_and_summary)
+        f_proff = pool.submit(proff)
+        f_pdf = pool.submit(parse_pdf_files)
+
+        company_data, summary_text = f_brreg.result()
+
+        proff_error = None
+        try:
+            proff_trace = f_proff.result()
+        except Exception as e:
+            proff_trace, proff_error = None, e
+        proff_data = dict(proff_trace["data"]) if proff_trace else {}
+
+        pdf_error = None
+        try:
+            pdf_documents = f_pdf.result()
+        except Exception as e:
+            logger.warning("PDF parsing failed: %s", e, exc_info=True)
+            pdf_documents, pdf_error = [], e
+        failed = [doc for doc in pdf_documents if doc["error"]]
+        if failed and pdf_error is None:
+            pdf_error = RuntimeError("; ".join(f"{doc['name']}: {doc['error']}" for doc in failed))
+        pdf_fields, pdf_sources = merge_pdf_fields(pdf_documents)
+
+    timings["total"] = time.perf_counter() - started
+
+    return {
+        "company_data": company_data,
+        "proff_data": proff_data,
+        "proff_error": proff_error,
+        "proff_trace": proff_trace,
+        "pdf_fields": pdf_fields,
+        "pdf_error": pdf_error,
+        "pdf_sources": pdf_sources,
+        "pdf_documents": pdf_documents,
+        "summary_text": summary_text,
+        "merged_fields": merge_fields(company_data, proff_data, pdf_fields, summary_text),
+        "timings": timings,
+        "memo_hits": memo_hits,
+    }
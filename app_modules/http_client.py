@@ -0,0 +1,166 @@
+# app_modules/http_client.py
+"""
+Shared HTTP client for every outbound data source (BRREG, Proff.no,
+Wikipedia, DuckDuckGo, the Google Sheets template).
+
+One requests.Session is shared by all Streamlit sessions, threads and batch
+workers in the process. It keeps per-host keep-alive pools (no new TCP+TLS
+handshake per call), retries idempotent requests with exponential backoff,
+asks for gzip, and records per-host request counts and latency histograms.
+
+Settings (environment variables):
+    HTTP_CONNECT_TIMEOUT  seconds, default 5
+    HTTP_READ_TIMEOUT     seconds, default 10 (used when the caller passes none)
+    HTTP_RETRIES          retries on connection errors / 429 / 5xx, default 2
+    HTTP_BACKOFF          backoff factor in seconds, default 0.3
+    HTTP_POOL_MAXSIZE     keep-alive connections per host, default 32
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app_modules import metrics
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+RETRIES = int(os.environ.get("HTTP_RETRIES", 2))
+BACKOFF = float(os.environ.get("HTTP_BACKOFF", 0.3))
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 32))
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+_session = None
+_session_lock = threading.Lock()
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+# ---------------------------------------------------------
+# SESSION
+# ---------------------------------------------------------
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=RETRIES,
+        status=RETRIES,
+        backoff_factor=BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """The process-wide session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+# ---------------------------------------------------------
+# METRICS
+# ---------------------------------------------------------
+def _record(host: str, seconds: float, status):
+    with _stats_lock:
+        s = _stats.get(host)
+        if s is None:
+            s = _stats[host] = {
+                "requests": 0,
+                "errors": 0,
+                "status": {},
+                "latency_sum": 0.0,
+                "latency_buckets": [0] * len(LATENCY_BUCKETS),
+            }
+        s["requests"] += 1
+        s["latency_sum"] += seconds
+        if status is None:
+            s["errors"] += 1
+        else:
+            s["status"][status] = s["status"].get(status, 0) + 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                s["latency_buckets"][i] += 1
+                break
+
+
+def http_stats() -> dict:
+    """
+    Per-host counters: requests, errors (no response), status codes,
+    total latency and a latency histogram ({"<=0.05": n, ...}).
+    """
+    with _stats_lock:
+        out = {}
+        for host, s in _stats.items():
+            out[host] = {
+                "requests": s["requests"],
+                "errors": s["errors"],
+                "status": dict(s["status"]),
+                "latency_sum": s["latency_sum"],
+                "latency_avg": s["latency_sum"] / s["requests"] if s["requests"] else 0.0,
+                "latency_histogram": {
+                    f"<={bound:g}": n for bound, n in zip(LATENCY_BUCKETS, s["latency_buckets"])
+                },
+            }
+        return out
+
+
+def reset_http_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+metrics.register_source("http", http_stats)
+
+
+# ---------------------------------------------------------
+# REQUESTS
+# ---------------------------------------------------------
+def get(url: str, params=None, headers=None, timeout=None, stream=False) -> requests.Response:
+    """
+    GET through the shared session.
+
+    Args:
+        url: Full URL
+        params: Query parameters
+        headers: Extra headers for this request
+        timeout: Read timeout in seconds (connect timeout is CONNECT_TIMEOUT),
+                 or a (connect, read) tuple. Defaults to READ_TIMEOUT.
+        stream: Don't download the body up front
+
+    Returns:
+        requests.Response (raises requests exceptions like requests.get)
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    elif not isinstance(timeout, tuple):
+        timeout = (min(CONNECT_TIMEOUT, timeout), timeout)
+
+    host = urlsplit(url).netloc
+    started = time.perf_counter()
+    status = None
+    try:
+        response = get_session().get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+        status = response.status_code
+        return response
+    finally:
+        _record(host, time.perf_counter() - started, status)
@@ -1,5 +1,27 @@
 import streamlit as st
 from app_modules.company_data import search_brreg_live
+from app_modules.pdf_upload import MAX_UPLOAD_BYTES, UploadTooLarge, spool_upload
+
+
+def _spooled_upload(pdf_file):
+    """
+    The spooled copy of the current upload, kept in the session.
+
+    Spools once per upload (by its file_id), so reruns reuse the temp
+    file; the previous copy is closed when the upload changes or is removed.
+    """
+    file_id = (getattr(pdf_file, "file_id", None) or id(pdf_file)) if pdf_file else None
+    spooled = st.session_state.get("input_pdf_spool")
+    if spooled and pdf_file and spooled[0] == file_id:
+        return spooled[1]
+    if spooled:
+        spooled[1].close()
+        del st.session_state["input_pdf_spool"]
+    if not pdf_file:
+        return None
+    pdf_upload = spool_upload(pdf_file)
+    st.session_state["input_pdf_spool"] = (file_id, pdf_upload)
+    return pdf_upload
 
 
 def get_user_inputs():
@@ -11,7 +33,8 @@ def get_user_inputs():
     - Dropdown selection
 
     Returns:
-        pdf_bytes (bytes or None)
+        pdf_upload (pdf_upload.SpooledPdf or None; kept for the session
+                    until the upload changes, so the caller must not close it)
         selected_company (dict or None)
     """
 
@@ -26,9 +49,13 @@ def get_user_inputs():
         pdf_file = st.file_uploader(
             "PDF dokument (valgfritt)",
             type="pdf",
-            help="Last opp PDF for ekstra informasjon"
+            help=f"Last opp PDF for ekstra informasjon (maks {MAX_UPLOAD_BYTES / 1024 / 1024:.0f} MB)"
         )
-        pdf_bytes = pdf_file.read() if pdf_file else None
+        pdf_upload = None
+        try:
+            pdf_upload = _spooled_upload(pdf_file)
+        except UploadTooLarge as e:
+            st.error(f"⚠️ {e}")
 
     # ---------------------------------------------------------
     # Company search
@@ -67,7 +94,7 @@ def get_user_inputs():
             else:
                 st.warning("Ingen selskaper funnet.")
 
-    return pdf_bytes, selected_company
+    return pdf_upload, selected_company
 
 
 # ---------------------------------------------------------
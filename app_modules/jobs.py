@@ -0,0 +1,211 @@
+# app_modules/jobs.py
+"""
+Background jobs for slow work started from a page (workbook generation).
+
+A job runs on a process-wide thread pool, so it keeps going when the
+Streamlit script reruns or the user clicks something else. The page keeps
+only the job id in st.session_state and polls get_job(id) for progress
+and, once done, the result.
+
+- MAX_BACKGROUND_JOBS jobs run at a time, for all sessions together; the
+  rest wait in the queue, so a burst of clicks can't oversubscribe the CPU
+- submitting the same work again (same key) while it is queued, running
+  or done returns the existing job instead of starting a new one
+- finished jobs are kept until JOB_HISTORY newer jobs have been submitted
+
+Settings (environment variables):
+    MAX_BACKGROUND_JOBS   jobs running at once, default 2 (1 on one CPU)
+    MAX_QUEUED_JOBS       waiting jobs before submit() refuses, default 32
+    JOB_HISTORY           jobs remembered (with their results), default 64
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app_modules import metrics
+
+MAX_BACKGROUND_JOBS = int(os.environ.get("MAX_BACKGROUND_JOBS", min(2, os.cpu_count() or 1)))
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", 32))
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", 64))
+
+_lock = threading.Lock()
+_executor = None
+_jobs = OrderedDict()  # id -> Job, oldest first
+_by_key = {}           # key -> id of the queued/running/done job for that key
+_ids = itertools.count(1)
+
+
+class JobQueueFull(RuntimeError):
+    """Too many jobs waiting; try again shortly."""
+
+    def __init__(self, waiting: int):
+        super().__init__(f"Køen er full ({waiting} jobber venter). Prøv igjen om litt.")
+        self.waiting = waiting
+
+
+class Job:
+    """
+    One background task. Only the worker thread changes it; pages read
+    state, progress, message, result and error.
+    """
+
+    def __init__(self, job_id: str, kind: str, key, label: str):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.label = label
+        self.state = "queued"  # queued -> running -> done | failed
+        self.progress = 0.0
+        self.message = "I kø"
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def report(self, fraction: float, message: str = None):
+        """Progress callback handed to the job function as progress=."""
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message:
+            self.message = message
+
+    def wait(self, timeout=None):
+        """Block until finished; returns the result or raises the job's exception."""
+        return self.future.result(timeout)
+
+
+# ---------------------------------------------------------
+# EXECUTION
+# ---------------------------------------------------------
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, MAX_BACKGROUND_JOBS), thread_name_prefix="job")
+    return _executor
+
+
+def _run(job: Job, func, args, kwargs):
+    job.started = time.time()
+    job.state = "running"
+    job.message = "Starter"
+    metrics.record("jobs.queue_wait", job.started - job.submitted)
+    try:
+        job.result = func(*args, progress=job.report, **kwargs)
+        job.progress = 1.0
+        job.message = "Ferdig"
+        job.state = "done"
+    except Exception as e:
+        job.error = f"{type(e).__name__}: {e}"
+        job.message = "Feilet"
+        job.state = "failed"
+        with _lock:
+            if _by_key.get(job.key) == job.id:
+                del _by_key[job.key]  # a failed job is retried on the next submit
+        raise
+    finally:
+        job.finished = time.time()
+    return job.result
+
+
+def _evict():
+    """Forget the oldest finished jobs beyond JOB_HISTORY (caller holds _lock)."""
+    for job_id in list(_jobs):
+        if len(_jobs) <= JOB_HISTORY:
+            break
+        job = _jobs[job_id]
+        if job.done:
+            del _jobs[job_id]
+            if _by_key.get(job.key) == job_id:
+                del _by_key[job.key]
+
+
+def job_key(*parts) -> str:
+    """Stable key for a job's inputs (bytes are hashed, the rest JSON-encoded)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            digest.update(b"b" + hashlib.sha256(part).digest())
+        else:
+            digest.update(b"j" + json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def submit(kind: str, func, *args, key=None, label: str = "", **kwargs) -> Job:
+    """
+    Run func(*args, progress=callback, **kwargs) in the background.
+
+    Args:
+        kind: Job type, e.g. "excel.fill" (for display and metrics)
+        func: Must accept a progress=callable(fraction, message) keyword
+        key: Identifies the work (see job_key); an unfinished or done job
+             with the same key is returned instead of starting another
+        label: Shown to the user, e.g. the company name
+
+    Returns:
+        The Job (store job.id in session_state and poll get_job).
+
+    Raises:
+        JobQueueFull if MAX_QUEUED_JOBS jobs are already waiting.
+    """
+    with _lock:
+        if key is not None and key in _by_key:
+            return _jobs[_by_key[key]]
+
+        waiting = sum(1 for job in _jobs.values() if job.state == "queued")
+        if waiting >= MAX_QUEUED_JOBS:
+            raise JobQueueFull(waiting)
+
+        job = Job(f"{kind}-{next(_ids)}", kind, key, label)
+        _jobs[job.id] = job
+        if key is not None:
+            _by_key[key] = job.id
+        _evict()
+        job.future = _get_executor().submit(_run, job, func, args, kwargs)
+    return job
+
+
+def get_job(job_id):
+    """The job with this id, or None if unknown or forgotten."""
+    if not job_id:
+        return None
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def queue_position(job: Job) -> int:
+    """Jobs queued ahead of this one (0 when it is running or finished)."""
+    if job.state != "queued":
+        return 0
+    with _lock:
+        ahead = 0
+        for other in _jobs.values():  # submission order
+            if other is job:
+                break
+            ahead += other.state == "queued"
+        return ahead
+
+
+def job_stats() -> dict:
+    with _lock:
+        states = [job.state for job in _jobs.values()]
+    return {
+        "workers": MAX_BACKGROUND_JOBS,
+        "queued": states.count("queued"),
+        "running": states.count("running"),
+        "done": states.count("done"),
+        "failed": states.count("failed"),
+    }
+
+
+metrics.register_source("jobs", job_stats)
@@ -1,23 +1,64 @@
 import streamlit as st
 
-from app_modules.template_loader import load_template
-from app_modules.company_data import (
-    fetch_company_by_org,
-    format_company_data,
-    search_brreg_live
-)
-from app_modules.Sheets.Sammendrag.summery_getter import generate_company_summary
-from app_modules.Sheets.Sammendrag.proff_getter import fetch_proff_info  # ADDED: Real Proff.no getter
-from app_modules.pdf_parser import extract_fields_from_pdf
+from app_modules import jobs, metrics, pipeline
+from app_modules.template_loader import load_template, prefetch_template
+from app_modules.company_data import search_brreg_live
+from app_modules.enrichment import enrich_company
+from app_modules.pdf_merge import DOCUMENT_KINDS
+from app_modules.pdf_upload import MAX_UPLOAD_BYTES, UploadTooLarge, check_upload_size, spool_upload
 from app_modules.Sheets.excel_filler import fill_excel
+from app_modules.Sheets.Sammendrag.proff_getter import render_trace
 from app_modules.download import download_excel_file
 
+# How often a running fill job's progress is refreshed (seconds)
+JOB_POLL_SECONDS = 0.5
+
+
+def _show_field(label: str, key: str, merged_fields: dict, pdf_sources: dict):
+    """One extracted value, with the PDF it came from (if any)."""
+    source = pdf_sources.get(key)
+    if source:
+        st.write(f"**{label}:**", merged_fields.get(key, ""), f"_(fra {source})_")
+    else:
+        st.write(f"**{label}:**", merged_fields.get(key, ""))
+
+
+def _show_fill_job(job_id: str, company_name: str):
+    """Progress of a background fill job; the download button once it's done."""
+    job = jobs.get_job(job_id)
+    polling = job is not None and not job.done
+
+    @st.fragment(run_every=JOB_POLL_SECONDS if polling else None)
+    def job_view():
+        job = jobs.get_job(job_id)
+        if job is None:
+            st.warning("⚠️ Excel-filen er ikke lenger tilgjengelig. Prosesser på nytt.")
+        elif not job.done:
+            ahead = jobs.queue_position(job)
+            text = f"{job.message} ({ahead} foran i køen)" if ahead else job.message
+            st.progress(job.progress, text=f"⏳ {text}...")
+        elif polling:
+            st.rerun()  # finished: render the result without the polling timer
+        elif job.state == "failed":
+            st.error(f"❌ Utfylling av Excel feilet: {job.error}")
+        else:
+            download_excel_file(excel_bytes=job.result, company_name=company_name)
+
+    job_view()
+
 
 def run():
     st.title("📄 PDF → Excel (Brønnøysund,Proff)")
     st.caption("Hent selskapsinformasjon og oppdater Excel automatisk")
     st.divider()
 
+    # Warm the shared template cache while the user is searching
+    prefetch_template()
+
+    # Each step reruns only when its inputs changed (query, org number,
+    # PDF contents); other reruns reuse the session's results (see pipeline)
+    memo = st.session_state.setdefault("pipeline_memo", {})
+
     # ---------------------------------------------------------
     # STEP 1: SEARCH BAR + RESULT DROPDOWN
     # ---------------------------------------------------------
@@ -33,7 +74,8 @@ def run():
     results = []
 
     if query and len(query) >= 2:
-        results = search_brreg_live(query)
+        # An empty result may be a failed request: not memoized
+        results = pipeline.run_stage(memo, "search", query, lambda: search_brreg_live(query), keep=bool)
 
         if not isinstance(results, list):
             results = []
@@ -55,72 +97,86 @@ def run():
         selected_company_raw = results[idx]
 
     # PDF upload (always outside the IF block)
-    pdf_bytes = st.file_uploader("Last opp PDF", type=["pdf"])
+    pdf_files = st.file_uploader(
+        "Last opp PDF-er",
+        type=["pdf"],
+        accept_multiple_files=True,
+        help=f"F.eks. anbudsdokument, årsrapport og kjøretøyliste. Maks {MAX_UPLOAD_BYTES / 1024 / 1024:.0f} MB per fil"
+    )
 
     if not selected_company_raw:
         st.info("Velg et selskap for å fortsette.")
         return
 
     # ---------------------------------------------------------
-    # STEP 2: LOAD TEMPLATE
+    # STEP 2: LOAD TEMPLATE (process-wide cache, see template_loader)
     # ---------------------------------------------------------
-    if "template_bytes" not in st.session_state:
-        st.session_state.template_bytes = load_template()
-
-    template_bytes = st.session_state.template_bytes
+    with metrics.span("template.load"):
+        template_bytes = load_template()
 
     # ---------------------------------------------------------
-    # STEP 3: FETCH BRREG COMPANY DATA
+    # STEP 3-5: BRREG + PROFF.NO + SUMMARY + PDF (concurrently)
     # ---------------------------------------------------------
     org_number = selected_company_raw.get("organisasjonsnummer")
 
-    raw_company_data = (
-        fetch_company_by_org(org_number)
-        if org_number
-        else selected_company_raw
-    )
+    accepted_files = []
+    for pdf_file in pdf_files or []:
+        try:
+            check_upload_size(pdf_file)
+            accepted_files.append(pdf_file)
+        except UploadTooLarge as e:
+            st.error(f"⚠️ {pdf_file.name}: {e}")
+    pdf_key = pipeline.upload_digests(memo, accepted_files)
 
-    company_data = format_company_data(raw_company_data)
+    # Spool the PDFs to temp files instead of copying them into memory;
+    # they are deleted as soon as the fields are extracted (see pdf_upload)
+    pdf_uploads = []
+    if not pipeline.is_fresh(memo, "pdf", pdf_key):
+        for pdf_file in accepted_files:
+            try:
+                pdf_uploads.append(spool_upload(pdf_file))
+            except UploadTooLarge as e:
+                st.error(f"⚠️ {pdf_file.name}: {e}")
 
-    # ---------------------------------------------------------
-    # STEP 3B: FETCH PROFF.NO FINANCIAL DATA
-    # ---------------------------------------------------------
-    st.info("🔍 Henter finansiell data fra Proff.no...")
-    proff_data = {}
-    
-    if org_number:
+    with st.spinner("🔍 Henter data fra Brønnøysund, Proff.no og PDF..."):
         try:
-            proff_data = fetch_proff_info(org_number)
-            if proff_data:
-                st.success(f"✅ Hentet {len(proff_data)} felt fra Proff.no")
-            else:
-                st.warning("⚠️ Kunne ikke hente data fra Proff.no")
-        except Exception as e:
-            st.warning(f"⚠️ Feil ved henting fra Proff.no: {e}")
-
-    # Merge Proff data with company data
-    # Proff data can fill in missing fields OR add new fields (like financials)
-    for key, value in proff_data.items():
-        if value:  # Only add non-empty values
-            company_data[key] = value
+            enriched = enrich_company(
+                org_number,
+                pdf=pdf_uploads,
+                fallback_raw=selected_company_raw,
+                memo=memo,
+                pdf_key=pdf_key,
+            )
+        finally:
+            for pdf_upload in pdf_uploads:
+                pdf_upload.close()
 
-    # ---------------------------------------------------------
-    # STEP 4: SUMMARY
-    # ---------------------------------------------------------
-    summary_text = generate_company_summary(company_data)
+    # One summary line; the full Proff.no trace only on request
+    proff_data = enriched["proff_data"]
+    proff_trace = enriched["proff_trace"]
+    if org_number:
+        if enriched["proff_error"]:
+            st.warning(f"⚠️ Feil ved henting fra Proff.no: {enriched['proff_error']}")
+        elif proff_data:
+            st.success(f"✅ Hentet {len(proff_data)} felt fra Proff.no")
+        else:
+            reason = proff_trace["error"] if proff_trace else None
+            st.warning(f"⚠️ Kunne ikke hente data fra Proff.no{f': {reason}' if reason else ''}")
 
-    # ---------------------------------------------------------
-    # STEP 5: PDF FIELDS
-    # ---------------------------------------------------------
-    pdf_fields = extract_fields_from_pdf(pdf_bytes) if pdf_bytes else {}
+        if proff_trace and st.toggle("Vis feilsøkingslogg for Proff.no", key="proff_debug"):
+            render_trace(proff_trace["events"], expanded=True)
 
-    # ---------------------------------------------------------
-    # MERGE FIELDS
-    # ---------------------------------------------------------
-    merged_fields = {}
-    merged_fields.update(company_data)  # BRREG + Proff.no data
-    merged_fields.update(pdf_fields)    # PDF data (overrides if conflicts)
-    merged_fields["company_summary"] = summary_text
+    failed_pdfs = [doc for doc in enriched["pdf_documents"] if doc["error"]]
+    if failed_pdfs:
+        st.warning("⚠️ Kunne ikke lese alle PDF-filene; feltene fra disse mangler:\n"
+                   + "\n".join(f"- {doc['name']}: {doc['error']}" for doc in failed_pdfs))
+    elif enriched["pdf_error"]:
+        st.warning(f"⚠️ Feil ved lesing av PDF: {enriched['pdf_error']}")
+
+    # BRREG -> Proff.no -> PDF (PDF overrides if conflicts)
+    summary_text = enriched["summary_text"]
+    merged_fields = enriched["merged_fields"]
+    pdf_sources = enriched["pdf_sources"]
 
     st.divider()
     st.subheader("📋 Ekstraherte data")
@@ -128,15 +184,18 @@ def run():
     col_left, col_right = st.columns(2)
 
     with col_left:
-        st.write("**Selskapsnavn:**", merged_fields.get("company_name", ""))
-        st.write("**Organisasjonsnummer:**", merged_fields.get("org_number", ""))
-        st.write("**Adresse:**", merged_fields.get("address", ""))
-        st.write("**Postnummer:**", merged_fields.get("post_nr", ""))
-        st.write("**Poststed:**", merged_fields.get("city", ""))
-        st.write("**Antall ansatte:**", merged_fields.get("employees", ""))
-        st.write("**Hjemmeside:**", merged_fields.get("homepage", ""))
-        st.write("**NACE-kode:**", merged_fields.get("nace_code", ""))
-        st.write("**NACE-beskrivelse:**", merged_fields.get("nace_description", ""))
+        for label, key in (
+            ("Selskapsnavn", "company_name"),
+            ("Organisasjonsnummer", "org_number"),
+            ("Adresse", "address"),
+            ("Postnummer", "post_nr"),
+            ("Poststed", "city"),
+            ("Antall ansatte", "employees"),
+            ("Hjemmeside", "homepage"),
+            ("NACE-kode", "nace_code"),
+            ("NACE-beskrivelse", "nace_description"),
+        ):
+            _show_field(label, key, merged_fields, pdf_sources)
 
     with col_right:
         st.markdown("**Sammendrag (går i 'Om oss' / 'Skriv her' celle):**")
@@ -150,20 +209,51 @@ def run():
             if merged_fields.get("driftsresultat_2024"):
                 st.write("Driftsresultat 2024:", merged_fields.get("driftsresultat_2024"))
 
+    # Per-file overview: kind, fields found, parse time, and which values won
+    pdf_documents = enriched["pdf_documents"]
+    if pdf_documents:
+        if "pdf" in enriched["memo_hits"]:
+            fetched = "hentet tidligere i økten"
+        else:
+            fetched = f"hentet på {enriched['timings'].get('pdf', 0):.1f} s"
+        with st.expander(f"📎 PDF-filer ({len(pdf_documents)}), {fetched}"):
+            st.table([
+                {
+                    "Fil": doc["name"],
+                    "Type": DOCUMENT_KINDS[doc["kind"]][0],
+                    "Felt funnet": len(doc["fields"]),
+                    "Brukt": ", ".join(sorted(k for k, name in pdf_sources.items() if name == doc["name"])),
+                    "Tid (s)": round(doc["seconds"], 2),
+                    "Feil": doc["error"] or "",
+                }
+                for doc in pdf_documents
+            ])
+
     st.divider()
 
     # ---------------------------------------------------------
     # STEP 6 + 7: PROCESS & DOWNLOAD
     # ---------------------------------------------------------
+    # Filled in a background job (see jobs.py): the session stays responsive,
+    # reruns don't throw the work away, and only the job id is kept here.
+    # The key ties the job to these inputs; a new company or new data hides it.
+    fill_key = jobs.job_key(template_bytes, merged_fields, summary_text)
+
     if st.button("🚀 Prosesser & Oppdater Excel", use_container_width=True):
-        with st.spinner("Behandler og fyller inn Excel..."):
-            excel_bytes = fill_excel(
+        try:
+            job = jobs.submit(
+                "excel.fill",
+                fill_excel,
                 template_bytes=template_bytes,
                 field_values=merged_fields,
                 summary_text=summary_text,
+                key=fill_key,
+                label=merged_fields.get("company_name", ""),
             )
+            st.session_state["fill_job"] = job.id
+        except jobs.JobQueueFull as e:
+            st.warning(f"⚠️ {e}")
 
-        download_excel_file(
-            excel_bytes=excel_bytes,
-            company_name=merged_fields.get("company_name", "Selskap")
-        )
\ No newline at end of file
+    job = jobs.get_job(st.session_state.get("fill_job"))
+    if job is not None and job.key == fill_key:
+        _show_fill_job(job.id, merged_fields.get("company_name", "Selskap"))
\ No newline at end of file
@@ -0,0 +1,212 @@
+# app_modules/metrics.py
+"""
+In-process stage timings and counters.
+
+Stages are timed with span() / @timed() and kept per stage name in a
+bounded window of recent samples, from which p50/p95/p99 are computed on
+read. Modules that already keep counters (HTTP requests per host, cache
+hits) register a stats function with register_source(); their numbers are
+read when a snapshot is taken, so counting costs nothing extra.
+
+Stage names are dotted by source: brreg.search, brreg.entity,
+proff.search, proff.page, proff.parse, summary.brreg, summary.wikipedia,
+summary.duckduckgo, pdf.parse, excel.fill, download, ...
+
+Export: snapshot() (dict), to_jsonl() (one JSON object per stage and
+source) and to_openmetrics() (Prometheus/OpenMetrics text). The
+Performance page (performance_page.py) shows them live.
+
+Settings (environment variables):
+    METRICS_WINDOW     samples kept per stage, default 2048
+    METRICS_SPAN_LOG   append every span as a JSON line to this file (default: off)
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+WINDOW = int(os.environ.get("METRICS_WINDOW", 2048))
+SPAN_LOG = os.environ.get("METRICS_SPAN_LOG", "")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_stages = {}   # name -> {"samples": deque, "count", "errors", "sum", "max"}
+_sources = {}  # name -> callable returning a (nested) dict of numbers
+_log_lock = threading.Lock()
+_started = time.time()
+
+
+# ---------------------------------------------------------
+# RECORDING
+# ---------------------------------------------------------
+def record(name: str, seconds: float, error: bool = False):
+    """Add one timing sample for a stage."""
+    with _lock:
+        s = _stages.get(name)
+        if s is None:
+            s = _stages[name] = {"samples": deque(maxlen=WINDOW), "count": 0, "errors": 0, "sum": 0.0, "max": 0.0}
+        s["samples"].append(seconds)
+        s["count"] += 1
+        s["sum"] += seconds
+        s["max"] = max(s["max"], seconds)
+        if error:
+            s["errors"] += 1
+
+    if SPAN_LOG:
+        line = json.dumps({"ts": round(time.time(), 3), "stage": name, "seconds": seconds, "error": error})
+        try:
+            with _log_lock, open(SPAN_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+
+@contextmanager
+def span(name: str):
+    """Time the block as one sample of stage `name` (exceptions count as errors)."""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record(name, time.perf_counter() - started, error)
+
+
+def timed(name: str):
+    """Decorator: every call is a span."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def register_source(name: str, stats_func):
+    """Counters read at snapshot time, e.g. register_source("pdf_cache", cache_stats)."""
+    with _lock:
+        _sources[name] = stats_func
+
+
+def reset():
+    """Forget all stage samples (registered sources keep their own counters)."""
+    global _started
+    with _lock:
+        _stages.clear()
+        _started = time.time()
+
+
+# ---------------------------------------------------------
+# READING
+# ---------------------------------------------------------
+def _quantile(ordered: list, q: float) -> float:
+    """Nearest-rank quantile of a sorted list."""
+    if not ordered:
+        return 0.0
+    rank = math.ceil(q * len(ordered) - 1e-9)
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def _flatten(prefix: str, value, out: dict):
+    """Numbers from nested dicts as {"a.b.c": n} (strings, bools, None dropped)."""
+    if isinstance(value, bool):
+        return
+    if isinstance(value, (int, float)):
+        out[prefix] = value
+    elif isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else str(key), inner, out)
+
+
+def stage_stats() -> dict:
+    """{stage: count, errors, sum, mean, max, p50, p95, p99, window} (seconds)."""
+    with _lock:
+        copies = {name: (sorted(s["samples"]), s["count"], s["errors"], s["sum"], s["max"])
+                  for name, s in _stages.items()}
+    out = {}
+    for name, (ordered, count, errors, total, peak) in sorted(copies.items()):
+        row = {"count": count, "errors": errors, "sum": total,
+               "mean": total / count if count else 0.0, "max": peak, "window": len(ordered)}
+        for q in QUANTILES:
+            row[f"p{round(q * 100)}"] = _quantile(ordered, q)
+        out[name] = row
+    return out
+
+
+def source_stats() -> dict:
+    """{source: {flattened.key: number}} from every registered source."""
+    with _lock:
+        sources = dict(_sources)
+    out = {}
+    for name, func in sorted(sources.items()):
+        flat = {}
+        try:
+            _flatten("", func(), flat)
+        except Exception:
+            flat = {"unavailable": 1}
+        out[name] = flat
+    return out
+
+
+def snapshot() -> dict:
+    """Everything at once: since, stages, sources."""
+    return {"since": _started, "taken": time.time(), "stages": stage_stats(), "sources": source_stats()}
+
+
+# ---------------------------------------------------------
+# EXPORT
+# ---------------------------------------------------------
+def to_jsonl(snap=None) -> str:
+    """One JSON object per stage and per source, newline-terminated."""
+    snap = snap or snapshot()
+    lines = []
+    for name, row in snap["stages"].items():
+        lines.append(json.dumps({"ts": round(snap["taken"], 3), "type": "stage", "name": name, **row}))
+    for name, values in snap["sources"].items():
+        lines.append(json.dumps({"ts": round(snap["taken"], 3), "type": "source", "name": name, "values": values},
+                                ensure_ascii=False))
+    return "".join(line + "\n" for line in lines)
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_openmetrics(snap=None) -> str:
+    """OpenMetrics text exposition (summary per stage, gauges for sources)."""
+    snap = snap or snapshot()
+    lines = [
+        "# TYPE app_stage_seconds summary",
+        "# UNIT app_stage_seconds seconds",
+        "# HELP app_stage_seconds Stage duration (quantiles over the recent window).",
+    ]
+    for name, row in snap["stages"].items():
+        stage = _label(name)
+        for q in QUANTILES:
+            lines.append(f'app_stage_seconds{{stage="{stage}",quantile="{q}"}} {row[f"p{round(q * 100)}"]:.6g}')
+        lines.append(f'app_stage_seconds_sum{{stage="{stage}"}} {row["sum"]:.6g}')
+        lines.append(f'app_stage_seconds_count{{stage="{stage}"}} {row["count"]}')
+
+    lines += ["# TYPE app_stage_errors counter",
+              "# HELP app_stage_errors Stage runs that raised."]
+    for name, row in snap["stages"].items():
+        lines.append(f'app_stage_errors_total{{stage="{_label(name)}"}} {row["errors"]}')
+
+    lines += ["# TYPE app_source_value gauge",
+              "# HELP app_source_value Counters and ratios reported by app modules (HTTP, caches)."]
+    for name, values in snap["sources"].items():
+        for key, value in sorted(values.items()):
+            lines.append(f'app_source_value{{source="{_label(name)}",key="{_label(key)}"}} {value:.6g}')
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
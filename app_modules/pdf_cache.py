@@ -0,0 +1,208 @@
+# app_modules/pdf_cache.py
+"""
+Content-hash cache for parsed PDF text and extracted fields.
+
+Streamlit reruns the page on every widget click, and the same tender
+document is often uploaded by several users. Results are keyed by the
+SHA-256 of the PDF content plus a parser fingerprint, so the same document
+is parsed once per process (and once per machine with the disk cache on).
+
+The fingerprint covers pdf_parser.PARSER_VERSION, every regex in
+pdf_parser, the field rules (triggers and windows), MAX_PAGES and the
+text backend. Changing any of them makes
+old entries unreachable; they age out of memory and can be deleted from
+disk.
+
+Settings (environment variables):
+    PDF_CACHE_MAX_MB   memory budget for cached text, default 64
+    PDF_CACHE_DIR      also keep entries on disk here (default: off, since
+                       tender documents may be confidential)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from app_modules import metrics, pdf_parser
+from app_modules.pdf_upload import SpooledPdf, file_sha256
+
+MAX_BYTES = int(float(os.environ.get("PDF_CACHE_MAX_MB", 64)) * 1024 * 1024)
+CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "")
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (entry, size in bytes)
+_bytes_held = 0
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+
+# ---------------------------------------------------------
+# KEYS
+# ---------------------------------------------------------
+def parser_fingerprint(backend=None) -> str:
+    """Short hash of everything that changes what the parser returns."""
+    parts = [
+        f"version={pdf_parser.PARSER_VERSION}",
+        f"max_pages={pdf_parser.MAX_PAGES}",
+        f"backend={pdf_parser._resolve_backend(backend or pdf_parser.PDF_BACKEND)}",
+        # Triggers and window sizes; the regexes themselves are added in full below
+        f"field_rules={pdf_parser.FIELD_RULES!r}",
+    ]
+    for name, value in sorted(vars(pdf_parser).items()):
+        if isinstance(value, re.Pattern):
+            parts.append(f"{name}={value.flags}:{value.pattern}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _source_and_digest(pdf):
+    """
+    (what the parser reads, content SHA-256) for PDF bytes, a SpooledPdf
+    (hash computed while spooling) or a file path (hashed in chunks).
+    """
+    if isinstance(pdf, bytes):
+        return pdf, hashlib.sha256(pdf).hexdigest()
+    if isinstance(pdf, SpooledPdf):
+        return pdf.path, pdf.sha256
+    path = os.fspath(pdf)
+    return path, file_sha256(path)
+
+
+def _is_empty(pdf) -> bool:
+    if isinstance(pdf, SpooledPdf):
+        return pdf.size == 0
+    return not pdf
+
+
+# ---------------------------------------------------------
+# STORAGE
+# ---------------------------------------------------------
+def _size(entry: dict) -> int:
+    return len(entry["text"].encode("utf-8")) + len(json.dumps(entry["fields"], ensure_ascii=False))
+
+
+def _remember(key: str, entry: dict):
+    global _bytes_held
+    size = _size(entry)
+    with _lock:
+        if key in _entries:
+            return
+        _entries[key] = (entry, size)
+        _bytes_held += size
+        while _bytes_held > MAX_BYTES and len(_entries) > 1:
+            _, (_, old_size) = _entries.popitem(last=False)
+            _bytes_held -= old_size
+            _stats["evictions"] += 1
+
+
+def _disk_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def _read_disk(key: str):
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(_disk_path(key), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk(key: str, entry: dict):
+    if not CACHE_DIR:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{_disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp, _disk_path(key))
+
+
+# ---------------------------------------------------------
+# PUBLIC API
+# ---------------------------------------------------------
+def get_parsed_pdf(pdf, backend=None, processes: int = 0) -> dict:
+    """
+    {"text": str, "fields": dict} for a PDF, parsed at most once per
+    content hash and parser fingerprint. The result is shared; don't
+    modify it.
+
+    pdf: PDF bytes, a pdf_upload.SpooledPdf or the path of a PDF file.
+    processes: on a miss, extract the text in a pool worker process
+    (pool of at least this size, see pdf_parser.read_pdf_text_in_worker)
+    instead of this thread; 0 = in this thread.
+
+    Raises:
+        Whatever the parser raised if the PDF couldn't be read (nothing
+        is cached then, so the next call tries again).
+    """
+    if _is_empty(pdf):
+        return {"text": "", "fields": {}}
+
+    source, digest = _source_and_digest(pdf)
+    key = f"{digest}-{parser_fingerprint(backend)}"
+    with _lock:
+        cached = _entries.get(key)
+        if cached is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return cached[0]
+
+    entry = _read_disk(key)
+    if entry is not None:
+        with _lock:
+            _stats["disk_hits"] += 1
+        _remember(key, entry)
+        return entry
+
+    with _lock:
+        _stats["misses"] += 1
+    # Raises on failure, so a transient error is never cached for this
+    # content hash; only a real empty text layer (a scan) is
+    if processes:
+        text = pdf_parser.read_pdf_text_in_worker(source, processes, backend)
+    else:
+        text = pdf_parser.read_pdf_text(source, backend=backend)
+    entry = {"text": text, "fields": pdf_parser.extract_fields_from_text(text)}
+    _remember(key, entry)
+    try:
+        _write_disk(key, entry)
+    except OSError:
+        pass  # the memory copy still works
+    return entry
+
+
+def get_pdf_text(pdf, backend=None) -> str:
+    """Cached pdf_parser.read_pdf_text (raises if the PDF can't be read)."""
+    return get_parsed_pdf(pdf, backend)["text"]
+
+
+def get_pdf_fields(pdf, backend=None) -> dict:
+    """Cached pdf_parser.extract_fields_from_pdf (returns a copy; raises if the PDF can't be read)."""
+    return dict(get_parsed_pdf(pdf, backend)["fields"])
+
+
+def clear_cache():
+    """Drop the in-memory entries (disk files are left alone)."""
+    global _bytes_held
+    with _lock:
+        _entries.clear()
+        _bytes_held = 0
+
+
+def cache_stats() -> dict:
+    """Hit counters, hit ratio, entries and bytes held in memory."""
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+        stats["bytes"] = _bytes_held
+    lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_ratio"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    stats["max_bytes"] = MAX_BYTES
+    stats["disk"] = CACHE_DIR or None
+    return stats
+
+
+metrics.register_source("pdf_cache", cache_stats)
@@ -0,0 +1,153 @@
+# app_modules/pdf_merge.py
+"""
+Several PDFs per company: parse them concurrently and merge their fields.
+
+A case usually comes with a tender document, an annual report and a
+vehicle list. Each file is classified by its name (or, failing that, the
+start of its text) and the field dicts are merged by kind precedence:
+
+    PDF_PRECEDENCE   comma-separated kinds, most trusted first
+                     (default "tender,annual_report,other,vehicle_list")
+    FIELD_PRECEDENCE per-field exceptions (revenue from the annual report)
+
+Within a kind, the file uploaded first wins. Only non-empty values count.
+The merge is deterministic: same files, same order -> same result,
+whichever parse finishes first.
+
+Each file gets a thread, so one file's failure doesn't affect the
+others. Threads alone don't make text extraction parallel: PDFium calls
+are serialized (not thread-safe, see pdf_parser._pdfium_lock) and
+pdfplumber holds the GIL. With PDF_MERGE_PROCESSES > 1 each thread
+hands its file to pdf_parser's process pool instead, where every
+process has its own PDFium, so files are extracted at the same time on
+a multi-core machine (see benchmarks/bench_pdf_merge.py).
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app_modules import metrics
+from app_modules.pdf_cache import get_parsed_pdf
+from app_modules.pdf_upload import SpooledPdf
+
+# kind -> (label shown in the UI, keywords in file name or text)
+DOCUMENT_KINDS = {
+    "tender": ("Anbudsdokument", ("anbud", "tilbud", "konkurranse", "tender", "kontrakt")),
+    "annual_report": ("Årsrapport", ("årsrapport", "arsrapport", "årsregnskap", "arsregnskap",
+                                      "årsberetning", "regnskap", "annual")),
+    "vehicle_list": ("Kjøretøyliste", ("kjøretøy", "kjoretoy", "maskinliste", "bilpark", "vehicle")),
+    "other": ("Annet", ()),
+}
+
+PDF_PRECEDENCE = tuple(
+    kind.strip()
+    for kind in os.environ.get("PDF_PRECEDENCE", "tender,annual_report,other,vehicle_list").split(",")
+    if kind.strip() in DOCUMENT_KINDS
+)
+
+FIELD_PRECEDENCE = {
+    "revenue_2024": ("annual_report", "tender", "other", "vehicle_list"),
+}
+
+# Characters of extracted text used to classify files with uninformative names
+CLASSIFY_TEXT_CHARS = 2000
+
+MAX_PDF_WORKERS = int(os.environ.get("MAX_PDF_WORKERS", 4))
+
+# Worker processes that extract the files of one company in parallel
+# (<= 1: extract in this process). Default: one per core, up to
+# MAX_PDF_WORKERS, so a single-core host doesn't pay for spawned processes.
+PDF_MERGE_PROCESSES = int(os.environ.get("PDF_MERGE_PROCESSES", min(MAX_PDF_WORKERS, os.cpu_count() or 1)))
+
+
+# ---------------------------------------------------------
+# CLASSIFICATION
+# ---------------------------------------------------------
+def pdf_name(pdf, index: int) -> str:
+    """Display name: the upload's file name, the path's base name, or "PDF n"."""
+    if isinstance(pdf, SpooledPdf) and pdf.name:
+        return pdf.name
+    if isinstance(pdf, (str, os.PathLike)):
+        return os.path.basename(os.fspath(pdf))
+    return f"PDF {index + 1}"
+
+
+def classify_pdf(name: str, text: str = "") -> str:
+    """Document kind from the file name, else from the first part of the text."""
+    for haystack in (name.lower(), text[:CLASSIFY_TEXT_CHARS].lower()):
+        for kind, (_, keywords) in DOCUMENT_KINDS.items():
+            if any(word in haystack for word in keywords):
+                return kind
+    return "other"
+
+
+def _rank(kind: str, field: str) -> int:
+    order = FIELD_PRECEDENCE.get(field, PDF_PRECEDENCE)
+    return order.index(kind) if kind in order else len(order)
+
+
+# ---------------------------------------------------------
+# PARSE + MERGE
+# ---------------------------------------------------------
+def _parse_one(pdf, index: int, processes: int = 0) -> dict:
+    name = pdf_name(pdf, index)
+    started = time.perf_counter()
+    doc = {"name": name, "kind": "other", "fields": {}, "error": None}
+    try:
+        with metrics.span("pdf.parse"):
+            parsed = get_parsed_pdf(pdf, processes=processes)
+        doc["fields"] = dict(parsed["fields"])
+        doc["kind"] = classify_pdf(name, parsed["text"])
+    except Exception as e:
+        doc["error"] = f"{type(e).__name__}: {e}"
+    doc["seconds"] = time.perf_counter() - started
+    return doc
+
+
+def parse_pdfs(pdfs, max_workers=None, processes=None) -> list:
+    """
+    Parse several PDFs at the same time (each cached by content hash).
+
+    Args:
+        pdfs: List of PDF bytes, SpooledPdf uploads or file paths
+        max_workers: Thread count (default: MAX_PDF_WORKERS)
+        processes: Extraction processes for several files
+                   (default: PDF_MERGE_PROCESSES; <= 1 = in this process)
+
+    Returns:
+        One dict per PDF, in input order: name, kind, fields, error
+        (None or "Type: message") and seconds.
+    """
+    pdfs = list(pdfs)
+    if not pdfs:
+        return []
+    if len(pdfs) == 1:
+        return [_parse_one(pdfs[0], 0)]
+
+    workers = max(1, min(max_workers or MAX_PDF_WORKERS, len(pdfs)))
+    processes = PDF_MERGE_PROCESSES if processes is None else processes
+    processes = min(processes, workers) if processes > 1 else 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_parse_one, pdfs, range(len(pdfs)), [processes] * len(pdfs)))
+
+
+def merge_pdf_fields(documents: list):
+    """
+    Merge per-file fields by kind precedence, then upload order.
+
+    Returns:
+        (fields, sources): merged field dict and {field: file name}.
+    """
+    candidates = {}
+    for index, doc in enumerate(documents):
+        for field, value in doc["fields"].items():
+            if value:
+                candidates.setdefault(field, []).append((_rank(doc["kind"], field), index, value, doc["name"]))
+
+    fields, sources = {}, {}
+    for field, options in candidates.items():
+        _, _, value, name = min(options, key=lambda option: option[:2])
+        fields[field] = value
+        sources[field] = name
+    return fields, sources
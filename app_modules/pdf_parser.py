@@ -1,7 +1,50 @@
-import streamlit as st
-import pdfplumber
 import re
+import os
+import logging
+import importlib.util
+import tempfile
+import threading
+import multiprocessing
 from io import BytesIO
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# pdfplumber, pdfminer and pypdfium2 are imported by the backends on first
+# use, so importing this module (and starting the app) doesn't pay for them.
+# pypdfium2 is installed with pdfplumber but optional here.
+HAS_PDFIUM = importlib.util.find_spec("pypdfium2") is not None
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction logic changes in a way the regexes don't show
+# (cached results from older versions are then ignored, see pdf_cache)
+PARSER_VERSION = 3
+
+# Only the first pages carry the company/tender details
+MAX_PAGES = 6
+
+# Text backend: "auto" (fastest available, pdfplumber fallback per page),
+# "pypdfium2", "pdfminer" or "pdfplumber"
+PDF_BACKEND = os.environ.get("PDF_BACKEND", "auto")
+
+# Processes for page-parallel text extraction (1 = extract in-process).
+# Off by default: it only applies to pdfplumber/pdfminer (pypdfium2, the
+# auto backend, always runs in-process), and the only measurement so far
+# (benchmarks/bench_pdf_extract.py on one core) shows 0.9-1.0x, i.e. no
+# gain for the cost of spawned processes. Raise it on multi-core hosts
+# after measuring there with that benchmark.
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", 1))
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# PDFium is not thread-safe: every pypdfium2 call (open, text, page count,
+# close) runs under this lock. Extraction threads of concurrent sessions,
+# batch workers and parse_pdfs therefore take turns inside PDFium; pool
+# worker processes each have their own copy.
+_pdfium_lock = threading.Lock()
 
 # ---------------------------------------------------------
 # REGEX PATTERNS
@@ -36,28 +79,279 @@ DEADLINE_RE = re.compile(
     flags=re.I
 )
 
+# ---------------------------------------------------------
+# TEXT BACKENDS
+# ---------------------------------------------------------
+# Each backend: (source, page_numbers) -> [text per page, "" if none].
+# source is PDF bytes or a file path (pool workers, spooled uploads).
+
+def _pages_pdfplumber(source, page_numbers) -> list:
+    """Character-level layout analysis: slowest, most robust."""
+    import pdfplumber
+
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    with pdfplumber.open(source) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in page_numbers]
+
+
+def _pages_pdfminer(source, page_numbers) -> list:
+    """pdfminer's plain text conversion (pages end with a form feed)."""
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    text = pdfminer_extract_text(source, page_numbers=list(page_numbers))
+    pages = text.split("\f")[:len(page_numbers)]
+    return pages + [""] * (len(page_numbers) - len(pages))
+
+
+def _pages_pypdfium2(source, page_numbers) -> list:
+    """PDFium's text layer (C library): fastest, no layout analysis."""
+    import pypdfium2 as pdfium
+
+    texts = []
+    with _pdfium_lock:
+        doc = pdfium.PdfDocument(source)
+        try:
+            for i in page_numbers:
+                page = doc[i]
+                textpage = page.get_textpage()
+                texts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+        finally:
+            doc.close()
+    # PDFium uses \r\n and keeps column padding; match pdfplumber's lines
+    return ["\n".join(line.strip() for line in text.splitlines()).strip() for text in texts]
+
+
+PDF_BACKENDS = {
+    "pdfplumber": _pages_pdfplumber,
+    "pdfminer": _pages_pdfminer,
+}
+if HAS_PDFIUM:
+    PDF_BACKENDS["pypdfium2"] = _pages_pypdfium2
+
+# Fast enough that splitting pages across processes doesn't pay off
+IN_PROCESS_BACKENDS = {"pypdfium2"}
+
+# Used for pages where the chosen backend gives empty or garbled text
+FALLBACK_BACKEND = "pdfplumber"
+
+
+def _resolve_backend(name: str) -> str:
+    if name == "auto":
+        return "pypdfium2" if "pypdfium2" in PDF_BACKENDS else FALLBACK_BACKEND
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend {name!r} (choose from auto, {', '.join(PDF_BACKENDS)})")
+    return name
+
+
+def _looks_garbled(text: str) -> bool:
+    """
+    True for text that is empty or unlikely to be real words: unmapped
+    glyphs ("(cid:12)", U+FFFD), control characters or mostly symbols.
+    """
+    chars = "".join(text.split())
+    if not chars:
+        return True
+    if text.count("(cid:") * 8 > len(chars) * 0.1:
+        return True
+    bad = sum(1 for c in chars if c == "�" or ord(c) < 32)
+    if bad > len(chars) * 0.05:
+        return True
+    return sum(1 for c in chars if c.isalnum()) < len(chars) * 0.5
+
+
+def _page_count(source) -> int:
+    if HAS_PDFIUM:
+        import pypdfium2 as pdfium
+
+        with _pdfium_lock:
+            doc = pdfium.PdfDocument(source)
+            try:
+                return len(doc)
+            finally:
+                doc.close()
+
+    import pdfplumber
+
+    with pdfplumber.open(BytesIO(source) if isinstance(source, bytes) else source) as pdf:
+        return len(pdf.pages)
+
+
 # ---------------------------------------------------------
 # PDF TEXT EXTRACTION
 # ---------------------------------------------------------
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+def _extract_pages(source, page_numbers, backend: str) -> list:
     """
-    Extracts text from the first 6 pages of a PDF.
-    Returns a single string.
+    Text of the given pages with one backend.
+    Top-level so it can run in a worker process.
+    """
+    return PDF_BACKENDS[backend](source, page_numbers)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
     """
+    Shared process pool, started on first use and grown (never shrunk)
+    when a caller asks for more workers.
+    Uses "spawn": forking a process that runs Streamlit's threads isn't safe.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _split_pages(page_numbers: list, workers: int) -> list:
+    """Split page numbers into up to `workers` contiguous chunks."""
+    workers = max(1, min(workers, len(page_numbers)))
+    size, extra = divmod(len(page_numbers), workers)
+    chunks, start = [], 0
+    for i in range(workers):
+        stop = start + size + (1 if i < extra else 0)
+        chunks.append(page_numbers[start:stop])
+        start = stop
+    return chunks
+
+
+def _extract_parallel(source, page_numbers: list, workers: int, backend: str) -> list:
+    """
+    Extract pages in the process pool. Workers read the PDF from a file
+    (the given path, or one temp file for bytes) instead of receiving
+    pickled bytes.
+    """
+    if not isinstance(source, bytes):
+        return _collect_parallel(source, page_numbers, workers, backend)
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        return _collect_parallel(path, page_numbers, workers, backend)
+    finally:
+        os.remove(path)
+
+
+def _collect_parallel(path: str, page_numbers: list, workers: int, backend: str) -> list:
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(_extract_pages, path, chunk, backend)
+        for chunk in _split_pages(page_numbers, workers)
+    ]
+    pages = []
+    for future in futures:  # in page order
+        pages.extend(future.result())
+    return pages
 
-    if not pdf_bytes:
+
+def _extract(source, page_numbers: list, workers: int, backend: str) -> list:
+    if workers <= 1 or len(page_numbers) <= 1 or backend in IN_PROCESS_BACKENDS:
+        return _extract_pages(source, page_numbers, backend)
+    try:
+        return _extract_parallel(source, page_numbers, workers, backend)
+    except BrokenProcessPool:
+        logger.warning("PDF worker pool broke, extracting in-process")
+        _reset_pool()
+        return _extract_pages(source, page_numbers, backend)
+
+
+def read_pdf_text(source, workers=None, backend=None) -> str:
+    """
+    extract_text_from_pdf, but errors (unreadable PDF, backend failure)
+    are raised instead of returned as "". pdf_cache uses this so that a
+    failed parse isn't cached; "" here means the PDF has no text layer.
+    """
+    if not source:
+        return ""
+    if not isinstance(source, bytes):
+        source = os.fspath(source)
+
+    workers = PDF_WORKERS if workers is None else workers
+    backend = _resolve_backend(backend or PDF_BACKEND)
+
+    page_numbers = list(range(min(_page_count(source), MAX_PAGES)))
+    pages = _extract(source, page_numbers, workers, backend)
+
+    if backend != FALLBACK_BACKEND:
+        redo = [i for i, text in zip(page_numbers, pages) if _looks_garbled(text)]
+        if redo:
+            logger.info("PDF backend %s gave no usable text for pages %s, using %s",
+                        backend, redo, FALLBACK_BACKEND)
+            for i, text in zip(redo, _extract(source, redo, workers, FALLBACK_BACKEND)):
+                pages[i] = text
+
+    return "".join(page + "\n" for page in pages if page)
+
+
+def read_pdf_text_in_worker(source, workers: int, backend=None) -> str:
+    """
+    read_pdf_text in a worker process of the shared pool (at least
+    `workers` processes). Each process has its own PDFium and GIL, so
+    several files sent here at once are extracted in parallel, which
+    threads in this process can't do (see _pdfium_lock). Bytes go to
+    the worker as one temp file. Falls back to this process if the pool
+    broke. Raises like read_pdf_text.
+    """
+    if not source:
         return ""
+    backend = backend or PDF_BACKEND  # this process's setting, not the worker's
+    if not isinstance(source, bytes):
+        return _read_in_worker(os.fspath(source), workers, backend)
 
+    fd, path = tempfile.mkstemp(suffix=".pdf")
     try:
-        text = ""
-        with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-            for page in pdf.pages[:6]:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + "\n"
-        return text
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        return _read_in_worker(path, workers, backend)
+    finally:
+        os.remove(path)
 
+
+def _read_in_worker(path: str, workers: int, backend) -> str:
+    try:
+        # workers=1: pages are extracted inside that worker, no nested pool
+        return _get_pool(workers).submit(read_pdf_text, path, 1, backend).result()
+    except BrokenProcessPool:
+        logger.warning("PDF worker pool broke, extracting in-process")
+        _reset_pool()
+        return read_pdf_text(path, 1, backend)
+
+
+def extract_text_from_pdf(source, workers=None, backend=None) -> str:
+    """
+    Extracts text from the first 6 pages of a PDF.
+    Returns a single string ("" if the PDF can't be read, see read_pdf_text).
+
+    source: PDF bytes or the path of a PDF file. A path is opened by the
+    backends directly (read as needed, never loaded whole).
+
+    backend: "auto" (default: PDF_BACKEND), "pypdfium2", "pdfminer" or
+    "pdfplumber". Pages where a faster backend returns empty or garbled
+    text are re-extracted with pdfplumber.
+
+    Slow backends split pages across PDF_WORKERS processes (or
+    `workers`); the text is reassembled in page order.
+    """
+    try:
+        return read_pdf_text(source, workers, backend)
     except Exception:
         return ""
 
@@ -65,7 +359,78 @@ def extract_text_from_pdf(pdf_bytes: bytes) -> str:
 # FIELD EXTRACTION
 # ---------------------------------------------------------
 
-def extract_fields_from_pdf(pdf_bytes: bytes) -> dict:
+# One rule per regex: (field rule, trigger, regex, chars before, chars after).
+# The trigger is a cheap pattern that every match of the regex contains at
+# a fixed place (its start, or its distinctive end). The text is scanned
+# once for all pending triggers; at a trigger the rule's own regex runs
+# only inside the window [trigger - before, trigger + after]. Triggers are
+# visited left to right, so each rule still gets the first match in the
+# text, and the scan stops as soon as every rule has matched.
+#
+# Windows bound the work per trigger, so extraction is linear in the text
+# length even for whitespace-heavy or adversarial text. The price: a match
+# longer than its window (only possible with long whitespace runs inside
+# it) is not found there.
+FIELD_RULES = [
+    ("org_in_text", r"(?i:org)", ORG_IN_TEXT_RE, 0, 64),
+    ("org", r"\b\d{9}\b", ORG_RE, 0, 10),
+    ("company", r"(?i:\s(?:AS|ASA|ANS|DA|ENK|KS|BA)\b)", COMPANY_WITH_SUFFIX_RE, 160, 8),
+    ("post_city", r"\d{4}\s", POST_CITY_RE, 0, 128),
+    ("address", r"\s\d", ADDRESS_RE, 128, 8),
+    ("revenue", r"(?i:omsetning)", REVENUE_RE, 0, 256),
+    ("deadline", r"(?i:anbudsfrist|frist)", DEADLINE_RE, 0, 64),
+]
+
+_RULES = {
+    name: (re.compile(trigger), regex, before, after)
+    for name, trigger, regex, before, after in FIELD_RULES
+}
+_RULE_TRIGGERS = {name: trigger for name, trigger, _, _, _ in FIELD_RULES}
+
+
+@lru_cache(maxsize=None)
+def _trigger_scanner(names: tuple):
+    """One zero-width pattern that matches where any of the rules' triggers does."""
+    return re.compile("|".join(f"(?={_RULE_TRIGGERS[name]})" for name in names))
+
+
+def _window_match(name: str, txt: str, at: int):
+    _, regex, before, after = _RULES[name]
+    start, end = max(0, at - before), min(len(txt), at + after)
+    m = regex.search(txt, start, end)
+    # A match touching the window end may have been cut short
+    if m and (m.end() < end or end == len(txt)):
+        return m
+    return None
+
+
+def _scan_rules(txt: str) -> dict:
+    """First match per rule name, in a single left-to-right pass."""
+    matches = {}
+    pending = tuple(name for name, *_ in FIELD_RULES)
+    pos = 0
+    while pending:
+        hit = _trigger_scanner(pending).search(txt, pos)
+        if not hit:
+            break
+        at = hit.start()
+        for name in pending:
+            if name not in matches and _RULES[name][0].match(txt, at):
+                m = _window_match(name, txt, at)
+                if m:
+                    matches[name] = m
+
+        if "org_in_text" in matches:
+            matches.pop("org", None)  # only a fallback
+        pending = tuple(
+            name for name in pending
+            if name not in matches and not (name == "org" and "org_in_text" in matches)
+        )
+        pos = at + 1
+    return matches
+
+
+def extract_fields_from_pdf(source, backend=None) -> dict:
     """
     Extracts useful fields from a PDF:
     - org number
@@ -76,25 +441,32 @@ def extract_fields_from_pdf(pdf_bytes: bytes) -> dict:
     - deadline
     """
 
-    txt = extract_text_from_pdf(pdf_bytes)
+    return extract_fields_from_text(extract_text_from_pdf(source, backend=backend))
+
+
+def extract_fields_from_text(txt: str) -> dict:
+    """
+    Same fields as extract_fields_from_pdf, from already extracted text.
+    """
+
     fields = {}
 
     if not txt:
         return fields
 
+    matches = _scan_rules(txt)
+
     # 1) Org number
-    m = ORG_IN_TEXT_RE.search(txt)
+    m = matches.get("org_in_text")
     if m:
         fields["org_number"] = m.group(2)
-    else:
-        m2 = ORG_RE.search(txt)
-        if m2:
-            fields["org_number"] = m2.group(1)
+    elif matches.get("org"):
+        fields["org_number"] = matches["org"].group(1)
 
     # 2) Company name
-    m3 = COMPANY_WITH_SUFFIX_RE.search(txt)
-    if m3:
-        fields["company_name"] = m3.group(0).strip()
+    m = matches.get("company")
+    if m:
+        fields["company_name"] = m.group(0).strip()
     else:
         # fallback: first title-cased line
         for line in txt.splitlines():
@@ -104,25 +476,25 @@ def extract_fields_from_pdf(pdf_bytes: bytes) -> dict:
                 break
 
     # 3) Postnummer + city
-    mpc = POST_CITY_RE.search(txt)
-    if mpc:
-        fields["post_nr"] = mpc.group(1)
-        fields["city"] = mpc.group(2).strip()
+    m = matches.get("post_city")
+    if m:
+        fields["post_nr"] = m.group(1)
+        fields["city"] = m.group(2).strip()
 
     # 4) Address
-    maddr = ADDRESS_RE.search(txt)
-    if maddr:
-        fields["address"] = maddr.group(1).strip()
+    m = matches.get("address")
+    if m:
+        fields["address"] = m.group(1).strip()
 
     # 5) Revenue
-    mrev = REVENUE_RE.search(txt)
-    if mrev:
-        fields["revenue_2024"] = mrev.group(1).strip()
+    m = matches.get("revenue")
+    if m:
+        fields["revenue_2024"] = m.group(1).strip()
 
     # 6) Deadline
-    mdate = DEADLINE_RE.search(txt)
-    if mdate:
-        fields["tender_deadline"] = mdate.group(1).strip()
+    m = matches.get("deadline")
+    if m:
+        fields["tender_deadline"] = m.group(1).strip()
 
     return fields
 
@@ -130,6 +502,13 @@ def extract_fields_from_pdf(pdf_bytes: bytes) -> dict:
 # PAGE VIEW (so it works as a selectable page)
 # ---------------------------------------------------------
 def run():
+    import streamlit as st
+
+    from app_modules.pdf_cache import cache_stats
+
     st.title("📄 PDF Parser Module")
     st.write("Dette modulen ekstraherer tekst og felter fra PDF-dokumenter.")
     st.info("Brukes av hovedsiden for å hente data fra PDF.")
+
+    st.subheader("PDF-cache")
+    st.json(cache_stats())
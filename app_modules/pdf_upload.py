@@ -0,0 +1,136 @@
+# app_modules/pdf_upload.py
+"""
+Bounded-memory PDF uploads.
+
+An uploaded PDF is copied in chunks into a temp file while its SHA-256 is
+computed, so the document is never held as one extra bytes object per
+session. The parser opens the file by path (pdfplumber/PDFium read it
+lazily) and pdf_cache uses the hash as its key without reading the file
+again. Close the upload (or use it as a context manager) once the fields
+are extracted; the temp file is also removed if the object is garbage
+collected.
+
+Settings (environment variables):
+    MAX_UPLOAD_MB       largest accepted PDF, default 100
+    UPLOAD_SPOOL_DIR    where temp files go (default: the system temp dir)
+"""
+
+import hashlib
+import os
+import tempfile
+import weakref
+
+MAX_UPLOAD_BYTES = int(float(os.environ.get("MAX_UPLOAD_MB", 100)) * 1024 * 1024)
+SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR") or None
+
+CHUNK_SIZE = 256 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """The upload is bigger than MAX_UPLOAD_MB. The message is shown to the user."""
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpooledPdf:
+    """
+    A PDF spooled to disk: .path, .sha256 (hex) and .size (bytes).
+    The temp file is deleted on close().
+    """
+
+    def __init__(self, path: str, sha256: str, size: int, name: str = ""):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.name = name
+        self._finalizer = weakref.finalize(self, _remove, path)
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"SpooledPdf({self.name or self.path!r}, {self.size} bytes, sha256={self.sha256[:12]})"
+
+
+def _too_large(size: int, max_bytes: int) -> UploadTooLarge:
+    return UploadTooLarge(
+        f"PDF-filen er for stor ({size / 1024 / 1024:.1f} MB). "
+        f"Maks størrelse er {max_bytes / 1024 / 1024:.0f} MB."
+    )
+
+
+def check_upload_size(fileobj, max_bytes=None):
+    """Raise UploadTooLarge if the upload's declared size (Streamlit knows it) exceeds the cap."""
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    declared = getattr(fileobj, "size", None)
+    if isinstance(declared, int) and declared > max_bytes:
+        raise _too_large(declared, max_bytes)
+
+
+def spool_upload(fileobj, max_bytes=None, name=None) -> SpooledPdf:
+    """
+    Copy a file-like object (e.g. Streamlit's UploadedFile) to a temp file.
+
+    Args:
+        fileobj: Readable binary file object; read from the start
+        max_bytes: Size cap (default: MAX_UPLOAD_BYTES)
+        name: Display name (default: fileobj.name)
+
+    Returns:
+        SpooledPdf; the caller closes it
+
+    Raises:
+        UploadTooLarge: the upload exceeds the cap (nothing is left on disk)
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    name = name if name is not None else getattr(fileobj, "name", "")
+
+    # Streamlit knows the size up front; refuse before copying anything
+    check_upload_size(fileobj, max_bytes)
+
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf", dir=SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(size, max_bytes)
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        _remove(path)
+        raise
+
+    return SpooledPdf(path, digest.hexdigest(), size, name)
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,84 @@
+# app_modules/performance_page.py
+"""
+Performance page: live per-stage percentiles and HTTP/cache counters
+from app_modules.metrics, with JSON-lines and OpenMetrics export.
+"""
+
+from datetime import datetime
+
+from app_modules import metrics
+
+REFRESH_SECONDS = 5
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _stage_rows(stages: dict) -> list:
+    return [
+        {
+            "Steg": name,
+            "Antall": row["count"],
+            "Feil": row["errors"],
+            "p50 ms": _ms(row["p50"]),
+            "p95 ms": _ms(row["p95"]),
+            "p99 ms": _ms(row["p99"]),
+            "Maks ms": _ms(row["max"]),
+            "Snitt ms": _ms(row["mean"]),
+        }
+        for name, row in stages.items()
+    ]
+
+
+def _render(st):
+    snap = metrics.snapshot()
+    since = datetime.fromtimestamp(snap["since"]).strftime("%d.%m.%Y %H:%M:%S")
+    st.caption(f"Siden {since}, siste {metrics.WINDOW} målinger per steg. "
+               f"Oppdatert {datetime.fromtimestamp(snap['taken']).strftime('%H:%M:%S')}.")
+
+    st.subheader("⏱️ Steg")
+    if snap["stages"]:
+        st.dataframe(_stage_rows(snap["stages"]), use_container_width=True, hide_index=True)
+    else:
+        st.info("Ingen målinger ennå. Kjør et oppslag på hovedsiden.")
+
+    st.subheader("🌐 HTTP og cacher")
+    for name, values in snap["sources"].items():
+        with st.expander(f"{name} ({len(values)} verdier)", expanded=name == "http"):
+            if values:
+                st.dataframe([{"Nøkkel": k, "Verdi": v} for k, v in sorted(values.items())],
+                             use_container_width=True, hide_index=True)
+            else:
+                st.write("Ingen data ennå.")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("⬇️ JSON lines", metrics.to_jsonl(snap), file_name="metrics.jsonl",
+                           mime="application/x-ndjson", use_container_width=True)
+    with col2:
+        st.download_button("⬇️ OpenMetrics", metrics.to_openmetrics(snap), file_name="metrics.txt",
+                           mime="application/openmetrics-text; version=1.0.0; charset=utf-8",
+                           use_container_width=True)
+    with col3:
+        if st.button("🗑️ Nullstill målinger", use_container_width=True):
+            metrics.reset()
+            st.rerun()
+
+
+# ---------------------------------------------------------
+# PAGE VIEW (so it works as a selectable page)
+# ---------------------------------------------------------
+def run():
+    import streamlit as st
+
+    st.title("📈 Performance")
+    st.write("Hvor tiden går: persentiler per steg i denne prosessen, pluss HTTP-kall og cache-treff.")
+
+    live = st.toggle(f"Oppdater automatisk hvert {REFRESH_SECONDS}. sekund", value=True, key="perf_live")
+
+    @st.fragment(run_every=REFRESH_SECONDS if live else None)
+    def live_view():
+        _render(st)
+
+    live_view()
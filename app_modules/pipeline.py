@@ -0,0 +1,108 @@
+# app_modules/pipeline.py
+"""
+Per-session memoization of the main page's enrichment stages.
+
+Streamlit reruns the whole page on every interaction (typing in the search
+box, toggling the Proff.no log, clicking a button). The enrichment stages
+have explicit inputs, so only the ones whose inputs changed run again:
+
+    search   the search query
+    brreg    org number (or the raw search hit when there is none)
+    summary  the formatted BRREG company data
+    proff    org number
+    pdf      (file name, content SHA-256) of every uploaded PDF
+
+The memo is a plain dict the caller keeps per session
+(st.session_state). It holds the last output of each stage with the hash
+of its inputs; a stage whose inputs differ from last time is recomputed
+and replaces the entry. Outputs that represent a failure are not kept,
+so the next rerun tries again.
+
+The process-wide caches (brreg_cache, pdf_cache, Proff.no lookups) still
+apply underneath; this layer skips even the work of asking them.
+"""
+
+import hashlib
+import threading
+
+from app_modules import metrics
+from app_modules.jobs import job_key
+
+STAGES = ("search", "brreg", "summary", "proff", "pdf")
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def is_fresh(memo, stage: str, inputs) -> bool:
+    """True if the memo holds this stage's output for exactly these inputs."""
+    if memo is None:
+        return False
+    entry = memo.get(stage)
+    return entry is not None and entry[0] == job_key(stage, inputs)
+
+
+def run_stage(memo, stage: str, inputs, compute, keep=None):
+    """
+    Output of compute() for these inputs, reused from the memo when the
+    stage's inputs haven't changed since the last run.
+
+    Args:
+        memo: Per-session dict (None: always compute)
+        stage: One of STAGES
+        inputs: Anything JSON-serializable (bytes are hashed)
+        compute: Zero-argument callable producing the output
+        keep: Optional predicate; outputs for which it is false (failures)
+              are returned but not memoized
+
+    Returns:
+        The stage output.
+    """
+    if memo is None:
+        return compute()
+
+    key = job_key(stage, inputs)
+    entry = memo.get(stage)
+    if entry is not None and entry[0] == key:
+        _count("hits")
+        return entry[1]
+
+    _count("misses")
+    output = compute()
+    if keep is None or keep(output):
+        memo[stage] = (key, output)
+    else:
+        memo.pop(stage, None)
+    return output
+
+
+def upload_digests(memo, uploads) -> list:
+    """
+    (file name, SHA-256) per Streamlit upload, hashing each upload only
+    once per session (remembered by its file_id).
+    """
+    known = memo.setdefault("uploads", {}) if memo is not None else {}
+    digests, current = [], set()
+    for upload in uploads or []:
+        file_id = getattr(upload, "file_id", None) or id(upload)
+        current.add(file_id)
+        if file_id not in known:
+            with upload.getbuffer() as view:
+                known[file_id] = hashlib.sha256(view).hexdigest()
+        digests.append((upload.name, known[file_id]))
+    for file_id in set(known) - current:
+        del known[file_id]  # removed from the uploader
+    return digests
+
+
+def memo_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+metrics.register_source("pipeline_memo", memo_stats)
@@ -1,19 +1,276 @@
-import streamlit as st
-import requests
+# app_modules/template_loader.py
+"""
+Process-wide cache for the Excel template.
 
-TEMPLATE_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQZgo_lI3n1uTuOz6DzJnKUU--_Cs991MzQ_NNtkqxUmEq5k8W6Qki_O0hwngLVxHoD9GcAxRG-mq7w/pub?output=xlsx"
+The template is published from Google Sheets. The last good copy is kept
+on disk (with its SHA-256) and in memory, and shared by every session:
 
-def load_template():
+- pinned file (TEMPLATE_PATH):  always used, never touches the network
+- memory/disk copy:             served immediately; revalidated in the
+                                background every TEMPLATE_REVALIDATE_SECONDS
+                                with If-None-Match / If-Modified-Since
+- nothing cached yet:           downloaded once, then cached (prefetch and
+                                concurrent callers share one download)
+
+If Google is slow or unreachable the last good copy keeps being served.
+
+Settings (environment variables):
+    TEMPLATE_URL                  published xlsx URL
+    TEMPLATE_PATH                 pin a local template file (air-gapped runs)
+    TEMPLATE_CACHE_DIR            default <repo>/.cache/template
+    TEMPLATE_REVALIDATE_SECONDS   default 600
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from app_modules import http_client
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATE_URL = os.environ.get(
+    "TEMPLATE_URL",
+    "https://docs.google.com/spreadsheets/d/e/2PACX-1vQZgo_lI3n1uTuOz6DzJnKUU--_Cs991MzQ_NNtkqxUmEq5k8W6Qki_O0hwngLVxHoD9GcAxRG-mq7w/pub?output=xlsx",
+)
+TEMPLATE_PATH = os.environ.get("TEMPLATE_PATH", "")
+CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", os.path.join(_REPO_ROOT, ".cache", "template"))
+REVALIDATE_SECONDS = float(os.environ.get("TEMPLATE_REVALIDATE_SECONDS", 600))
+
+_lock = threading.Lock()
+_state = {"bytes": None, "meta": None}
+_revalidating = threading.Event()
+_loading = None  # Future of the cold load in progress (disk or download)
+
+
+# ---------------------------------------------------------
+# DISK CACHE
+# ---------------------------------------------------------
+def _cache_paths():
+    return os.path.join(CACHE_DIR, "template.xlsx"), os.path.join(CACHE_DIR, "template.json")
+
+
+def _read_disk():
+    data_path, meta_path = _cache_paths()
     try:
-        response = requests.get(TEMPLATE_URL)
-        response.raise_for_status()
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None, None
+
+    if hashlib.sha256(data).hexdigest() != meta.get("sha256"):
+        logger.warning("Cached template is corrupt, ignoring %s", data_path)
+        return None, None
+    return data, meta
 
-        template_bytes = response.content  # <-- THIS is what fill_excel needs
 
-        st.session_state["template_bytes"] = template_bytes
-        st.success("Excel template loaded from Google Sheets")
-        return template_bytes
+def _write_disk(data, meta: dict):
+    """Write bytes (skipped when None, e.g. after a 304) and metadata atomically."""
+    data_path, meta_path = _cache_paths()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for path, payload in ((data_path, data), (meta_path, json.dumps(meta).encode("utf-8"))):
+        if payload is None:
+            continue
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+
+
+# ---------------------------------------------------------
+# NETWORK
+# ---------------------------------------------------------
+def _download(meta=None):
+    """
+    Conditional GET against TEMPLATE_URL.
+    Returns (bytes, meta); bytes is None when the server answered 304.
+    """
+    headers = {}
+    if meta and meta.get("url") == TEMPLATE_URL:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = http_client.get(TEMPLATE_URL, headers=headers, timeout=30)
+    now = time.time()
+
+    if response.status_code == 304:
+        return None, dict(meta, validated_at=now)
+
+    response.raise_for_status()
+    data = response.content
+    new_meta = {
+        "url": TEMPLATE_URL,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "fetched_at": now,
+        "validated_at": now,
+    }
+    return data, new_meta
+
+
+def _revalidate():
+    try:
+        with _lock:
+            meta = _state["meta"]
+        data, new_meta = _download(meta)
+
+        with _lock:
+            if data is not None:
+                _state["bytes"] = data
+            _state["meta"] = new_meta
+        _write_disk(data, new_meta)
+
+    except Exception as e:
+        # Keep serving the last good copy
+        logger.warning("Template revalidation failed: %s", e)
+    finally:
+        _revalidating.clear()
+
+
+def _schedule_revalidation():
+    with _lock:
+        if _revalidating.is_set():
+            return
+        _revalidating.set()
+    threading.Thread(target=_revalidate, name="template-revalidate", daemon=True).start()
+
+
+def _load_cold():
+    """
+    Fill memory from the disk copy, else download, when nothing is loaded
+    yet. Only one caller (prefetch thread or request) loads; the others
+    wait for its result instead of downloading again.
+    Returns (bytes, meta); raises the loader's error.
+    """
+    global _loading
+    with _lock:
+        if _state["bytes"] is not None:
+            return _state["bytes"], _state["meta"]
+        future = _loading
+        if future is None:
+            future = _loading = Future()
+            owner = True
+        else:
+            owner = False
+    if not owner:
+        return future.result()
+
+    try:
+        data, meta = _read_disk()
+        if data is None:
+            data, meta = _download()
+            try:
+                _write_disk(data, meta)
+            except OSError as e:
+                logger.warning("Could not write template cache: %s", e)
+        with _lock:
+            _state["bytes"], _state["meta"] = data, meta
+        future.set_result((data, meta))
+        return data, meta
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _loading = None
+
+
+# ---------------------------------------------------------
+# PUBLIC API
+# ---------------------------------------------------------
+def _load_pinned() -> bytes:
+    mtime = os.path.getmtime(TEMPLATE_PATH)
+    with _lock:
+        meta = _state["meta"]
+        if meta and meta.get("path") == TEMPLATE_PATH and meta.get("mtime") == mtime:
+            return _state["bytes"]
+
+    with open(TEMPLATE_PATH, "rb") as f:
+        data = f.read()
+    with _lock:
+        _state["bytes"] = data
+        _state["meta"] = {
+            "path": TEMPLATE_PATH,
+            "mtime": mtime,
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+    return data
+
+
+def get_template_bytes() -> bytes:
+    """
+    Return the template bytes, from the pinned file, memory or disk if
+    possible. Only blocks on the network when no copy exists anywhere.
+    Raises if there is no copy and the download fails.
+    """
+    if TEMPLATE_PATH:
+        return _load_pinned()
+
+    with _lock:
+        data, meta = _state["bytes"], _state["meta"]
+
+    if data is None:
+        data, meta = _load_cold()
+
+    if time.time() - (meta.get("validated_at") or 0) > REVALIDATE_SECONDS:
+        _schedule_revalidation()
+    return data
+
+
+def get_template_info() -> dict:
+    """Metadata for the template currently served (sha256, source, timestamps)."""
+    with _lock:
+        meta = dict(_state["meta"] or {})
+    meta["source"] = "pinned file" if TEMPLATE_PATH else ("cache" if meta else "not loaded")
+    return meta
+
+
+def prefetch_template():
+    """
+    Start loading the template in the background so the first page that
+    needs it doesn't wait for Google.
+    """
+    with _lock:
+        needed = _state["bytes"] is None and _loading is None
+    if needed:
+        threading.Thread(target=_safe_prefetch, name="template-prefetch", daemon=True).start()
+
+
+def _safe_prefetch():
+    try:
+        get_template_bytes()
+    except Exception as e:
+        logger.warning("Template prefetch failed: %s", e)
+
+
+def load_template():
+    import streamlit as st
+
+    try:
+        return get_template_bytes()  # <-- THIS is what fill_excel needs
 
     except Exception as e:
         st.error(f"Could not load Excel template: {e}")
         st.stop()
+
+
+# ---------------------------------------------------------
+# PAGE VIEW (so it works as a selectable page)
+# ---------------------------------------------------------
+def run():
+    import streamlit as st
+
+    st.title("📁 Template Loader")
+    st.write("Excel-malen hentes fra Google Sheets og caches på disk.")
+    st.json(get_template_info())
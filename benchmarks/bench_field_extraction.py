@@ -0,0 +1,197 @@
+# benchmarks/bench_field_extraction.py
+"""
+Fuzz and scaling check for pdf_parser's single-pass field extraction.
+
+1. Equivalence: random tender-like documents (company blocks, org numbers,
+   addresses, amounts, dates, noise, short whitespace runs) must give the
+   same fields as the reference below, the original one-regex-per-field
+   implementation.
+2. Scaling: extraction time per KiB must stay flat as the text grows, for
+   realistic text and for adversarial text (long whitespace runs, repeated
+   trigger words) that makes the reference backtrack.
+
+Usage:
+    python benchmarks/bench_field_extraction.py
+    python benchmarks/bench_field_extraction.py --docs 5000 --seed 3
+
+Exit code 1 on any mismatch, or if time per KiB grows more than 3x from
+the smallest to the largest size.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_modules import pdf_parser as pp  # noqa: E402
+from app_modules.pdf_parser import extract_fields_from_text  # noqa: E402
+
+# Reference runs are skipped above this size for adversarial text (seconds per run)
+REFERENCE_BUDGET = 2.0
+
+
+def reference_fields(txt: str) -> dict:
+    """The original implementation: one full-text search per regex."""
+    fields = {}
+    if not txt:
+        return fields
+
+    m = pp.ORG_IN_TEXT_RE.search(txt)
+    if m:
+        fields["org_number"] = m.group(2)
+    else:
+        m2 = pp.ORG_RE.search(txt)
+        if m2:
+            fields["org_number"] = m2.group(1)
+
+    m3 = pp.COMPANY_WITH_SUFFIX_RE.search(txt)
+    if m3:
+        fields["company_name"] = m3.group(0).strip()
+    else:
+        for line in txt.splitlines():
+            line = line.strip()
+            if len(line) > 3 and line == line.title():
+                fields["company_name"] = line
+                break
+
+    mpc = pp.POST_CITY_RE.search(txt)
+    if mpc:
+        fields["post_nr"] = mpc.group(1)
+        fields["city"] = mpc.group(2).strip()
+
+    maddr = pp.ADDRESS_RE.search(txt)
+    if maddr:
+        fields["address"] = maddr.group(1).strip()
+
+    mrev = pp.REVENUE_RE.search(txt)
+    if mrev:
+        fields["revenue_2024"] = mrev.group(1).strip()
+
+    mdate = pp.DEADLINE_RE.search(txt)
+    if mdate:
+        fields["tender_deadline"] = mdate.group(1).strip()
+
+    return fields
+
+
+# ---------------------------------------------------------
+# GENERATORS
+# ---------------------------------------------------------
+WORDS = ("anbud tilbud kontrakt oppdragsgiver entreprise bygg anlegg prosjekt krav frist "
+         "levering pris vedlegg da as ks ba enk selskap organisasjon omsetning org nr "
+         "Oslo Bergen Stathelle Tangen-Bygg Nordic Vei & Anlegg").split()
+SUFFIXES = ("AS", "ASA", "ANS", "DA", "ENK", "KS", "BA", "as", "Asa")
+
+
+def _fragment(rng: random.Random) -> str:
+    kind = rng.randrange(12)
+    if kind == 0:
+        return f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {rng.choice(SUFFIXES)}"
+    if kind == 1:
+        label = rng.choice(["Organisasjonsnummer", "Org.nr", "org nr", "Orgnummer", "ORG NR", "orgnr"])
+        sep = rng.choice([": ", ":", " ", "\n", "  "])
+        return f"{label}{sep}{rng.randrange(10**8, 10**9)}"
+    if kind == 2:
+        return str(rng.randrange(10**8, 10**10))
+    if kind == 3:
+        return f"{rng.choice(WORDS).title()}veien {rng.randint(1, 999)}{rng.choice(['', 'B', 'c'])}"
+    if kind == 4:
+        return f"{rng.randint(0, 9999):04d} {rng.choice(WORDS).upper()}"
+    if kind == 5:
+        return f"Omsetning{rng.choice([' 2024', '', ' 2023'])}: {rng.randint(1, 999)} {rng.randint(0, 999):03d} kr"
+    if kind == 6:
+        return (f"{rng.choice(['Anbudsfrist', 'Frist', 'frist for tilbud'])}: "
+                f"{rng.randint(1, 31)}.{rng.randint(1, 12)}.{rng.choice(['2025', '25'])}")
+    if kind == 7:
+        return rng.choice([" ", "\n", "\t", "  ", "\n\n", " - ", ": ", ", "])
+    if kind == 8:
+        return "".join(rng.choice("abcæøå ABC.-&:0123456789\n") for _ in range(rng.randint(1, 30)))
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+
+
+def random_document(rng: random.Random, fragments: int) -> str:
+    return rng.choice(["", " ", "\n"]).join(_fragment(rng) for _ in range(fragments))
+
+
+def realistic_text(size: int, seed: int = 0) -> str:
+    """Body text with the company block at the end (worst case for early stop)."""
+    rng = random.Random(seed)
+    filler = []
+    total = 0
+    while total < size:
+        line = " ".join(rng.choice(WORDS[:10]) for _ in range(rng.randint(8, 16)))
+        filler.append(line)
+        total += len(line) + 1
+    return "\n".join(filler) + "\nTangen-Bygg AS\nOrg.nr: 992531762\nKrabberødstrand 118\n3960 Stathelle\n"
+
+
+def adversarial_text(size: int) -> str:
+    """Long whitespace runs after letters, trigger words and digits: no field ever matches."""
+    unit = "abc" + " " * 200 + "org" + "\t" * 100 + "omsetning" + " " * 100 + "x da" + ":" + " " * 50
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def _seconds(func, txt, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(txt)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzz- og skaleringstest for PDF-feltuttrekk.")
+    parser.add_argument("--docs", type=int, default=2000, help="Antall tilfeldige dokumenter")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    failures = 0
+
+    rng = random.Random(args.seed)
+    mismatches = []
+    for i in range(args.docs):
+        doc = random_document(rng, rng.randint(1, 60))
+        if extract_fields_from_text(doc) != reference_fields(doc):
+            mismatches.append(doc)
+    print(f"Ekvivalens: {args.docs - len(mismatches)}/{args.docs} like som referansen")
+    for doc in mismatches[:3]:
+        print("  AVVIK:", repr(doc[:200]))
+        print("    ny:  ", extract_fields_from_text(doc))
+        print("    ref: ", reference_fields(doc))
+    failures += len(mismatches)
+
+    sizes = [16, 64, 256, 1024]  # KiB
+    for name, make in (("realistisk", realistic_text), ("adversarial", adversarial_text)):
+        print(f"\n{name:<12} {'KiB':>6} {'ny ms':>9} {'ms/KiB':>8} {'referanse ms':>13}")
+        per_kib = []
+        reference_ok = True
+        for kib in sizes:
+            txt = make(kib * 1024)
+            new = _seconds(extract_fields_from_text, txt)
+            per_kib.append(new * 1000 / kib)
+            ref_text = "-"
+            if reference_ok:
+                ref = _seconds(reference_fields, txt, repeat=1)
+                ref_text = f"{ref * 1000:.1f}"
+                reference_ok = ref < REFERENCE_BUDGET / 4
+                if extract_fields_from_text(txt) != reference_fields(txt):
+                    ref_text += " AVVIK"
+                    failures += 1
+            print(f"{'':<12} {kib:>6} {new * 1000:>9.2f} {per_kib[-1]:>8.3f} {ref_text:>13}")
+        growth = per_kib[-1] / per_kib[0]
+        print(f"{'':<12} tid per KiB, største/minste: {growth:.2f}x")
+        if growth > 3:
+            failures += 1
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# benchmarks/bench_pdf_backends.py
+"""
+Compare the PDF text backends on speed and field extraction.
+
+For every fixture (benchmarks/pdf_fixtures.py, or your own PDFs) and every
+backend in pdf_parser.PDF_BACKENDS plus "auto", it times
+extract_text_from_pdf in-process and checks that extract_fields_from_pdf
+gives the same fields as pdfplumber, the reference.
+
+Usage:
+    python benchmarks/bench_pdf_backends.py
+    python benchmarks/bench_pdf_backends.py --repeat 5 --pdf tender.pdf
+
+Exit code 1 if "auto" extracts different fields than pdfplumber for any
+document.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app_modules import pdf_parser  # noqa: E402
+from pdf_fixtures import standard_fixtures  # noqa: E402
+
+REFERENCE = "pdfplumber"
+
+
+def _best(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sammenlign PDF-tekstmotorer (fart og felt).")
+    parser.add_argument("--repeat", type=int, default=3, help="Antall målinger (beste teller)")
+    parser.add_argument("--pdf", nargs="*", help="Egne PDF-filer (standard: genererte anbudsdokumenter)")
+    args = parser.parse_args(argv)
+
+    if args.pdf:
+        docs = {}
+        for path in args.pdf:
+            with open(path, "rb") as f:
+                docs[os.path.basename(path)] = f.read()
+    else:
+        docs = standard_fixtures()
+
+    backends = ["auto"] + list(pdf_parser.PDF_BACKENDS)
+    print(f"auto = {pdf_parser._resolve_backend('auto')}  |  MAX_PAGES {pdf_parser.MAX_PAGES}  |  "
+          f"beste av {args.repeat}, én prosess")
+    print(f"{'dokument':<14} {'motor':<11} {'sekunder':>9} {'faktor':>7} {'tegn':>7}  felt")
+
+    failures = 0
+    for name, data in docs.items():
+        reference_fields = pdf_parser.extract_fields_from_pdf(data, backend=REFERENCE)
+        reference_time = None
+        rows = []
+        for backend in [REFERENCE] + [b for b in backends if b != REFERENCE]:
+            text = pdf_parser.extract_text_from_pdf(data, workers=1, backend=backend)
+            seconds = _best(lambda: pdf_parser.extract_text_from_pdf(data, workers=1, backend=backend),
+                            args.repeat)
+            reference_time = reference_time or seconds
+            fields = pdf_parser.extract_fields_from_pdf(data, backend=backend)
+            if fields == reference_fields:
+                status = "like"
+            else:
+                diff = sorted(k for k in set(fields) | set(reference_fields)
+                              if fields.get(k) != reference_fields.get(k))
+                status = f"AVVIK: {', '.join(diff)}"
+                if backend == "auto":
+                    failures += 1
+            rows.append(f"{name:<14} {backend:<11} {seconds:>9.3f} {reference_time / seconds:>6.1f}x "
+                        f"{len(text):>7}  {status}")
+        print("\n".join(rows))
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# benchmarks/bench_pdf_extract.py
+"""
+Benchmark page-parallel PDF text extraction.
+
+Times pdf_parser.extract_text_from_pdf in-process (workers=1) against the
+process pool for each worker count, over the generated tender fixtures
+(benchmarks/pdf_fixtures.py) or your own PDFs. The parallel text must be
+identical to the in-process text.
+
+The pool is only used for the slow backends, so this runs pdfplumber
+unless --backend says otherwise.
+
+The pool is warmed up before timing, as it stays alive in the app and in
+batch runs. Speedup is bounded by the number of CPU cores: on one core it
+measured 0.9-1.0x, which is why PDF_WORKERS defaults to 1. Run this on the
+production host before raising it there.
+
+Usage:
+    python benchmarks/bench_pdf_extract.py
+    python benchmarks/bench_pdf_extract.py --workers 1 2 4 --repeat 3 --pdf a.pdf b.pdf
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app_modules import pdf_parser  # noqa: E402
+from pdf_fixtures import standard_fixtures  # noqa: E402
+
+
+def _best(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark parallell PDF-tekstuttrekk.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="Antall prosesser å teste")
+    parser.add_argument("--repeat", type=int, default=3, help="Antall målinger (beste teller)")
+    parser.add_argument("--pdf", nargs="*", help="Egne PDF-filer (standard: genererte anbudsdokumenter)")
+    parser.add_argument("--backend", default="pdfplumber", help="Tekstmotor (standard: pdfplumber)")
+    args = parser.parse_args(argv)
+
+    if args.pdf:
+        docs = {}
+        for path in args.pdf:
+            with open(path, "rb") as f:
+                docs[os.path.basename(path)] = f.read()
+    else:
+        docs = standard_fixtures()
+
+    print(f"CPU-kjerner: {os.cpu_count()}  |  MAX_PAGES: {pdf_parser.MAX_PAGES}  |  beste av {args.repeat}")
+    header = f"{'dokument':<20} {'1 prosess':>10}" + "".join(f" {f'{w} prosesser':>14}" for w in args.workers)
+    print(header)
+
+    failures = 0
+    for name, data in docs.items():
+        serial_text = pdf_parser.extract_text_from_pdf(data, workers=1, backend=args.backend)
+        serial = _best(lambda: pdf_parser.extract_text_from_pdf(data, workers=1, backend=args.backend), args.repeat)
+        row = f"{name:<20} {serial:>9.2f}s"
+
+        for workers in args.workers:
+            text = pdf_parser.extract_text_from_pdf(data, workers=workers, backend=args.backend)  # warm-up + check
+            if text != serial_text:
+                failures += 1
+                row += f" {'AVVIK':>14}"
+                continue
+            seconds = _best(lambda: pdf_parser.extract_text_from_pdf(data, workers=workers, backend=args.backend), args.repeat)
+            row += f" {seconds:>6.2f}s {serial / seconds:>5.1f}x"
+        print(row)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
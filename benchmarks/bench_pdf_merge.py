@@ -0,0 +1,115 @@
+# benchmarks/bench_pdf_merge.py
+"""
+Several PDFs per company: concurrent parsing and deterministic merge.
+
+Parses a tender document, an annual report and a vehicle list
+(benchmarks/pdf_fixtures.py, or your own PDFs) with the cache cleared
+before each run:
+
+    one after another   sum of the per-file times
+    threads             pdf_merge.parse_pdfs(processes=0): close to the
+                        sum, since PDFium calls are serialized by
+                        pdf_parser's lock and pdfplumber holds the GIL
+    processes           pdf_merge.parse_pdfs(processes=N): each file in
+                        its own worker process (own PDFium), close to the
+                        slowest file when there are enough cores
+
+The process pool is started before timing (a running app keeps it).
+The merged fields must be the same for every upload order.
+
+Usage:
+    python benchmarks/bench_pdf_merge.py
+    python benchmarks/bench_pdf_merge.py --backend pdfplumber --pages 20
+    python benchmarks/bench_pdf_merge.py --pdf anbud.pdf arsrapport.pdf
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app_modules import pdf_cache, pdf_parser  # noqa: E402
+from app_modules.pdf_merge import DOCUMENT_KINDS, merge_pdf_fields, parse_pdfs  # noqa: E402
+from pdf_fixtures import annual_report_document, tender_document, vehicle_list_document  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Flere PDF-er per selskap: samtidig parsing og fletting.")
+    parser.add_argument("--pages", type=int, default=6, help="Sider per genererte PDF")
+    parser.add_argument("--backend", default=pdf_parser.PDF_BACKEND, help="Tekstmotor (standard: PDF_BACKEND)")
+    parser.add_argument("--repeat", type=int, default=3, help="Antall målinger (beste teller)")
+    parser.add_argument("--pdf", nargs="*", help="Egne PDF-filer")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Prosesser for samtidig parsing (standard: én per fil)")
+    args = parser.parse_args(argv)
+
+    pdf_parser.PDF_BACKEND = args.backend
+    tmp = tempfile.TemporaryDirectory(prefix="bench-merge-")  # removed on exit
+    if args.pdf:
+        paths = args.pdf
+    else:
+        paths = []
+        for name, make in (("anbud_tangen.pdf", tender_document),
+                           ("aarsrapport_2024.pdf", annual_report_document),
+                           ("kjoretoyliste.pdf", vehicle_list_document)):
+            path = os.path.join(tmp.name, name)
+            with open(path, "wb") as f:
+                f.write(make(args.pages))
+            paths.append(path)
+
+    processes = args.processes or len(paths)
+    print(f"Motor: {pdf_parser._resolve_backend(args.backend)}  |  CPU-kjerner: {os.cpu_count()}  |  "
+          f"prosesser: {processes}  |  beste av {args.repeat}")
+
+    per_file = {}
+    for path in paths:
+        best = float("inf")
+        for _ in range(args.repeat):
+            pdf_cache.clear_cache()
+            started = time.perf_counter()
+            pdf_cache.get_parsed_pdf(path)
+            best = min(best, time.perf_counter() - started)
+        per_file[path] = best
+
+    # Start the pool and its imports outside the timing
+    pdf_cache.clear_cache()
+    parse_pdfs(paths, processes=processes)
+
+    walls = {}
+    for label, n in (("tråder", 0), ("prosesser", processes)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            pdf_cache.clear_cache()
+            started = time.perf_counter()
+            documents = parse_pdfs(paths, processes=n)
+            best = min(best, time.perf_counter() - started)
+        walls[label] = best
+
+    for doc, path in zip(documents, paths):
+        print(f"  {doc['name']:<24} {DOCUMENT_KINDS[doc['kind']][0]:<15} {len(doc['fields']):>2} felt  "
+              f"{per_file[path]:.3f} s{'  FEIL: ' + doc['error'] if doc['error'] else ''}")
+    slowest, total = max(per_file.values()), sum(per_file.values())
+    print(f"Etter hverandre: {total:.3f} s  |  tregeste fil: {slowest:.3f} s")
+    for label, wall in walls.items():
+        print(f"  {label:<10} {wall:.3f} s  ({total / wall:.2f}x raskere enn etter hverandre, "
+              f"{wall / slowest:.2f}x tregeste fil)")
+
+    fields, sources = merge_pdf_fields(documents)
+    print("\nFlettet:")
+    for key in sorted(fields):
+        print(f"  {key:<16} {fields[key]!r:<32} fra {sources[key]}")
+
+    # Same result for every upload order (kinds differ, so order never decides)
+    orders = list(itertools.permutations(documents))
+    failures = sum(1 for order in orders if merge_pdf_fields(list(order)) != (fields, sources))
+    print(f"\nRekkefølger med samme resultat: {len(orders) - failures}/{len(orders)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# benchmarks/bench_pdf_upload.py
+"""
+Peak memory of PDF ingestion, old vs new, per entry point.
+
+    batch    old: read the whole file -> get_pdf_fields(bytes)
+             new: get_pdf_fields(path)   (backends read the file lazily)
+    upload   old: UploadedFile.read() -> get_pdf_fields(bytes)   (input.py)
+             new: spool_upload(upload) -> get_pdf_fields(spooled)
+
+Peak is the Python allocation seen by tracemalloc while ingesting,
+excluding the upload object itself (Streamlit holds it either way).
+Memory inside PDFium (C) isn't traced. Both ways must give the same
+fields.
+
+Streamlit's UploadedFile is a BytesIO, whose read()/getvalue() of the
+whole, unmodified buffer returns it without copying; spooling costs a
+few chunk buffers there and pays off in what is held afterwards (nothing)
+and in the process pool reading the spooled file. Batch runs no longer
+read each PDF into memory at all.
+
+Usage:
+    python benchmarks/bench_pdf_upload.py
+    python benchmarks/bench_pdf_upload.py --pages 50 400 --pdf big.pdf
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app_modules import pdf_cache  # noqa: E402
+from app_modules.pdf_upload import spool_upload  # noqa: E402
+from pdf_fixtures import tender_document  # noqa: E402
+
+
+def _batch_old(path):
+    with open(path, "rb") as f:
+        return pdf_cache.get_pdf_fields(f.read())
+
+
+def _batch_new(path):
+    return pdf_cache.get_pdf_fields(path)
+
+
+def _upload_old(upload):
+    return pdf_cache.get_pdf_fields(upload.read())
+
+
+def _upload_new(upload):
+    with spool_upload(upload) as pdf:
+        return pdf_cache.get_pdf_fields(pdf)
+
+
+def _measure(func, arg):
+    pdf_cache.clear_cache()
+    tracemalloc.start()
+    started = time.perf_counter()
+    fields = func(arg)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return fields, peak / 2**20, seconds
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Minnebruk ved PDF-innlesing: hele bytes mot fil/spooling.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 200, 800], help="Sidetall for genererte PDF-er")
+    parser.add_argument("--pdf", nargs="*", help="Egne PDF-filer")
+    args = parser.parse_args(argv)
+
+    docs = {f"tender_{n}p": tender_document(n, seed=n) for n in args.pages}
+    for path in args.pdf or []:
+        with open(path, "rb") as f:
+            docs[os.path.basename(path)] = f.read()
+
+    print(f"{'dokument':<14} {'MiB':>6} {'inngang':<8} {'gammel MiB':>11} {'ny MiB':>8} "
+          f"{'gammel s':>9} {'ny s':>7}  felt")
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, data in docs.items():
+            path = os.path.join(tmp, f"{name}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+
+            for label, old, new, arg in (
+                ("batch", _batch_old, _batch_new, lambda: path),
+                ("upload", _upload_old, _upload_new, lambda: io.BytesIO(data)),
+            ):
+                old_fields, old_peak, old_s = _measure(old, arg())
+                new_fields, new_peak, new_s = _measure(new, arg())
+                status = "like" if old_fields == new_fields else "AVVIK"
+                failures += status != "like"
+                print(f"{name:<14} {len(data) / 2**20:>6.1f} {label:<8} {old_peak:>11.2f} {new_peak:>8.2f} "
+                      f"{old_s:>9.3f} {new_s:>7.3f}  {status}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
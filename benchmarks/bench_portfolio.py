@@ -0,0 +1,100 @@
+# benchmarks/bench_portfolio.py
+"""
+Portfolio workbook: memory and time against the number of companies.
+
+Writes N synthetic companies (BRREG fields plus five years of Proff.no
+financials) with PortfolioWriter (openpyxl write-only mode, streamed) and,
+for comparison, with a normal openpyxl workbook holding every cell until
+save. Peak memory is traced with tracemalloc (Python allocations, which
+is where openpyxl keeps its cells); times include tracemalloc's overhead,
+so compare them with each other, not with real runs.
+
+Usage:
+    python benchmarks/bench_portfolio.py
+    python benchmarks/bench_portfolio.py --companies 1000 10000 50000 --skip-normal
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_modules.Sheets.portfolio import (  # noqa: E402
+    PORTFOLIO_FIELDS, PORTFOLIO_SHEET, PortfolioWriter, column_label, portfolio_row,
+)
+
+
+def company(i: int) -> dict:
+    fields = {
+        "company_name": f"Selskap {i} AS",
+        "org_number": str(900000000 + i),
+        "address": f"Storgata {i % 200 + 1}",
+        "post_nr": f"{i % 9000 + 1000:04d}",
+        "city": "OSLO",
+        "employees": str(i % 500),
+        "nace_code": "41.200",
+        "nace_description": "Oppføring av bygninger",
+    }
+    for key in ("sum_driftsinnt", "driftsresultat", "ord_res_f_skatt", "sum_eiendeler"):
+        for year in range(2020, 2025):
+            fields[f"{key}_{year}"] = str((i * 7919 + year * 31) % 100000 - 5000)
+    return fields
+
+
+def write_streamed(path: str, n: int):
+    with PortfolioWriter(path) as writer:
+        for i in range(n):
+            writer.add(company(i))
+
+
+def write_normal(path: str, n: int):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = PORTFOLIO_SHEET
+    ws.append([column_label(field) for field in PORTFOLIO_FIELDS] + ["Merknad"])
+    for i in range(n):
+        ws.append(portfolio_row(company(i)))
+    wb.save(path)
+
+
+def measure(func, n: int) -> tuple:
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        tracemalloc.start()
+        started = time.perf_counter()
+        func(path, n)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return seconds, peak, os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Minne og tid for porteføljearbeidsboken.")
+    parser.add_argument("--companies", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--skip-normal", action="store_true", help="Bare strømmet skriving")
+    args = parser.parse_args(argv)
+
+    print(f"{'selskaper':>10} {'modus':<10} {'tid s':>8} {'rader/s':>9} {'topp MiB':>9} {'fil KiB':>9}")
+    modes = [("strømmet", write_streamed)] + ([] if args.skip_normal else [("normal", write_normal)])
+    for _, func in modes:
+        measure(func, 1)  # imports and first-use caches out of the measurement
+    for n in args.companies:
+        for label, func in modes:
+            seconds, peak, size = measure(func, n)
+            print(f"{n:>10} {label:<10} {seconds:>8.2f} {n / seconds:>9.0f} "
+                  f"{peak / 2**20:>9.1f} {size / 1024:>9.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# benchmarks/bench_proff_parser.py
+"""
+Benchmark and regression check for the Proff.no HTML parsing.
+
+For every saved page it times the original path (whole page, html.parser,
+full-text table scan) against the fast path (only <table>/<a> elements,
+lxml if installed, header-keyword table lookup). Both must return the
+same result, and it must match <page>.expected.json when that exists.
+
+Pages named search_*.html are parsed as search results (company link),
+all other *.html files as company pages (financial fields).
+
+Usage:
+    python benchmarks/bench_proff_parser.py
+    python benchmarks/bench_proff_parser.py --pages saved_pages/ --repeat 20
+    python benchmarks/bench_proff_parser.py --write-expected   # after a markup change
+
+Exit code 1 if any page gives a different or unexpected result.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_modules.Sheets.Sammendrag import proff_getter  # noqa: E402
+
+DEFAULT_PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "proff")
+
+
+def _parse(path, html, fast):
+    if os.path.basename(path).startswith("search_"):
+        return proff_getter.find_company_link(html, fast=fast)
+    return proff_getter.parse_financial_page(html, fast=fast)
+
+
+def _best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Proff.no-parsing over lagrede sider.")
+    parser.add_argument("--pages", default=DEFAULT_PAGES, help="Mappe med lagrede .html-sider")
+    parser.add_argument("--repeat", type=int, default=10, help="Antall målinger per side (beste teller)")
+    parser.add_argument("--write-expected", action="store_true",
+                        help="Skriv <side>.expected.json fra den opprinnelige parseren")
+    args = parser.parse_args(argv)
+
+    pages = sorted(glob.glob(os.path.join(args.pages, "*.html")))
+    if not pages:
+        print(f"Fant ingen .html-sider i {args.pages}", file=sys.stderr)
+        return 2
+
+    print(f"Parser: {proff_getter.HTML_PARSER}  |  {len(pages)} sider  |  beste av {args.repeat}")
+    print(f"{'side':<28} {'KiB':>6} {'original ms':>12} {'rask ms':>9} {'faktor':>7}  resultat")
+
+    failures = 0
+    total_old = total_new = 0.0
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        old = _parse(path, html, fast=False)
+        new = _parse(path, html, fast=True)
+
+        expected_path = path[:-len(".html")] + ".expected.json"
+        if args.write_expected:
+            with open(expected_path, "w", encoding="utf-8") as f:
+                json.dump(old, f, ensure_ascii=False, indent=2, sort_keys=True)
+                f.write("\n")
+
+        status = "ok"
+        if old != new:
+            status = "AVVIK: rask != original"
+        elif os.path.exists(expected_path):
+            with open(expected_path, encoding="utf-8") as f:
+                if json.load(f) != new:
+                    status = "AVVIK: != expected.json"
+        if status != "ok":
+            failures += 1
+
+        old_ms = _best_ms(lambda: _parse(path, html, fast=False), args.repeat)
+        new_ms = _best_ms(lambda: _parse(path, html, fast=True), args.repeat)
+        total_old += old_ms
+        total_new += new_ms
+        print(f"{os.path.basename(path):<28} {len(html) / 1024:>6.0f} {old_ms:>12.2f} {new_ms:>9.2f} "
+              f"{old_ms / new_ms:>6.1f}x  {status}")
+
+    print(f"{'totalt':<28} {'':>6} {total_old:>12.2f} {total_new:>9.2f} {total_old / total_new:>6.1f}x")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
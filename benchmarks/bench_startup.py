@@ -0,0 +1,129 @@
+# benchmarks/bench_startup.py
+"""
+Cold start: time to first render of app.py and import time per page module.
+
+Every measurement runs in a fresh interpreter, so nothing is cached in
+sys.modules:
+
+- first render: app.py run once with streamlit.testing's AppTest (the
+  main page, as a new browser session sees it). Reported without and
+  with the time to import streamlit itself.
+- imports: `python -X importtime -c "import <module>"` for every module
+  in app.PAGES, with the heavy libraries each one pulls in.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 5 --budget-ms 600
+
+Exit code 1 if the first render imports one of HEAVY_LIBRARIES (they
+belong behind lazy imports) or takes longer than --budget-ms.
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(REPO_ROOT, "app.py")
+
+HEAVY_LIBRARIES = ("openpyxl", "pdfplumber", "pdfminer", "pypdfium2", "bs4", "lxml.etree", "pandas")
+
+_RENDER_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+done = time.perf_counter()
+print(json.dumps({
+    "render": done - imported,
+    "total": done - started,
+    "exceptions": [e.value for e in at.exception],
+    "heavy": [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+"""
+
+
+def page_modules() -> dict:
+    """PAGES from app.py, read without running it (it calls Streamlit at import)."""
+    with open(APP, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "PAGES" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise SystemExit("Fant ikke PAGES i app.py")
+
+
+def _run(args) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    return subprocess.run([sys.executable] + args, cwd=REPO_ROOT, env=env,
+                          capture_output=True, text=True, timeout=300)
+
+
+def first_render() -> dict:
+    proc = _run(["-c", _RENDER_SCRIPT, APP, json.dumps(HEAVY_LIBRARIES)])
+    if proc.returncode != 0:
+        raise SystemExit(f"Første visning feilet:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def import_time(module: str) -> dict:
+    """Cumulative import time of `module` (seconds) and the heavy libraries it loads."""
+    proc = _run(["-X", "importtime", "-c", f"import {module}"])
+    if proc.returncode != 0:
+        raise SystemExit(f"Import av {module} feilet:\n{proc.stderr}")
+    seconds, loaded = 0.0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if name == module:
+            seconds = int(cumulative) / 1e6
+        loaded.update(lib for lib in HEAVY_LIBRARIES if name == lib)
+    return {"seconds": seconds, "heavy": sorted(loaded)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Kaldstart: tid til første visning og importtid per side.")
+    parser.add_argument("--repeat", type=int, default=3, help="Målinger per tall (beste teller)")
+    parser.add_argument("--budget-ms", type=float, default=0,
+                        help="Feil hvis første visning (uten streamlit-import) tar lengre tid (0 = av)")
+    parser.add_argument("--json", action="store_true", help="Skriv resultatene som JSON")
+    args = parser.parse_args(argv)
+
+    renders = [first_render() for _ in range(max(1, args.repeat))]
+    render = min(renders, key=lambda r: r["render"])
+    imports = {}
+    for label, module in page_modules().items():
+        runs = [import_time(module) for _ in range(max(1, args.repeat))]
+        imports[module] = dict(min(runs, key=lambda r: r["seconds"]), page=label)
+
+    failures = []
+    if render["heavy"]:
+        failures.append(f"første visning importerer {', '.join(render['heavy'])}")
+    if render["exceptions"]:
+        failures.append(f"første visning kastet unntak: {render['exceptions']}")
+    if args.budget_ms and render["render"] * 1000 > args.budget_ms:
+        failures.append(f"første visning {render['render'] * 1000:.0f} ms > budsjett {args.budget_ms:g} ms")
+
+    if args.json:
+        print(json.dumps({"first_render": render, "imports": imports, "failures": failures}, indent=2))
+    else:
+        print(f"Første visning: {render['render'] * 1000:.0f} ms "
+              f"({render['total'] * 1000:.0f} ms med import av streamlit), beste av {len(renders)}")
+        print(f"Tunge biblioteker lastet ved start: {', '.join(render['heavy']) or 'ingen'}\n")
+        print(f"{'side':<22} {'modul':<46} {'import ms':>10}  tunge biblioteker")
+        for module, row in sorted(imports.items(), key=lambda item: -item[1]["seconds"]):
+            print(f"{row['page']:<22} {module:<46} {row['seconds'] * 1000:>10.0f}  {', '.join(row['heavy']) or '-'}")
+        for failure in failures:
+            print(f"\nFEIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
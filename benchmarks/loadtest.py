@@ -0,0 +1,410 @@
+# benchmarks/loadtest.py
+"""
+Load test: how many concurrent brokers one app process can serve.
+
+Starts local stand-ins for every outbound service, each on its own port
+with configurable latency and error rate:
+
+    brreg       data.brreg.no (search + entity, any org number, updates
+                feed filled with publish_update())
+    proff       proff.no (search page + company page, from fixtures)
+    wikipedia   no.wikipedia.org summary API
+    duckduckgo  api.duckduckgo.com
+    template    the Google Sheets xlsx export (ETag / 304 aware)
+
+and points the app at them through BRREG_BASE_URL, PROFF_BASE_URL,
+WIKIPEDIA_BASE_URL, DUCKDUCKGO_URL and TEMPLATE_URL. The BRREG bulk index,
+BRREG cache and template cache go to a temp directory, so every run
+starts cold.
+
+Each simulated session is a thread (Streamlit runs every session's
+script in a thread of one process) looping over the main page flow,
+without rendering:
+
+    search_brreg_live -> pick first hit -> spool_upload(PDF)
+    -> enrich_company -> get_template_bytes -> fill_excel
+
+For every --sessions level it reports throughput, flow latency
+percentiles, errors, peak RSS and the p95 of each stage (app_modules.metrics).
+
+Usage:
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --sessions 1 4 16 32 --duration 20
+    python benchmarks/loadtest.py --latency proff=600 brreg=150 --errors all=0.05
+    python benchmarks/loadtest.py --companies 20 --output loadtest.json   # repeat companies: cache hits
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(_BENCH_DIR)
+sys.path.insert(0, _REPO_ROOT)
+sys.path.insert(0, _BENCH_DIR)
+
+from pdf_fixtures import tender_document  # noqa: E402
+
+FIXTURES = os.path.join(_BENCH_DIR, "fixtures")
+DEFAULT_TEMPLATE = os.environ.get("TEMPLATE_PATH") or os.path.join(_REPO_ROOT, "Filled in with Tangen-Bygg-AS.xlsx")
+
+SERVICES = ("brreg", "proff", "wikipedia", "duckduckgo", "template")
+
+# Typical latencies seen from Norway (milliseconds); jittered ±50 %
+DEFAULT_LATENCY_MS = {"brreg": 80, "proff": 250, "wikipedia": 120, "duckduckgo": 150, "template": 400}
+
+FIXTURE_ORG = "992531762"
+
+
+def _read(*parts, mode="r"):
+    with open(os.path.join(FIXTURES, *parts), mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        return f.read()
+
+
+# ---------------------------------------------------------
+# STUB SERVERS
+# ---------------------------------------------------------
+class _Stub:
+    """Routes, latency and error rate for one stand-in service."""
+
+    def __init__(self, name, route, latency_ms, error_rate, seed):
+        self.name = name
+        self.route = route
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def delay_and_fail(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            delay = self.latency_ms * self.rng.uniform(0.5, 1.5) / 1000
+            fail = self.rng.random() < self.error_rate
+            self.errors += fail
+        time.sleep(delay)
+        return fail
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def do_GET(self):
+        stub = self.server.stub
+        if stub.delay_and_fail():
+            self._send(503, b"stub error", "text/plain")
+            return
+        parts = urlsplit(self.path)
+        status, body, content_type, headers = stub.route(unquote(parts.path), parse_qs(parts.query), self.headers)
+        self._send(status, body, content_type, headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _json(data, status=200):
+    return status, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json", None
+
+
+def _brreg_routes():
+    entity = json.loads(_read("brreg", "enheter_sample.json"))[0]
+
+    def make_entity(org):
+        return {**entity, "organisasjonsnummer": org, "navn": f"LASTTEST {org} AS", **route.changed.get(org, {})}
+
+    def route(path, query, headers):
+        prefix = "/enhetsregisteret/api/enheter"
+        if path == "/enhetsregisteret/api/oppdateringer/enheter":
+            # Updates feed: entries from oppdateringsid (or dato) on, `size` at a time
+            after = int(query.get("oppdateringsid", ["1"])[0])
+            since = query.get("dato", [""])[0]
+            size = int(query.get("size", ["20"])[0])
+            with route.lock:
+                page = [u for u in route.updates if u["oppdateringsid"] >= after and u["dato"] >= since][:size]
+            return _json({"_embedded": {"oppdaterteEnheter": page}} if page else {})
+        if path == prefix:
+            # Search: 5 hits with org numbers derived from the query
+            base = 800000000 + (abs(hash(query.get("navn", [""])[0])) % 100000000 // 10) * 10
+            return _json({"_embedded": {"enheter": [make_entity(str(base + i)) for i in range(5)]}})
+        if path.startswith(prefix + "/"):
+            org = path[len(prefix) + 1:]
+            if org.isdigit() and len(org) == 9 and org not in route.removed:
+                return _json(make_entity(org))
+        return _json({"feilmelding": "Ikke funnet"}, 404)
+    route.updates, route.changed, route.removed, route.lock = [], {}, set(), threading.Lock()
+    return route
+
+
+def publish_update(brreg_stub, org: str, endringstype: str = "Endring", **fields):
+    """Add an entry to the brreg stub's updates feed; `fields` change the entity it serves."""
+    route = brreg_stub.route
+    with route.lock:
+        if endringstype in ("Sletting", "Fjernet"):
+            route.removed.add(org)
+        route.changed.setdefault(org, {}).update(fields)
+        route.updates.append({
+            "oppdateringsid": len(route.updates) + 1,
+            "dato": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "organisasjonsnummer": org,
+            "endringstype": endringstype,
+        })
+
+
+def _proff_routes():
+    search_html = _read("proff", "search_results.html")
+    company_html = _read("proff", "company_full.html").encode("utf-8")
+
+    def route(path, query, headers):
+        if path.startswith("/bransjesøk"):
+            org = query.get("q", [""])[0]
+            return 200, search_html.replace(FIXTURE_ORG, org).encode("utf-8"), "text/html; charset=utf-8", None
+        if path.startswith("/selskap/"):
+            return 200, company_html, "text/html; charset=utf-8", None
+        return 404, b"not found", "text/plain", None
+    return route
+
+
+def _wikipedia_routes():
+    body = _read("summary", "wikipedia_summary.json").encode("utf-8")
+    return lambda path, query, headers: (200, body, "application/json", None)
+
+
+def _duckduckgo_routes():
+    body = _read("summary", "duckduckgo.json").encode("utf-8")
+    return lambda path, query, headers: (200, body, "application/json", None)
+
+
+def _template_routes(template_path):
+    with open(template_path, "rb") as f:
+        body = f.read()
+    etag = f'"{hash(body) & 0xffffffff:08x}"'
+
+    def route(path, query, headers):
+        if headers.get("If-None-Match") == etag:
+            return 304, b"", "application/octet-stream", {"ETag": etag}
+        return 200, body, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", {"ETag": etag}
+    return route
+
+
+def start_stubs(latency_ms: dict, error_rates: dict, template_path: str, seed: int = 1) -> dict:
+    """Start one server per service; returns {service: (_Stub, base URL)}."""
+    routes = {
+        "brreg": _brreg_routes(),
+        "proff": _proff_routes(),
+        "wikipedia": _wikipedia_routes(),
+        "duckduckgo": _duckduckgo_routes(),
+        "template": _template_routes(template_path),
+    }
+    out = {}
+    for i, name in enumerate(SERVICES):
+        stub = _Stub(name, routes[name], latency_ms[name], error_rates[name], seed + i)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        server.daemon_threads = True
+        server.stub = stub
+        threading.Thread(target=server.serve_forever, name=f"stub-{name}", daemon=True).start()
+        out[name] = (stub, f"http://127.0.0.1:{server.server_address[1]}")
+    return out
+
+
+def point_app_at(urls: dict, work_dir: str):
+    """Environment for the app modules; must run before they are imported."""
+    os.environ.update({
+        "BRREG_BASE_URL": urls["brreg"],
+        "PROFF_BASE_URL": urls["proff"],
+        "WIKIPEDIA_BASE_URL": urls["wikipedia"],
+        "DUCKDUCKGO_URL": urls["duckduckgo"] + "/",
+        "TEMPLATE_URL": urls["template"] + "/pub?output=xlsx",
+        "TEMPLATE_PATH": "",
+        "TEMPLATE_CACHE_DIR": os.path.join(work_dir, "template"),
+        "BRREG_INDEX_PATH": os.path.join(work_dir, "no_index.sqlite3"),
+        "BRREG_CACHE_PATH": os.path.join(work_dir, "brreg_cache.sqlite3"),
+        "METRICS_WINDOW": "1000000",
+    })
+
+
+# ---------------------------------------------------------
+# SESSIONS
+# ---------------------------------------------------------
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _session(flow, deadline, stats, lock):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            flow()
+            ok = True
+        except Exception:
+            ok = False
+        with lock:
+            stats["latencies"].append(time.perf_counter() - started)
+            stats["errors"] += not ok
+
+
+def run_level(flow, sessions: int, duration: float) -> dict:
+    """N sessions looping over `flow` for `duration` seconds."""
+    from app_modules import metrics
+
+    metrics.reset()
+    stats = {"latencies": [], "errors": 0}
+    lock = threading.Lock()
+    peak = {"rss": _rss_bytes()}
+    done = threading.Event()
+
+    def sample_rss():
+        while not done.wait(0.1):
+            peak["rss"] = max(peak["rss"], _rss_bytes())
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [threading.Thread(target=_session, args=(flow, deadline, stats, lock), name=f"session-{i}")
+               for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    done.set()
+    sampler.join()
+
+    ordered = sorted(stats["latencies"])
+    return {
+        "sessions": sessions,
+        "flows": len(ordered),
+        "errors": stats["errors"],
+        "seconds": wall,
+        "throughput": len(ordered) / wall if wall else 0.0,
+        "p50": metrics._quantile(ordered, 0.5),
+        "p95": metrics._quantile(ordered, 0.95),
+        "p99": metrics._quantile(ordered, 0.99),
+        "peak_rss": peak["rss"],
+        "stages_p95": {name: row["p95"] for name, row in metrics.stage_stats().items()},
+    }
+
+
+def make_flow(companies: int, pdf_pool: list, engine):
+    """The main page flow for one broker; company i comes from a unique search."""
+    from app_modules.company_data import search_brreg_live
+    from app_modules.enrichment import enrich_company
+    from app_modules.pdf_upload import spool_upload
+    from app_modules.Sheets.excel_filler import fill_excel
+    from app_modules.template_loader import get_template_bytes
+
+    counter = iter(range(10 ** 12))
+    counter_lock = threading.Lock()
+
+    def flow():
+        with counter_lock:
+            n = next(counter)
+        query = f"lasttest {n % companies if companies else n}"
+
+        results = search_brreg_live(query)                # search
+        if not results:
+            raise LookupError("ingen treff")
+        company = results[0]                              # select
+        with spool_upload(io.BytesIO(pdf_pool[n % len(pdf_pool)]), name="anbud.pdf") as pdf:  # upload
+            enriched = enrich_company(company["organisasjonsnummer"], pdf=[pdf], fallback_raw=company)
+        template = get_template_bytes()
+        excel = fill_excel(template, enriched["merged_fields"], enriched["summary_text"], engine=engine)
+        if not excel:
+            raise ValueError("tom Excel-fil")
+    return flow
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def _service_values(items, defaults: dict, cast) -> dict:
+    values = dict(defaults)
+    for item in items or []:
+        name, _, value = item.partition("=")
+        targets = SERVICES if name == "all" else [name]
+        for target in targets:
+            if target not in SERVICES:
+                raise SystemExit(f"Ukjent tjeneste {target!r} (velg blant all, {', '.join(SERVICES)})")
+            values[target] = cast(value)
+    return values
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Lasttest av hovedsideflyten mot lokale stand-in-tjenester.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8, 16], help="Samtidige sesjoner per nivå")
+    parser.add_argument("--duration", type=float, default=10, help="Sekunder per nivå")
+    parser.add_argument("--latency", nargs="*", metavar="TJENESTE=MS",
+                        help=f"Forsinkelse per tjeneste (standard {DEFAULT_LATENCY_MS})")
+    parser.add_argument("--errors", nargs="*", metavar="TJENESTE=ANDEL",
+                        help="Andel 503-svar per tjeneste, f.eks. all=0.05")
+    parser.add_argument("--companies", type=int, default=0,
+                        help="Antall ulike selskaper det veksles mellom (0 = nytt selskap hver gang)")
+    parser.add_argument("--pdfs", type=int, default=16, help="Antall ulike PDF-er det veksles mellom")
+    parser.add_argument("--pdf-pages", type=int, default=2, help="Sider per PDF")
+    parser.add_argument("--engine", default=None, help="Utfyllingsmotor (standard: FILL_ENGINE)")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Excel-mal som stand-in-tjenesten leverer")
+    parser.add_argument("--output", help="Skriv resultatene som JSON hit")
+    args = parser.parse_args(argv)
+
+    latency = _service_values(args.latency, DEFAULT_LATENCY_MS, float)
+    errors = _service_values(args.errors, {s: 0.0 for s in SERVICES}, float)
+
+    work_dir = tempfile.mkdtemp(prefix="loadtest-")
+    stubs = start_stubs(latency, errors, args.template)
+    point_app_at({name: url for name, (_, url) in stubs.items()}, work_dir)
+
+    pdf_pool = [tender_document(args.pdf_pages, seed=1000 + i) for i in range(max(1, args.pdfs))]
+    flow = make_flow(args.companies, pdf_pool, args.engine)
+
+    print(f"Stand-ins: " + ", ".join(f"{n} {latency[n]:g} ms/{errors[n]:.0%} feil" for n in SERVICES))
+    print(f"CPU-kjerner: {os.cpu_count()}  |  {args.duration:g} s per nivå  |  "
+          f"{'nytt selskap per flyt' if not args.companies else f'{args.companies} selskaper'}, {len(pdf_pool)} PDF-er\n")
+    print(f"{'sesjoner':>8} {'flyter':>7} {'feil':>5} {'flyt/s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'topp RSS MiB':>13}  tregeste steg (p95)")
+
+    levels = []
+    for sessions in args.sessions:
+        level = run_level(flow, sessions, args.duration)
+        levels.append(level)
+        slowest = sorted(((v, k) for k, v in level["stages_p95"].items() if k != "enrich"), reverse=True)[:3]
+        print(f"{sessions:>8} {level['flows']:>7} {level['errors']:>5} {level['throughput']:>7.2f} "
+              f"{level['p50'] * 1000:>8.0f} {level['p95'] * 1000:>8.0f} {level['p99'] * 1000:>8.0f} "
+              f"{level['peak_rss'] / 2**20:>13.0f}  "
+              + ", ".join(f"{name} {seconds * 1000:.0f}" for seconds, name in slowest))
+
+    requests_total = {name: stub.requests for name, (stub, _) in stubs.items()}
+    print("\nForespørsler til stand-ins: " + ", ".join(f"{k} {v}" for k, v in requests_total.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"latency_ms": latency, "error_rates": errors, "levels": levels,
+                       "stub_requests": requests_total}, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# benchmarks/pdf_fixtures.py
+"""
+Generated PDF fixtures for the PDF benchmarks.
+
+Writes plain text-only PDFs (Helvetica, WinAnsi encoding) without any PDF
+library, so the fixtures are reproducible and nothing binary is committed.
+tender_document() builds dense, tender-like pages with the fields
+pdf_parser looks for (org number, company name, address, revenue, deadline);
+annual_report_document() and vehicle_list_document() are the other files
+that typically come with a case (see pdf_merge).
+
+Usage:
+    python benchmarks/pdf_fixtures.py out_dir/   # write the standard set
+"""
+
+import os
+import random
+import sys
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+
+_WORDS = (
+    "anbud tilbud leverandør kontrakt oppdragsgiver entreprise arbeider "
+    "bygg anlegg prosjekt betingelser krav dokumentasjon forsikring ansvar "
+    "frist levering pris vedlegg kvalifikasjon erfaring kapasitet miljø "
+    "sikkerhet kvalitet rapport fremdrift ferdigstillelse garanti vilkår "
+    "underentreprenør byggeplass materialer sertifikat HMS rutiner"
+).split()
+
+
+def _escape(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def make_pdf(pages, font_size=8) -> bytes:
+    """
+    Build a PDF with one page per entry in `pages` (a list of text lines).
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    leading = font_size * 1.25
+    for lines in pages:
+        stream = [b"BT", b"/F1 %d Tf" % font_size, b"%.2f TL" % leading,
+                  b"40 %d Td" % (PAGE_HEIGHT - 40)]
+        for line in lines:
+            stream.append(b"(" + _escape(line) + b") Tj T*")
+        stream.append(b"ET")
+        content = b"\n".join(stream)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+TENDER_HEADER = [
+    "Tilbudsbrev",
+    "Tangen-Bygg AS",
+    "Organisasjonsnummer: 992531762",
+    "Krabberødstrand 118",
+    "3960 Stathelle",
+    "Omsetning 2024: 26 624 000 kr",
+    "Anbudsfrist: 15.03.2025",
+    "",
+]
+
+ANNUAL_REPORT_HEADER = [
+    "Årsrapport 2024",
+    "Tangen-Bygg AS",
+    "Org.nr: 992531762",
+    "Omsetning 2024: 27 105 000 kr",
+    "Årsresultat: 1 204 000 kr",
+    "",
+]
+
+VEHICLE_LIST_HEADER = [
+    "Kjøretøyliste",
+    "Tangen-Bygg AS",
+    "",
+]
+
+
+def _document(header, n_pages: int, lines_per_page: int, seed: int, row=None) -> bytes:
+    """header on page 1, then filler text and number columns (or `row(rng)` lines)."""
+    rng = random.Random(seed)
+    pages = []
+    for p in range(n_pages):
+        lines = []
+        if p == 0 and lines_per_page:
+            lines += header
+        while len(lines) < lines_per_page:
+            if row is not None:
+                lines.append(row(rng))
+                continue
+            if rng.random() < 0.3:
+                cols = [f"{rng.randint(1, 999):>4}", rng.choice(_WORDS).capitalize(),
+                        f"{rng.randint(1000, 999999):>9} kr", f"{rng.randint(1, 100):>3} %"]
+                lines.append("    ".join(cols))
+            else:
+                lines.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(12, 18))))
+        pages.append(lines)
+    return make_pdf(pages)
+
+
+def tender_document(n_pages: int, lines_per_page: int = 80, seed: int = 1) -> bytes:
+    """
+    Dense tender-like document. Page 1 starts with the company block the
+    field extraction looks for; the rest is filler text and number columns.
+    lines_per_page=0 gives pages without a text layer (like a scan).
+    """
+    return _document(TENDER_HEADER, n_pages, lines_per_page, seed)
+
+
+def annual_report_document(n_pages: int, lines_per_page: int = 80, seed: int = 1) -> bytes:
+    """Annual report: org number and a different revenue figure, no address."""
+    return _document(ANNUAL_REPORT_HEADER, n_pages, lines_per_page, seed)
+
+
+def _vehicle_row(rng) -> str:
+    return (f"{rng.choice(['EL', 'SU', 'ZT', 'DN'])} {rng.randint(10000, 99999)}    "
+            f"{rng.choice(['Volvo', 'Scania', 'Caterpillar', 'Hitachi'])}    {rng.randint(2008, 2024)}")
+
+
+def vehicle_list_document(n_pages: int, lines_per_page: int = 80, seed: int = 1) -> bytes:
+    """Vehicle/machine list: company name and registration rows only."""
+    return _document(VEHICLE_LIST_HEADER, n_pages, lines_per_page, seed, row=_vehicle_row)
+
+
+# Standard set used by the benchmarks: name -> (pages, lines per page)
+STANDARD_FIXTURES = {
+    "tender_1p": (1, 80),
+    "tender_6p": (6, 80),
+    "tender_20p": (20, 80),
+    "scanned_2p": (2, 0),
+}
+
+
+def standard_fixtures() -> dict:
+    """{name: pdf bytes} for STANDARD_FIXTURES (deterministic)."""
+    return {
+        name: tender_document(n_pages, lines, seed=i)
+        for i, (name, (n_pages, lines)) in enumerate(sorted(STANDARD_FIXTURES.items()))
+    }
+
+
+if __name__ == "__main__":
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+    os.makedirs(out_dir, exist_ok=True)
+    for name, data in standard_fixtures().items():
+        with open(os.path.join(out_dir, f"{name}.pdf"), "wb") as f:
+            f.write(data)
+        print(f"{name}.pdf  {len(data) / 1024:.0f} KiB")
@@ -0,0 +1,350 @@
+# benchmarks/run_benchmarks.py
+"""
+Microbenchmark suite for every pipeline stage, offline.
+
+Each stage runs against recorded fixtures:
+
+    BRREG      benchmarks/fixtures/brreg/enheter_sample.json
+    Proff.no   benchmarks/fixtures/proff/*.html
+    PDFs       benchmarks/pdf_fixtures.py (generated, deterministic)
+    template   --template / TEMPLATE_PATH, default the filled workbook in
+               the repo root (same sheets and cells as the published one)
+    summary    benchmarks/fixtures/summary/*.json (Wikipedia, DuckDuckGo)
+
+http_client.get is replaced by a stub serving the summary fixtures for
+the whole run; any other request fails, so nothing touches the network.
+
+Every benchmark is timed with timeit (loops calibrated to ~0.2 s per
+sample, best/median/mean of --repeat samples) and written as JSON. With
+--compare, each stage's best time is checked against a stored baseline
+and the run fails if any stage got slower than --threshold. The best
+time is the least disturbed by other load on the machine; medians are
+recorded too.
+
+No baseline is committed: timings only compare on the same machine.
+Record one there first (second usage line), then compare against it.
+
+Usage:
+    python benchmarks/run_benchmarks.py                           # -> benchmarks/results/latest.json
+    python benchmarks/run_benchmarks.py --output benchmarks/results/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+    python benchmarks/run_benchmarks.py --filter pdf fill --repeat 3
+    python benchmarks/run_benchmarks.py --list
+
+Exit code 1 if a stage regressed against the baseline, 2 if the
+baseline file doesn't exist.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(_BENCH_DIR)
+sys.path.insert(0, _REPO_ROOT)
+sys.path.insert(0, _BENCH_DIR)
+
+from app_modules import http_client, pdf_parser  # noqa: E402
+from app_modules.company_data import format_company_data  # noqa: E402
+from app_modules.Sheets.excel_filler import fill_excel  # noqa: E402
+from app_modules.Sheets.sheet_config import transform_for_sheet  # noqa: E402
+from app_modules.Sheets.Sammendrag import proff_getter  # noqa: E402
+from app_modules.Sheets.Sammendrag.summery_getter import generate_company_summary  # noqa: E402
+from pdf_fixtures import standard_fixtures  # noqa: E402
+
+FIXTURES = os.path.join(_BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(_BENCH_DIR, "results")
+DEFAULT_TEMPLATE = os.environ.get("TEMPLATE_PATH") or os.path.join(_REPO_ROOT, "Filled in with Tangen-Bygg-AS.xlsx")
+
+# name -> setup(ctx) returning the zero-argument callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# ---------------------------------------------------------
+# FIXTURES + HTTP STUB
+# ---------------------------------------------------------
+def _load_json(*parts):
+    with open(os.path.join(FIXTURES, *parts), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_text(*parts):
+    with open(os.path.join(FIXTURES, *parts), encoding="utf-8") as f:
+        return f.read()
+
+
+class _StubResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self._payload
+
+
+def _stub_get(url, params=None, headers=None, timeout=None, stream=False):
+    if "wikipedia.org" in url:
+        return _StubResponse(_load_json("summary", "wikipedia_summary.json"))
+    if "duckduckgo.com" in url:
+        return _StubResponse(_load_json("summary", "duckduckgo.json"))
+    raise RuntimeError(f"Benchmark er offline, ingen fixture for {url}")
+
+
+def _merged_fields(ctx):
+    """BRREG + Proff.no + PDF fields as enrich_company merges them."""
+    fields = format_company_data(ctx["brreg"][0])
+    proff = proff_getter.parse_financial_page(ctx["proff_html"]["company_full"])
+    fields.update({k: v for k, v in proff.items() if v})
+    fields.update(pdf_parser.extract_fields_from_pdf(ctx["pdfs"]["tender_1p"]))
+    return fields
+
+
+# ---------------------------------------------------------
+# STAGES
+# ---------------------------------------------------------
+@benchmark("format_company_data")
+def _bench_format(ctx):
+    entities = ctx["brreg"]
+    return lambda: [format_company_data(e) for e in entities]
+
+
+@benchmark("proff.parse_financial_page")
+def _bench_proff_page(ctx):
+    html = ctx["proff_html"]["company_full"]
+    return lambda: proff_getter.parse_financial_page(html)
+
+
+@benchmark("proff._parse_financial_table")
+def _bench_proff_table(ctx):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(ctx["proff_html"]["company_full"], proff_getter.HTML_PARSER)
+    return lambda: proff_getter._parse_financial_table(soup, proff_getter._Trace(), by_headers=True)
+
+
+@benchmark("proff.find_company_link")
+def _bench_proff_link(ctx):
+    html = ctx["proff_html"]["search_results"]
+    return lambda: proff_getter.find_company_link(html)
+
+
+def _pdf_benchmarks():
+    for name in sorted(standard_fixtures()):
+        @benchmark(f"extract_text_from_pdf[{name}]")
+        def _bench_text(ctx, name=name):
+            data = ctx["pdfs"][name]
+            return lambda: pdf_parser.extract_text_from_pdf(data, workers=1, backend=ctx["backend"])
+
+        @benchmark(f"extract_fields_from_pdf[{name}]")
+        def _bench_fields(ctx, name=name):
+            data = ctx["pdfs"][name]
+            return lambda: pdf_parser.extract_fields_from_pdf(data, backend=ctx["backend"])
+
+
+_pdf_benchmarks()
+
+
+@benchmark("extract_fields_from_text")
+def _bench_fields_text(ctx):
+    text = pdf_parser.extract_text_from_pdf(ctx["pdfs"]["tender_20p"], workers=1, backend=ctx["backend"])
+    return lambda: pdf_parser.extract_fields_from_text(text)
+
+
+@benchmark("transform_for_sheet")
+def _bench_transform(ctx):
+    fields = _merged_fields(ctx)
+    return lambda: transform_for_sheet("Sammendrag", fields)
+
+
+@benchmark("fill_excel[openpyxl]")
+def _bench_fill_openpyxl(ctx):
+    fields = _merged_fields(ctx)
+    return lambda: fill_excel(ctx["template"], fields, "Sammendrag for benchmark.", engine="openpyxl")
+
+
+@benchmark("fill_excel[xml]")
+def _bench_fill_xml(ctx):
+    fields = _merged_fields(ctx)
+    return lambda: fill_excel(ctx["template"], fields, "Sammendrag for benchmark.", engine="xml")
+
+
+@benchmark("generate_company_summary[brreg]")
+def _bench_summary_brreg(ctx):
+    company = format_company_data(ctx["brreg"][0])
+    company["registration_date"] = company["registration_date"] or "2008-03-12"
+    return lambda: generate_company_summary(company)
+
+
+@benchmark("generate_company_summary[web]")
+def _bench_summary_web(ctx):
+    # BRREG sentence too short (<= 40 chars): Wikipedia/DuckDuckGo, stubbed
+    company = {"company_name": "Tangen"}
+    return lambda: generate_company_summary(company)
+
+
+# ---------------------------------------------------------
+# RUN + COMPARE
+# ---------------------------------------------------------
+def _context(template_path, backend):
+    with open(template_path, "rb") as f:
+        template = f.read()
+    return {
+        "brreg": _load_json("brreg", "enheter_sample.json"),
+        "proff_html": {
+            os.path.basename(p)[:-len(".html")]: _read_text("proff", os.path.basename(p))
+            for p in glob.glob(os.path.join(FIXTURES, "proff", "*.html"))
+        },
+        "pdfs": standard_fixtures(),
+        "template": template,
+        "backend": backend,
+    }
+
+
+def _measure(func, repeat):
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    samples = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_REPO_ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(names, repeat, template_path, backend, log=print) -> dict:
+    """Time the given benchmarks; returns the JSON-ready result dict."""
+    ctx = _context(template_path, backend)
+    results = {}
+    original_get = http_client.get
+    http_client.get = _stub_get
+    try:
+        for name in names:
+            func = BENCHMARKS[name](ctx)
+            func()  # warm-up: imports, fill plan, regex caches
+            results[name] = _measure(func, repeat)
+            log(f"{name:<42} {_format_seconds(results[name]['median_s']):>10}  "
+                f"(±{_format_seconds(results[name]['stdev_s'])}, {results[name]['loops']} løkker)")
+    finally:
+        http_client.get = original_get
+
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pdf_backend": pdf_parser._resolve_backend(backend),
+            "html_parser": proff_getter.HTML_PARSER,
+            "template": os.path.basename(template_path),
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Rows (name, baseline best, current best, ratio, status) for every
+    benchmark in both runs; status is "REGRESJON", "raskere" or "ok".
+    """
+    rows = []
+    for name, result in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            continue
+        ratio = result["min_s"] / base["min_s"]
+        if ratio > 1 + threshold:
+            status = "REGRESJON"
+        elif ratio < 1 / (1 + threshold):
+            status = "raskere"
+        else:
+            status = "ok"
+        rows.append((name, base["min_s"], result["min_s"], ratio, status))
+    return rows
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mikrobenchmarker for alle steg i pipelinen (offline).")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"), help="JSON-resultatfil")
+    parser.add_argument("--compare", help="Baseline-JSON å sammenligne mot")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Tillatt økning i beste tid før det regnes som regresjon (standard 0.25 = 25 %%)")
+    parser.add_argument("--repeat", type=int, default=5, help="Antall målinger per benchmark")
+    parser.add_argument("--filter", nargs="*", help="Kjør bare benchmarker som inneholder en av disse tekstene")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Excel-mal (xlsx)")
+    parser.add_argument("--backend", default=pdf_parser.PDF_BACKEND, help="PDF-tekstmotor (standard: PDF_BACKEND)")
+    parser.add_argument("--list", action="store_true", help="Vis benchmarkene og avslutt")
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if not args.filter or any(f in n for f in args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if not names:
+        print("Ingen benchmarker passer filteret", file=sys.stderr)
+        return 2
+    # Checked before the run, so a missing baseline doesn't cost a full run
+    if args.compare and not os.path.exists(args.compare):
+        print(f"Fant ingen baseline i {args.compare}. Det ligger ingen baseline i repoet, "
+              f"siden tidene bare kan sammenlignes på samme maskin. Lag en her først:\n"
+              f"    python benchmarks/run_benchmarks.py --output {args.compare}", file=sys.stderr)
+        return 2
+
+    result = run_suite(names, args.repeat, args.template, args.backend)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"\nResultater skrevet til {args.output}")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(result, baseline, args.threshold)
+    print(f"\nMot {args.compare} (commit {baseline.get('meta', {}).get('commit')}), terskel {args.threshold:.0%}:")
+    print(f"{'benchmark':<42} {'baseline':>10} {'nå':>10} {'faktor':>7}  status")
+    for name, base, now, ratio, status in rows:
+        print(f"{name:<42} {_format_seconds(base):>10} {_format_seconds(now):>10} {ratio:>6.2f}x  {status}")
+    regressions = [row for row in rows if row[4] == "REGRESJON"]
+    if regressions:
+        print(f"\n{len(regressions)} regresjon(er)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())